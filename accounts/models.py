@@ -80,3 +80,16 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.username
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from notifications.recipients import invalidate_recipients
+
+        invalidate_recipients(kwargs.get("update_fields"))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from notifications.recipients import invalidate_recipients
+
+        invalidate_recipients()
+        return result
@@ -13,11 +13,9 @@ from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import get_user_model
 from .models import CustomUser
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
-from django.core.paginator import Paginator
+from agoda_be.pagination import WindowCountPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
-import math
 from rest_framework import status
 
 
@@ -194,71 +192,8 @@ class LogoutView(APIView):
 
 
 # Phân trang
-class UserPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-
-        for field, value in request.query_params.items():
-            if field not in [
-                "current",
-                "pageSize",
-                "username",
-                "email",
-                "is_active",
-                "sort",
-            ]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-
-            if field in ["username"]:
-                self.filters[f"username"] = value
-
-            if field in ["email"]:
-                self.filters[f"email"] = value
-            if field in ["is_active"]:
-                self.filters[f"is_active"] = value
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-
-        total_count = CustomUser.objects.filter(**self.filters).count()
-        total_pages = math.ceil(total_count / self.page_size)
-
-        self.filters.clear()
-
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched users successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
-        )
+class UserPagination(WindowCountPagination):
+    message = "Fetched users successfully!"
 
 
 # API GET danh sách người dùng (với phân trang)
@@ -329,19 +264,8 @@ class UserListView(generics.ListAPIView):
 
         queryset = queryset.order_by(*order_fields)
 
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
-
-        # Áp dụng phân trang
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(current)
-
-        return page
+        # Phân trang do pagination_class đảm nhận
+        return queryset
 
 
 # API GET chi tiết người dùng
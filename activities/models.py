@@ -4,7 +4,6 @@ from cities.models import City  # Liên kết với model Country
 from bookings.models import Booking
 from accounts.models import CustomUser
 import math
-from django.utils import timezone
 
 
 # Model hoạt động
@@ -81,6 +80,17 @@ class Activity(models.Model):
         except Exception:
             self.total_weighted_score = 0.0
         super().save(*args, **kwargs)
+        from locations.search import reindex_on_save
+
+        reindex_on_save("activity", self.pk, kwargs.get("update_fields"))
+
+    def delete(self, *args, **kwargs):
+        activity_id = self.pk
+        result = super().delete(*args, **kwargs)
+        from locations.search import reindex
+
+        reindex("activity", [activity_id])
+        return result
 
 
 # Model để lưu thông tin về hình ảnh hoạt động
@@ -158,43 +168,10 @@ class ActivityDate(models.Model):
         return f"{self.date_launch}, {self.activity_package.name}"
 
     def get_active_promotion(self):
-        """Lấy promotion active cho ActivityDate này"""
-        from promotions.models import ActivityPromotion
-
-        now = timezone.now()
-        activity_promotions = self.promotions.select_related("promotion").all()
-
-        # Chỉ lấy những promotion đang active và liên kết với ActivityDate này
-        active_promos = [
-            ap
-            for ap in activity_promotions
-            if ap.promotion.is_active
-            and ap.promotion.start_date <= now <= ap.promotion.end_date
-            and ap.activity_date_id == self.id
-        ]
-
-        if not active_promos:
-            return None
-
-        # Lấy promotion có discount lớn nhất
-        best_promo = max(
-            active_promos,
-            key=lambda ap: (
-                ap.discount_percent
-                if ap.discount_percent is not None
-                else (ap.promotion.discount_percent or 0)
-            ),
-        )
-
-        promo = best_promo.promotion
-        return {
-            "id": promo.id,
-            "title": promo.title,
-            "discount_percent": best_promo.discount_percent or promo.discount_percent,
-            "discount_amount": best_promo.discount_amount or promo.discount_amount,
-            "start_date": promo.start_date,
-            "end_date": promo.end_date,
-        }
+        """Promotion active có discount lớn nhất (xem promotions.services)"""
+        from promotions.services import get_active_promotion
+
+        return get_active_promotion(self)
 
 
 class ActivityDateBookingDetail(models.Model):
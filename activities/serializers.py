@@ -1,5 +1,6 @@
 from django.utils import timezone
 from rest_framework import serializers
+from promotions.services import ActivePromotionListSerializer
 from .models import (
     Activity,
     ActivityImage,
@@ -54,6 +55,7 @@ class ActivityDateForBookingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ActivityDate
+        list_serializer_class = ActivePromotionListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
@@ -78,6 +80,7 @@ class ActivityDateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ActivityDate
+        list_serializer_class = ActivePromotionListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
@@ -25,6 +25,8 @@ from .serializers import (
     UserActivityInteractionCreateSerializer,
 )
 from rest_framework.pagination import PageNumberPagination
+from agoda_be.pagination import WindowCountPagination
+from locations.search import search_q
 from django.db.models import Q
 from rest_framework.response import Response
 import math
@@ -44,133 +46,8 @@ from django.utils import timezone
 
 
 # Phân trang
-class ActivityPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-        city_id = request.query_params.get("city_id")
-        event_organizer_id = request.query_params.get("event_organizer_id")
-
-        if city_id:
-            self.filters["city_id"] = city_id
-
-        if event_organizer_id:
-            self.filters["event_organizer_id"] = event_organizer_id
-
-        for field, value in request.query_params.items():
-            if field not in [
-                "current",
-                "pageSize",
-                "city_id",
-                "event_organizer_id",
-                "recommended",
-                "avg_star",
-                "min_avg_star",
-                "max_avg_star",
-                "min_avg_price",
-                "max_avg_price",
-                "sort",
-                "min_total_time",
-                "max_total_time",
-            ]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-            if field in ["avg_star"]:
-                try:
-                    int_value = int(value)
-                    self.filters["avg_star__gte"] = int_value
-                    self.filters["avg_star__lt"] = int_value + 1
-                except ValueError:
-                    pass
-
-            if field in ["min_avg_star", "max_avg_star"]:
-                min_avg_star = request.query_params.get("min_avg_star")
-                max_avg_star = request.query_params.get("max_avg_star")
-
-                if min_avg_star:
-                    try:
-                        self.filters["avg_star__gte"] = float(min_avg_star)
-                    except ValueError:
-                        pass
-
-                if max_avg_star:
-                    try:
-                        self.filters["avg_star__lte"] = float(max_avg_star)
-                    except ValueError:
-                        pass
-
-            if field in ["min_avg_price", "max_avg_price"]:
-                min_avg_price = request.query_params.get("min_avg_price")
-                max_avg_price = request.query_params.get("max_avg_price")
-
-                if min_avg_price:
-                    try:
-                        self.filters["avg_price__gte"] = float(min_avg_price)
-                    except ValueError:
-                        pass
-
-                if max_avg_price:
-                    try:
-                        self.filters["avg_price__lte"] = float(max_avg_price)
-                    except ValueError:
-                        pass
-
-            if field in ["min_total_time", "max_total_time"]:
-                min_total_time = request.query_params.get("min_total_time")
-                max_total_time = request.query_params.get("max_total_time")
-
-                if min_total_time:
-                    try:
-                        self.filters["total_time__gte"] = float(min_total_time)
-                    except ValueError:
-                        pass
-
-                if max_total_time:
-                    try:
-                        self.filters["total_time__lte"] = float(max_total_time)
-                    except ValueError:
-                        pass
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-
-        total_count = Activity.objects.filter(**self.filters).count()
-        total_pages = math.ceil(total_count / self.page_size)
-
-        self.filters.clear()
-
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched activity successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
-        )
+class ActivityPagination(WindowCountPagination):
+    message = "Fetched activity successfully!"
 
 
 # API GET danh sách activity (với phân trang)
@@ -215,7 +92,11 @@ class ActivityListView(generics.ListAPIView):
                 "min_total_time",
                 "max_total_time",
             ]:  # Bỏ qua các trường phân trang
-                query_filter &= Q(**{f"{field}__icontains": value})
+                if field == "name":
+                    # Tên activity: tra chỉ mục (tiền tố, không dấu) thay cho LIKE '%q%'
+                    query_filter &= search_q("activity", value, fields=("name",))
+                else:
+                    query_filter &= Q(**{f"{field}__icontains": value})
 
             if field in ["avg_star"]:
                 try:
@@ -316,19 +197,8 @@ class ActivityListView(generics.ListAPIView):
         elif order_fields:
             queryset = queryset.order_by(*order_fields)
 
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
-
-        # Áp dụng phân trang
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(current)
-
-        return page
+        # Phân trang do pagination_class đảm nhận
+        return queryset
 
 
 class ActivityCreateView(generics.CreateAPIView):
@@ -0,0 +1,16 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+
+class OptionalJWTAuthentication(JWTAuthentication):
+    """
+    JWT không bắt buộc cho các trang public: token hợp lệ thì có request.user để
+    cá nhân hóa, token hết hạn / sai thì coi như khách thay vì trả 401.
+    """
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return None
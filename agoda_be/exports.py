@@ -0,0 +1,90 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+FORMAT_QUERY_PARAM = "export_format"  # không dùng "format" vì DRF đã dùng để chọn renderer
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class _Echo:
+    """File giả cho csv.writer: trả lại dòng vừa ghi thay vì giữ trong buffer."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """
+    Duyệt queryset theo id giảm dần, chỉ lấy các cột trong `columns`
+    (dict tên cột -> lookup), bộ nhớ không phụ thuộc số dòng.
+
+    PostgreSQL dùng server-side cursor (`.iterator()`); MySQL / SQLite không
+    stream được kết quả nên đọc từng lô theo keyset `id < id cuối lô trước`.
+    """
+    lookups = list(columns.values())
+    queryset = queryset.order_by("-pk")
+
+    if connections[queryset.db].vendor == "postgresql":
+        for values in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+            yield dict(zip(columns, values))
+        return
+
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__lt=last_pk)
+        rows = list(chunk.values_list("pk", *lookups)[:chunk_size])
+        for row in rows:
+            yield dict(zip(columns, row[1:]))
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    # BOM để Excel đọc đúng tiếng Việt
+    yield "\ufeff" + writer.writerow(list(columns))
+    for row in rows:
+        yield writer.writerow(
+            [
+                timezone.localtime(value).isoformat()
+                if hasattr(value, "tzinfo") and value.tzinfo
+                else value
+                for value in row.values()
+            ]
+        )
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def export_response(request, queryset, columns, filename):
+    """
+    StreamingHttpResponse CSV (mặc định) hoặc NDJSON (`?export_format=ndjson`)
+    cho queryset đã lọc. Trả về None nếu định dạng không hỗ trợ.
+    """
+    export_format = request.query_params.get(FORMAT_QUERY_PARAM, "csv").lower()
+    if export_format not in FORMATS:
+        return None
+
+    rows = iterate_rows(queryset, columns)
+    lines = (
+        _csv_lines(columns, rows) if export_format == "csv" else _ndjson_lines(rows)
+    )
+    response = StreamingHttpResponse(lines, content_type=FORMATS[export_format])
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}-{stamp}.{export_format}"'
+    )
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,212 @@
+import logging
+from datetime import datetime, time
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Query param dành cho phân trang / sắp xếp / xuất file, không phải điều kiện lọc
+RESERVED_PARAMS = {"current", "pageSize", "cursor", "sort", "export_format"}
+
+
+# =========================
+# ÉP KIỂU
+# =========================
+def to_int(value):
+    return int(value)
+
+
+def to_float(value):
+    return float(value)
+
+
+def to_str(value):
+    return value
+
+
+def to_date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def to_datetime(value):
+    """Nhận cả "YYYY-MM-DD" (đầu ngày) lẫn datetime ISO, trả về datetime có timezone."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed = datetime.combine(to_date(value), time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+# =========================
+# KHAI BÁO
+# =========================
+class ToMany:
+    """
+    Quan hệ 1-nhiều (vd. booking -> flight_details). Điều kiện trên quan hệ này
+    được dịch thành EXISTS(...) thay vì JOIN + DISTINCT nên không nhân bản dòng.
+
+    model: "app_label.Model" của bảng con; inner / outer: cột nối bảng con với
+    bảng gốc (vd. inner="booking_id", outer="booking_id").
+    """
+
+    def __init__(self, model, inner, outer):
+        self.model_label = model
+        self.inner = inner
+        self.outer = outer
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def exists(self, q):
+        return Exists(
+            self.model.objects.filter(q, **{self.inner: OuterRef(self.outer)})
+        )
+
+
+class Param:
+    """
+    1 query param -> 1 điều kiện. lookup tính từ model gốc, hoặc từ model con nếu
+    có `relation`. `scope`: điều kiện cố định đi kèm trên model gốc (vd. chỉ áp cho
+    booking khách sạn). `exclude=True`: loại các bản ghi có dòng con thỏa điều kiện.
+    """
+
+    def __init__(
+        self, name, lookup, coerce=to_int, relation=None, scope=None, exclude=False
+    ):
+        self.name = name
+        self.lookup = lookup
+        self.coerce = coerce
+        self.relation = relation
+        self.scope = scope or {}
+        self.exclude = exclude
+
+    def clean(self, raw):
+        try:
+            return self.coerce(raw)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Invalid value for {self.name}")
+
+
+def range_params(min_name, max_name, lookup, coerce=to_float, **kwargs):
+    """Cặp min_x / max_x -> lookup__gte / lookup__lte."""
+    return [
+        Param(min_name, f"{lookup}__gte", coerce, **kwargs),
+        Param(max_name, f"{lookup}__lte", coerce, **kwargs),
+    ]
+
+
+class CompiledFilter:
+    """Kết quả compile: queryset đã lọc + giá trị đã ép kiểu, `sql` để profiling."""
+
+    def __init__(self, queryset, values, ordering):
+        self.queryset = queryset
+        self.values = values
+        self.ordering = ordering
+
+    @property
+    def sql(self):
+        return str(self.queryset.query)
+
+
+class FilterSpec:
+    """
+    Bộ lọc khai báo cho 1 resource (list view), compile query params thành đúng
+    1 queryset:
+
+    - Mỗi param được ép kiểu 1 lần; giá trị sai -> 400 thay vì lỗi DB.
+    - Điều kiện trên quan hệ to-one là JOIN thường; trên quan hệ to-many được gom
+      theo quan hệ vào 1 EXISTS (cùng 1 dòng con phải thỏa mọi điều kiện), nên
+      không cần `.distinct()` và phân trang vẫn đếm được bằng window function.
+    - Param không khai báo nhưng trùng tên field của model gốc -> `__icontains`
+      (giữ hành vi cũ), param lạ khác bị bỏ qua.
+    - `sort=field-asc,other-desc` chỉ nhận đường dẫn field hợp lệ không đi qua
+      quan hệ to-many.
+    """
+
+    sort_param = "sort"
+
+    def __init__(self, params, search_fields=()):
+        self.params = {}
+        for param in params:
+            self.params[param.name] = param
+        self.search_fields = set(search_fields)
+
+    def compile(self, queryset, query_params):
+        values = {}
+        q = Q()
+        related = {}  # relation -> Q gom điều kiện của cùng 1 quan hệ to-many
+
+        for name, raw in query_params.items():
+            if raw in ("", None) or name in RESERVED_PARAMS:
+                continue
+            param = self.params.get(name)
+            if param is None:
+                if name in self.search_fields:
+                    q &= Q(**{f"{name}__icontains": raw})
+                continue
+
+            value = values[name] = param.clean(raw)
+            condition = Q(**{param.lookup: value})
+            q &= Q(**param.scope)
+            if param.relation is None:
+                q &= condition
+            elif param.exclude:
+                q &= ~param.relation.exists(condition)
+            else:
+                related[param.relation] = related.get(param.relation, Q()) & condition
+
+        for relation, condition in related.items():
+            q &= relation.exists(condition)
+
+        queryset = queryset.filter(q)
+        ordering = self.get_ordering(queryset.model, query_params.get(self.sort_param))
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        compiled = CompiledFilter(queryset, values, ordering)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s filter SQL: %s", queryset.model.__name__, compiled.sql)
+        return compiled
+
+    def get_ordering(self, model, sort):
+        if not sort:
+            return []
+        ordering = []
+        # Ví dụ: sort=avg_price-desc,avg_star-asc
+        for item in sort.split(","):
+            field, _, direction = item.rpartition("-")
+            if not field or direction not in ("asc", "desc"):
+                continue  # bỏ qua format không hợp lệ
+            if not is_sortable(model, field):
+                continue
+            ordering.append(f"-{field}" if direction == "desc" else field)
+        return ordering
+
+
+def is_sortable(model, path):
+    """field__field... tồn tại và chỉ đi qua quan hệ to-one (sắp xếp không nhân bản dòng)."""
+    opts = model._meta
+    parts = path.split(LOOKUP_SEP)
+    for index, part in enumerate(parts):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        if field.many_to_many or field.one_to_many:
+            return False
+        if field.is_relation:
+            opts = field.related_model._meta
+        elif index != len(parts) - 1:
+            return False
+    return True
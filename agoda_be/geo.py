@@ -0,0 +1,76 @@
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 5.0
+# Giới hạn bán kính để bounding box luôn nhỏ, haversine không chạm vùng đối cực
+MAX_RADIUS_KM = 200.0
+
+
+def parse_near(params, near_param="near", radius_param="radius_km"):
+    """
+    Đọc `near=lat,lng&radius_km=` từ query params.
+    Trả về None nếu không có `near`, raise ValueError nếu giá trị không hợp lệ.
+    """
+    near = params.get(near_param)
+    if not near:
+        return None
+    lat, lng = (float(value) for value in near.split(","))
+    radius_km = float(params.get(radius_param) or DEFAULT_RADIUS_KM)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180 and radius_km > 0):
+        raise ValueError("near/radius_km out of range")
+    return lat, lng, min(radius_km, MAX_RADIUS_KM)
+
+
+def bounding_box_q(lat, lng, radius_km, lat_field="lat", lng_field="lng"):
+    """Q lọc thô theo hình chữ nhật bao quanh vòng tròn, dùng được index (lat, lng)."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    q = Q(**{f"{lat_field}__gte": min_lat, f"{lat_field}__lte": max_lat})
+
+    # Gần cực: vòng tròn bao hết mọi kinh độ
+    if max_lat >= 90 or min_lat <= -90:
+        return q
+
+    delta_lng = math.degrees(
+        radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat)))
+    )
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if min_lng < -180:
+        # Vượt kinh tuyến 180: tách thành 2 khoảng
+        return q & (
+            Q(**{f"{lng_field}__gte": min_lng + 360})
+            | Q(**{f"{lng_field}__lte": max_lng})
+        )
+    if max_lng > 180:
+        return q & (
+            Q(**{f"{lng_field}__gte": min_lng})
+            | Q(**{f"{lng_field}__lte": max_lng - 360})
+        )
+    return q & Q(**{f"{lng_field}__gte": min_lng, f"{lng_field}__lte": max_lng})
+
+
+def haversine_km(lat, lng, lat_field="lat", lng_field="lng"):
+    """Biểu thức SQL khoảng cách (km) từ (lat, lng) tới cột lat_field/lng_field."""
+    dlat = Radians(F(lat_field)) - Value(math.radians(lat))
+    dlng = Radians(F(lng_field)) - Value(math.radians(lng))
+    a = Power(Sin(dlat / 2), 2) + Value(math.cos(math.radians(lat))) * Cos(
+        Radians(F(lat_field))
+    ) * Power(Sin(dlng / 2), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filter_near(
+    queryset, lat, lng, radius_km, lat_field="lat", lng_field="lng", alias="distance_km"
+):
+    """
+    Lọc các bản ghi trong bán kính radius_km: bounding box (theo index) trước,
+    sau đó tinh lọc bằng haversine; annotate `distance_km` để sắp xếp.
+    """
+    return (
+        queryset.filter(bounding_box_q(lat, lng, radius_km, lat_field, lng_field))
+        .annotate(**{alias: haversine_km(lat, lng, lat_field, lng_field)})
+        .filter(**{f"{alias}__lte": radius_km})
+    )
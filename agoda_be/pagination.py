@@ -0,0 +1,179 @@
+import base64
+import json
+import math
+
+from django.db import connections
+from django.db.models import Count, Q, QuerySet, Window
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+class WindowCountPagination(PageNumberPagination):
+    """
+    Phân trang theo `current` / `pageSize` dùng chung cho các list view.
+
+    - Toàn bộ trạng thái (page_size, current_page, total_count) nằm trên instance,
+      DRF tạo một paginator cho mỗi request nên không còn dùng chung dict `filters`.
+    - Tổng số bản ghi được tính từ chính queryset đang phân trang, không dựng lại filter.
+    - Nếu DB hỗ trợ window function, trang và tổng được lấy trong 1 query
+      bằng `COUNT(*) OVER()`; ngược lại fallback về `queryset.count()`.
+    - Chế độ `cursor=` (opt-in, cần khai báo `cursor_ordering_fields`): keyset
+      pagination theo (field, id), không OFFSET, không COUNT, dùng cho infinite scroll.
+    """
+
+    page_size = 10
+    page_query_param = "current"
+    page_size_query_param = "pageSize"
+    message = "Fetched data successfully!"
+    total_count_attr = "_pagination_total_count"
+
+    cursor_query_param = "cursor"
+    # Các field được phép làm khóa keyset, luôn đi kèm id để thứ tự là duy nhất
+    cursor_ordering_fields = ()
+    # Dùng khi ordering đầu tiên của queryset không nằm trong cursor_ordering_fields
+    cursor_default_ordering = None
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.use_cursor = bool(self.cursor_ordering_fields) and (
+            self.cursor_query_param in request.query_params
+        )
+        if self.use_cursor:
+            return self.paginate_by_cursor(queryset, request)
+
+        self.current_page = self.get_current_page(request)
+        self.total_count = None
+
+        rows = None
+        if self.can_count_in_window(queryset):
+            rows = list(
+                self.slice_page(
+                    queryset.annotate(
+                        **{self.total_count_attr: Window(expression=Count("*"))}
+                    ),
+                    self.current_page,
+                )
+            )
+            if rows:
+                self.total_count = getattr(rows[0], self.total_count_attr)
+
+        if self.total_count is None:
+            self.total_count = (
+                queryset.count() if isinstance(queryset, QuerySet) else len(queryset)
+            )
+            # Giống Paginator.get_page: vượt quá trang cuối thì trả về trang cuối
+            last_page = max(1, self.get_total_pages())
+            if rows is None or self.current_page > last_page:
+                self.current_page = min(self.current_page, last_page)
+                rows = list(self.slice_page(queryset, self.current_page))
+
+        return rows
+
+    def paginate_by_cursor(self, queryset, request):
+        ordering = self.get_cursor_ordering(queryset)
+        field = ordering.lstrip("-")
+        lookup = "lt" if ordering.startswith("-") else "gt"
+        queryset = queryset.order_by(ordering, "-pk" if lookup == "lt" else "pk")
+
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            # Cursor chỉ hợp lệ với đúng ordering đã sinh ra nó
+            if position["o"] != ordering:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": position["v"]})
+                | Q(**{field: position["v"], f"pk__{lookup}": position["pk"]})
+            )
+
+        # Lấy dư 1 bản ghi để biết còn trang sau hay không
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(
+                {"o": ordering, "v": getattr(last, field), "pk": last.pk}
+            )
+        return rows
+
+    def get_cursor_ordering(self, queryset):
+        order_by = queryset.query.order_by
+        if (
+            order_by
+            and isinstance(order_by[0], str)
+            and order_by[0].lstrip("-") in self.cursor_ordering_fields
+        ):
+            return order_by[0]
+        return self.cursor_default_ordering
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            position = json.loads(raw)
+            if not {"o", "v", "pk"} <= set(position):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_current_page(self, request):
+        try:
+            current_page = int(request.query_params.get(self.page_query_param, 1))
+        except (TypeError, ValueError):
+            return 1
+        return max(current_page, 1)
+
+    def can_count_in_window(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return False
+        # DISTINCT / UNION chạy sau window function nên COUNT(*) OVER() sẽ đếm sai
+        if queryset.query.distinct or queryset.query.combinator:
+            return False
+        return connections[queryset.db].features.supports_over_clause
+
+    def slice_page(self, queryset, number):
+        offset = (number - 1) * self.page_size
+        return queryset[offset : offset + self.page_size]
+
+    def get_total_pages(self):
+        return math.ceil(self.total_count / self.page_size)
+
+    def get_paginated_response(self, data):
+        if self.use_cursor:
+            return Response(
+                {
+                    "isSuccess": True,
+                    "message": self.message,
+                    "meta": {
+                        "itemsPerPage": self.page_size,
+                        "hasNext": self.has_next,
+                        "nextCursor": self.next_cursor,
+                    },
+                    "data": data,
+                }
+            )
+
+        return Response(
+            {
+                "isSuccess": True,
+                "message": self.message,
+                "meta": {
+                    "totalItems": self.total_count,
+                    "currentPage": self.current_page,
+                    "itemsPerPage": self.page_size,
+                    "totalPages": self.get_total_pages(),
+                },
+                "data": data,
+            }
+        )
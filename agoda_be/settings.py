@@ -87,6 +87,58 @@ if USE_ASGI:
         },
     }
 
+# =========================
+# CACHE
+# =========================
+# Cache trang danh sách hotel (hotels/cache.py): locmem mặc định,
+# production đặt HOTEL_LIST_CACHE_REDIS_URL (vd: redis://127.0.0.1:6379/1)
+HOTEL_LIST_CACHE_TTL = config("HOTEL_LIST_CACHE_TTL", default=300, cast=int)
+HOTEL_LIST_CACHE_MAX_ENTRIES = config(
+    "HOTEL_LIST_CACHE_MAX_ENTRIES", default=1000, cast=int
+)
+HOTEL_LIST_CACHE_REDIS_URL = config("HOTEL_LIST_CACHE_REDIS_URL", default="")
+# Trang thông báo đầu tiên + số chưa đọc mỗi user (notifications/read_model.py) và
+# danh sách người nhận của fan_out (notifications/recipients.py).
+# Notification được tạo / invalidate ở process HTTP + outbox nhưng đọc ở process
+# websocket nên cache phải dùng chung: mặc định là Redis của CHANNEL_LAYERS khi
+# USE_ASGI, không có Redis thì không cache (đọc thẳng DB)
+NOTIFICATION_CACHE_TTL = config("NOTIFICATION_CACHE_TTL", default=300, cast=int)
+NOTIFICATION_CACHE_REDIS_URL = config(
+    "NOTIFICATION_CACHE_REDIS_URL",
+    default="redis://127.0.0.1:6379/2" if USE_ASGI else "",
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "hotel_list": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": HOTEL_LIST_CACHE_REDIS_URL,
+            "TIMEOUT": HOTEL_LIST_CACHE_TTL,
+            "KEY_PREFIX": "agoda",
+        }
+        if HOTEL_LIST_CACHE_REDIS_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "hotel-list",
+            "TIMEOUT": HOTEL_LIST_CACHE_TTL,
+            "OPTIONS": {"MAX_ENTRIES": HOTEL_LIST_CACHE_MAX_ENTRIES},
+        }
+    ),
+    "notifications": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": NOTIFICATION_CACHE_REDIS_URL,
+            "TIMEOUT": NOTIFICATION_CACHE_TTL,
+            "KEY_PREFIX": "agoda",
+        }
+        if NOTIFICATION_CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    ),
+}
+
 # =========================
 # MIDDLEWARE
 # =========================
@@ -225,18 +277,38 @@ EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool)
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 
+# =========================
+# NOTIFICATION OUTBOX
+# =========================
+# "thread": worker pool trong process gửi ngay sau commit
+# "command": chỉ gửi qua `python manage.py drain_notifications --loop`
+NOTIFICATION_OUTBOX_MODE = config("NOTIFICATION_OUTBOX_MODE", default="thread")
+NOTIFICATION_OUTBOX_WORKERS = config("NOTIFICATION_OUTBOX_WORKERS", default=2, cast=int)
+
 # =========================
 # STRIPE
 # =========================
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET")
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY")
+# Event webhook (payments/webhooks.py): "thread" xử lý ngay sau khi nhận,
+# "command" chỉ xử lý qua `python manage.py process_stripe_events --loop`
+STRIPE_WEBHOOK_MODE = config("STRIPE_WEBHOOK_MODE", default="thread")
+# Response của pay / capture / confirm_cash được giữ theo header Idempotency-Key
+# (payments/idempotency.py) trong khoảng này (giây)
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=86400, cast=int)
+# Ghế máy bay được giữ cho booking chưa thanh toán trong khoảng này (giây),
+# sau đó `python manage.py expire_seat_holds` trả ghế lại (flights/inventory.py).
+# Checkout Session của Stripe hết hạn cùng lúc, Stripe yêu cầu tối thiểu 30 phút
+FLIGHT_SEAT_HOLD_TTL = config("FLIGHT_SEAT_HOLD_TTL", default=2100, cast=int)
 
 # =========================
 # FRONTEND
 # =========================
 FRONT_END_URL = config("FRONT_END_URL")
 ADMIN_URL = config("ADMIN_URL")
+# URL public của backend, dùng cho link ảnh trong thông báo tạo ngoài request
+BACKEND_URL = config("BACKEND_URL", default="http://127.0.0.1:8000")
 
 AYD_CHATBOT_ID = config("AYD_CHATBOT_ID")
 AYD_WIDGET_ID = config("AYD_WIDGET_ID")
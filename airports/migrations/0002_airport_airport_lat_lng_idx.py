@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(fields=['lat', 'lng'], name='airport_lat_lng_idx'),
+        ),
+    ]
@@ -16,5 +16,23 @@ class Airport(models.Model):
     lng = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Bounding box của near= (agoda_be.geo)
+        indexes = [models.Index(fields=["lat", "lng"], name="airport_lat_lng_idx")]
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from locations.search import reindex_on_save
+
+        reindex_on_save("airport", self.pk, kwargs.get("update_fields"))
+
+    def delete(self, *args, **kwargs):
+        airport_id = self.pk
+        result = super().delete(*args, **kwargs)
+        from locations.search import reindex
+
+        reindex("airport", [airport_id])
+        return result
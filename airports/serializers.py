@@ -6,6 +6,8 @@ from cities.serializers import CityCreateSerializer
 
 class AirportSerializer(serializers.ModelSerializer):
     city = CityCreateSerializer(read_only=True)
+    # Chỉ có khi lọc near= (annotate từ agoda_be.geo.filter_near)
+    distance_km = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Airport
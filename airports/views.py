@@ -3,70 +3,18 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from .models import Airport
 from .serializers import AirportSerializer, AirportCreateSerializer
-from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
 from rest_framework.response import Response
-import math
-from django.core.paginator import Paginator
 from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
+from agoda_be.geo import filter_near, parse_near
+from agoda_be.pagination import WindowCountPagination
 
 
 # Phân trang
-class AirportPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-
-        for field, value in request.query_params.items():
-            if field not in ["current", "pageSize", "sort", "city_id", "code"]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-            if field in ["city_id"]:
-                self.filters[f"{field}"] = value
-            if field in ["code"]:
-                self.filters[f"{field}"] = value
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-        total_count = Airport.objects.filter(**self.filters).count()
-        total_pages = math.ceil(total_count / self.page_size)
-
-        self.filters.clear()
-
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched airport successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
-        )
+class AirportPagination(WindowCountPagination):
+    message = "Fetched airport successfully!"
 
 
 # API GET danh sách sân bay (với phân trang)
@@ -86,7 +34,15 @@ class AirportListView(generics.ListAPIView):
         query_filter = Q()
 
         for field, value in filter_params.items():
-            if field not in ["pageSize", "current", "sort", "city_id", "code"]:
+            if field not in [
+                "pageSize",
+                "current",
+                "sort",
+                "city_id",
+                "code",
+                "near",
+                "radius_km",
+            ]:
                 query_filter &= Q(**{f"{field}__icontains": value})
 
             if field in ["city_id"]:
@@ -113,21 +69,19 @@ class AirportListView(generics.ListAPIView):
                 except ValueError:
                     continue  # bỏ qua format không hợp lệ
 
-        queryset = queryset.order_by(*order_fields)
-
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
+        # near=lat,lng&radius_km=: sân bay gần 1 điểm, gần nhất trước
+        try:
+            near = parse_near(filter_params)
+        except ValueError:
+            return Airport.objects.none()
+        if near:
+            queryset = filter_near(queryset, *near)
+            order_fields.insert(0, "distance_km")
 
-        # Áp dụng phân trang
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(current)
+        queryset = queryset.order_by(*order_fields)
 
-        return page
+        # Phân trang do pagination_class đảm nhận
+        return queryset
 
 
 # API GET chi tiết sân bay
@@ -9,6 +9,7 @@ from .serializers import (
     RefundPolicySerializer,
     RefundPolicySerializer,
 )
+from django.db import transaction
 from django.db.models import Q
 from rooms.serializers import (
     RoomBookingDetailSerializer,
@@ -28,9 +29,10 @@ from activities.serializers import (
 )
 from .constants.service_type import ServiceType
 from .constants.booking_status import BookingStatus
-from rooms.models import RoomBookingDetail
+from rooms.models import RoomBookingDetail, RoomsUnavailable
 from cars.models import CarBookingDetail
 from flights.models import FlightBookingDetail
+from flights.inventory import SeatsUnavailable, release_holds
 from activities.models import ActivityDateBookingDetail
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from payments.models import Payment
@@ -42,6 +44,27 @@ from django.conf import settings
 from cars.constants.car_booking_status import CarBookingStatus
 from cars.models import Car
 from activities.models import ActivityDate
+from agoda_be.exports import export_response
+
+
+# Cột xuất file: tên cột -> lookup (đọc bằng values_list, không qua BookingSerializer)
+BOOKING_EXPORT_COLUMNS = {
+    "id": "id",
+    "booking_code": "booking_code",
+    "service_type": "service_type",
+    "status": "status",
+    "payment_status": "payment_status",
+    "user_id": "user_id",
+    "user_email": "user__email",
+    "guest_name": "guest_info__full_name",
+    "guest_email": "guest_info__email",
+    "guest_phone": "guest_info__phone",
+    "total_price": "total_price",
+    "discount_amount": "discount_amount",
+    "final_price": "final_price",
+    "refund_amount": "refund_amount",
+    "created_at": "created_at",
+}
 
 
 # Phân trang chung cho Booking và RefundPolicy
@@ -105,6 +128,20 @@ class BookingViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """Xuất toàn bộ booking đã lọc dạng CSV / NDJSON (stream, không phân trang)"""
+        queryset = self.filter_queryset(self.get_queryset())
+        response = export_response(
+            request, queryset, BOOKING_EXPORT_COLUMNS, "bookings"
+        )
+        if response is None:
+            return Response(
+                {"isSuccess": False, "message": "Unsupported export format"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return response
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -120,14 +157,23 @@ class BookingViewSet(viewsets.ModelViewSet):
                     data=room_data, many=isinstance(room_data, list)
                 )
                 room_serializer.is_valid(raise_exception=True)
+                try:
+                    # Các phòng giữ chỗ cùng 1 transaction: hết phòng ở 1 đêm
+                    # thì không phòng nào bị giữ
+                    with transaction.atomic():
+                        saved = room_serializer.save(booking=booking)
+                except RoomsUnavailable as e:
+                    booking.delete()
+                    return Response(
+                        {"isSuccess": False, "message": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
                 if isinstance(room_data, list):
-                    details = room_serializer.save(booking=booking)
-                    booking.service_ref_ids = [d.id for d in details]
-                    data = RoomBookingDetailSerializer(details, many=True).data
+                    booking.service_ref_ids = [d.id for d in saved]
+                    data = RoomBookingDetailSerializer(saved, many=True).data
                 else:
-                    detail = room_serializer.save(booking=booking)
-                    booking.service_ref_ids = [detail.id]
-                    data = RoomBookingDetailSerializer(detail).data
+                    booking.service_ref_ids = [saved.id]
+                    data = RoomBookingDetailSerializer(saved).data
                 booking.save(update_fields=["service_ref_ids"])
 
         elif service_type == ServiceType.CAR:
@@ -184,14 +230,23 @@ class BookingViewSet(viewsets.ModelViewSet):
                     data=flight_data, many=isinstance(flight_data, list)
                 )
                 flight_serializer.is_valid(raise_exception=True)
+                try:
+                    # Các chặng giữ ghế cùng 1 transaction: thiếu chỗ ở 1 chặng
+                    # thì không chặng nào bị trừ ghế
+                    with transaction.atomic():
+                        saved = flight_serializer.save(booking=booking)
+                except SeatsUnavailable as e:
+                    booking.delete()
+                    return Response(
+                        {"isSuccess": False, "message": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
                 if isinstance(flight_data, list):
-                    details = flight_serializer.save(booking=booking)
-                    booking.service_ref_ids = [d.id for d in details]
-                    data = FlightBookingDetailSerializer(details, many=True).data
+                    booking.service_ref_ids = [d.id for d in saved]
+                    data = FlightBookingDetailSerializer(saved, many=True).data
                 else:
-                    detail = flight_serializer.save(booking=booking)
-                    booking.service_ref_ids = [detail.id]
-                    data = FlightBookingDetailSerializer(detail).data
+                    booking.service_ref_ids = [saved.id]
+                    data = FlightBookingDetailSerializer(saved).data
                 booking.save(update_fields=["service_ref_ids"])
 
         elif service_type == ServiceType.ACTIVITY:
@@ -364,8 +419,16 @@ class BookingViewSet(viewsets.ModelViewSet):
             try:
                 stripe.api_key = settings.STRIPE_SECRET_KEY
                 # Refund qua Stripe
+                # transaction_id là checkout session id; payment intent được lưu
+                # khi webhook checkout.session.completed tới
+                payment_intent = (
+                    payment.payment_intent
+                    or stripe.checkout.Session.retrieve(
+                        payment.transaction_id
+                    ).payment_intent
+                )
                 refund = stripe.Refund.create(
-                    payment_intent=payment.transaction_id,
+                    payment_intent=payment_intent,
                     amount=int(refund_amount * 100),  # Stripe tính theo cent
                 )
                 return refund
@@ -422,10 +485,10 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # Cập nhật booking
         booking.status = BookingStatus.CANCELLED
+        payments = booking.payments.all()
         if refund_amount > 0:
             booking.payment_status = PaymentStatus.REFUNDED
             booking.refund_amount = refund_amount
-            payments = booking.payments.all()
             for payment in payments:
                 payment.status = PaymentStatus.REFUNDED
                 payment.save()
@@ -439,7 +502,16 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking.save()
 
         service_type = booking.service_type
-        if service_type == ServiceType.ACTIVITY:
+        if service_type == ServiceType.HOTEL:
+            # Trả lại các đêm đã giữ trong RoomInventory
+            for detail in RoomBookingDetail.objects.filter(booking=booking):
+                detail.release_inventory()
+
+        elif service_type == ServiceType.FLIGHT:
+            # Trả lại ghế đang giữ / đã xác nhận của các chặng
+            release_holds(booking_id=booking.id)
+
+        elif service_type == ServiceType.ACTIVITY:
             adult_quantity_booking = getattr(
                 getattr(booking, "activity_date_detail", None),
                 "adult_quantity_booking",
@@ -550,20 +622,27 @@ class BookingViewSet(viewsets.ModelViewSet):
                 old_detail = old_details.first()  # Lấy detail đầu tiên làm mẫu
 
                 # Tạo 1 bản ghi RoomBookingDetail với room_count = num_rooms
-                new_detail = RoomBookingDetail.objects.create(
-                    booking=new_booking,
-                    room=old_detail.room,
-                    check_in=old_detail.check_in,
-                    check_out=old_detail.check_out,
-                    num_guests=old_detail.num_guests,
-                    owner_hotel=old_detail.owner_hotel,
-                    room_type=(
-                        old_detail.room.room_type
-                        if old_detail.room
-                        else (old_detail.room_type or "N/A")
-                    ),
-                    room_count=num_rooms,  # Sử dụng num_rooms
-                )
+                try:
+                    new_detail = RoomBookingDetail.objects.create(
+                        booking=new_booking,
+                        room=old_detail.room,
+                        check_in=old_detail.check_in,
+                        check_out=old_detail.check_out,
+                        num_guests=old_detail.num_guests,
+                        owner_hotel=old_detail.owner_hotel,
+                        room_type=(
+                            old_detail.room.room_type
+                            if old_detail.room
+                            else (old_detail.room_type or "N/A")
+                        ),
+                        room_count=num_rooms,  # Sử dụng num_rooms
+                    )
+                except RoomsUnavailable as e:
+                    new_booking.delete()
+                    return Response(
+                        {"isSuccess": False, "message": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
                 new_details = [new_detail]
 
                 new_booking.service_ref_ids = [d.id for d in new_details]
@@ -629,19 +708,29 @@ class BookingViewSet(viewsets.ModelViewSet):
             old_details = FlightBookingDetail.objects.filter(booking=old_booking)
             if old_details.exists():
                 new_details = []
-                for old_detail in old_details:
-                    new_detail_data = {
-                        "booking": new_booking,
-                        "flight": old_detail.flight,
-                    }
-                    for field in old_detail._meta.fields:
-                        if field.name not in ["id", "booking", "flight"]:
-                            if hasattr(old_detail, field.name):
-                                new_detail_data[field.name] = getattr(
-                                    old_detail, field.name
-                                )
-                    new_detail = FlightBookingDetail.objects.create(**new_detail_data)
-                    new_details.append(new_detail)
+                try:
+                    with transaction.atomic():
+                        for old_detail in old_details:
+                            new_detail_data = {
+                                "booking": new_booking,
+                                "flight": old_detail.flight,
+                            }
+                            for field in old_detail._meta.fields:
+                                if field.name not in ["id", "booking", "flight"]:
+                                    if hasattr(old_detail, field.name):
+                                        new_detail_data[field.name] = getattr(
+                                            old_detail, field.name
+                                        )
+                            new_detail = FlightBookingDetail.objects.create(
+                                **new_detail_data
+                            )
+                            new_details.append(new_detail)
+                except SeatsUnavailable as e:
+                    new_booking.delete()
+                    return Response(
+                        {"isSuccess": False, "message": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
                 new_booking.service_ref_ids = [d.id for d in new_details]
                 new_booking.save(update_fields=["service_ref_ids"])
                 data = FlightBookingDetailSerializer(new_details, many=True).data
@@ -42,41 +42,10 @@ class Car(models.Model):
         self.save(update_fields=["total_weighted_score"])
 
     def get_active_promotion(self):
-        from django.utils import timezone
-
-        now = timezone.now()
-        car_promotions = self.promotions.select_related("promotion").all()
-
-        # Chỉ lấy những promotion đang active
-        active_promos = [
-            cp
-            for cp in car_promotions
-            if cp.promotion.is_active
-            and cp.promotion.start_date <= now <= cp.promotion.end_date
-        ]
-
-        if not active_promos:
-            return None
-
-        # Lấy promotion có discount lớn nhất
-        best_promo = max(
-            active_promos,
-            key=lambda cp: (
-                cp.discount_percent
-                if cp.discount_percent is not None
-                else (cp.promotion.discount_percent or 0)
-            ),
-        )
+        """Promotion active có discount lớn nhất (xem promotions.services)"""
+        from promotions.services import get_active_promotion
 
-        promo = best_promo.promotion
-        return {
-            "id": promo.id,
-            "title": promo.title,
-            "discount_percent": best_promo.discount_percent or promo.discount_percent,
-            "discount_amount": best_promo.discount_amount or promo.discount_amount,
-            "start_date": promo.start_date,
-            "end_date": promo.end_date,
-        }
+        return get_active_promotion(self)
 
 
 class UserCarInteraction(models.Model):
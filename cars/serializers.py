@@ -1,5 +1,6 @@
 from django.utils import timezone
 from rest_framework import serializers
+from promotions.services import ActivePromotionListSerializer
 from .models import Car, CarBookingDetail, UserCarInteraction
 from accounts.serializers import UserSerializer
 from accounts.models import CustomUser
@@ -12,6 +13,7 @@ class CarSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Car
+        list_serializer_class = ActivePromotionListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
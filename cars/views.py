@@ -9,11 +9,9 @@ from .serializers import (
     UserCarInteractionSerializer,
     UserCarInteractionCreateSerializer,
 )
-from rest_framework.pagination import PageNumberPagination
+from agoda_be.pagination import WindowCountPagination
 from django.db.models import Q
 from rest_framework.response import Response
-import math
-from django.core.paginator import Paginator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -27,120 +25,8 @@ import re
 
 
 # Phân trang
-class CarPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-        user_id = request.query_params.get("user_id")
-        driver_status = request.query_params.get("driver_status")
-        driver_area_name = request.query_params.get("driver_area_name")
-        min_avg_star = request.query_params.get("min_avg_star")
-        max_avg_star = request.query_params.get("max_avg_star")
-        min_price_per_km = request.query_params.get("min_price_per_km")
-        max_price_per_km = request.query_params.get("max_price_per_km")
-        min_avg_speed = request.query_params.get("min_avg_speed")
-        max_avg_speed = request.query_params.get("max_avg_speed")
-        min_capacity = request.query_params.get("min_capacity")
-        max_capacity = request.query_params.get("max_capacity")
-        min_luggage = request.query_params.get("min_luggage")
-        max_luggage = request.query_params.get("max_luggage")
-
-        if user_id:
-            self.filters["user_id"] = user_id
-        if driver_status:
-            self.filters["user__driver_status"] = driver_status
-        if driver_area_name:
-            driver_area_name = driver_area_name.replace("\u00a0", " ")
-            normalized_name = re.sub(r"\s+", " ", driver_area_name.strip())
-            self.filters["user__driver_area__name__icontains"] = normalized_name
-
-        if min_avg_star:
-            self.filters["avg_star__gte"] = min_avg_star
-        if max_avg_star:
-            self.filters["avg_star__lte"] = max_avg_star
-
-        if min_price_per_km:
-            self.filters["price_per_km__gte"] = min_price_per_km
-        if max_price_per_km:
-            self.filters["price_per_km__lte"] = max_price_per_km
-
-        if min_avg_speed:
-            self.filters["avg_speed__gte"] = min_avg_speed
-        if max_avg_speed:
-            self.filters["avg_speed__lte"] = max_avg_speed
-
-        if min_capacity:
-            self.filters["capacity__gte"] = min_capacity
-        if max_capacity:
-            self.filters["capacity__lte"] = max_capacity
-
-        if min_luggage:
-            self.filters["luggage__gte"] = min_luggage
-        if max_luggage:
-            self.filters["luggage__lte"] = max_luggage
-
-        for field, value in request.query_params.items():
-            if field not in [
-                "current",
-                "pageSize",
-                "user_id",
-                "driver_status",
-                "driver_area_name",
-                "recommended",
-                "min_avg_star",
-                "max_avg_star",
-                "min_price_per_km",
-                "max_price_per_km",
-                "min_avg_speed",
-                "max_avg_speed",
-                "min_capacity",
-                "max_capacity",
-                "min_luggage",
-                "max_luggage",
-                "sort",
-            ]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-        total_count = Car.objects.filter(**self.filters).count()
-        total_pages = math.ceil(total_count / self.page_size)
-
-        self.filters.clear()
-
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched cars successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
-        )
+class CarPagination(WindowCountPagination):
+    message = "Fetched cars successfully!"
 
 
 # API GET danh sách xe (với phân trang)
@@ -285,19 +171,8 @@ class CarListView(generics.ListAPIView):
         elif order_fields:
             queryset = queryset.order_by(*order_fields)
 
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
-
-        # Áp dụng phân trang
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(current)
-
-        return page
+        # Phân trang do pagination_class đảm nhận
+        return queryset
 
 
 # API GET chi tiết xe
@@ -16,3 +16,20 @@ class City(models.Model):
 
     def __str__(self):
         return f"{self.name}, {self.country.name}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "name" in update_fields:
+            from locations.search import reindex_city
+
+            # Tên city nằm trong chỉ mục của hotel/airport/activity thuộc city này
+            reindex_city(self.pk)
+
+    def delete(self, *args, **kwargs):
+        city_id = self.pk
+        result = super().delete(*args, **kwargs)
+        from locations.search import reindex
+
+        reindex("city", [city_id])
+        return result
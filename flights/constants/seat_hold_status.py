@@ -0,0 +1,7 @@
+from django.db import models
+
+
+class SeatHoldStatus(models.IntegerChoices):
+    HELD = 1, "Held"
+    CONFIRMED = 2, "Confirmed"
+    RELEASED = 3, "Released"
@@ -0,0 +1,245 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from promotions.services import apply_discount, resolve_active_promotions
+
+MAX_CALENDAR_DAYS = 90
+
+
+def _key_q(keys, prefix=""):
+    """Q khớp 1 trong các key (origin_airport_id, destination_airport_id, date)."""
+    q = Q(pk__in=[])
+    for origin, destination, date in keys:
+        q |= Q(
+            **{
+                f"{prefix}origin_airport_id": origin,
+                f"{prefix}destination_airport_id": destination,
+                f"{prefix}departure_date": date,
+            }
+        )
+    return q
+
+
+def _promotion_changes(flight_ids, now):
+    """{flight_id: thời điểm sớm nhất sau now có promotion bắt đầu / hết hạn}."""
+    from promotions.models import FlightPromotion
+
+    changes = {}
+    links = FlightPromotion.objects.filter(
+        flight_id__in=flight_ids,
+        promotion__is_active=True,
+        promotion__end_date__gt=now,
+    ).values_list("flight_id", "promotion__start_date", "promotion__end_date")
+    for flight_id, start_date, end_date in links:
+        moment = start_date if start_date > now else end_date
+        if flight_id not in changes or moment < changes[flight_id]:
+            changes[flight_id] = moment
+    return changes
+
+
+def refresh(keys):
+    """
+    Tính lại giá thấp nhất (1 khách, theo từng hạng ghế còn chỗ, đã nhân
+    multiplier và trừ promotion đang active) của các key
+    (origin_airport_id, destination_airport_id, date).
+    """
+    from flights.models import Flight, FlightFare, SeatClassPricing
+
+    keys = {key for key in keys if key and None not in key}
+    if not keys:
+        return 0
+
+    now = timezone.now()
+    rows = list(
+        SeatClassPricing.objects.filter(
+            _key_q(keys, "flight__"), available_seats__gt=0
+        ).values_list(
+            "flight_id",
+            "seat_class",
+            "multiplier",
+            "flight__base_price",
+            "flight__origin_airport_id",
+            "flight__destination_airport_id",
+            "flight__departure_date",
+        )
+    )
+    flight_ids = {row[0] for row in rows}
+    promotions = resolve_active_promotions(Flight, flight_ids, now)
+    # Giá tính sẵn hết đúng khi 1 promotion bắt đầu / kết thúc: đọc lại khi quá hạn
+    changes = _promotion_changes(flight_ids, now) if flight_ids else {}
+
+    fares = {}
+    for flight_id, seat_class, multiplier, base_price, *key in rows:
+        total = float(base_price) * multiplier
+        price = total - apply_discount(total, promotions.get(flight_id))
+        fare = fares.setdefault((*key, seat_class), [price, 0, None])
+        fare[0] = min(fare[0], price)
+        fare[1] += 1
+        change = changes.get(flight_id)
+        if change is not None and (fare[2] is None or change < fare[2]):
+            fare[2] = change
+
+    # Ghi đè theo khóa unique (upsert) thay vì xóa rồi chèn lại: 2 lượt tính lại
+    # đồng thời cùng tuyến + ngày không va nhau trên flight_fare_route_class_date_uniq
+    upsert = {
+        "update_conflicts": True,
+        "update_fields": ["min_price", "flight_count", "expires_at", "updated_at"],
+    }
+    if connection.features.supports_update_conflicts_with_target:
+        upsert["unique_fields"] = [
+            "origin_airport",
+            "destination_airport",
+            "departure_date",
+            "seat_class",
+        ]
+    classes = {}
+    for origin, destination, date, seat_class in fares:
+        classes.setdefault((origin, destination, date), []).append(seat_class)
+    # Hạng ghế không còn chuyến còn chỗ: xóa dòng của hạng đó
+    stale = Q(pk__in=[])
+    for key in keys:
+        stale |= _key_q([key]) & ~Q(seat_class__in=classes.get(key, []))
+
+    with transaction.atomic():
+        FlightFare.objects.bulk_create(
+            [
+                FlightFare(
+                    origin_airport_id=origin,
+                    destination_airport_id=destination,
+                    departure_date=date,
+                    seat_class=seat_class,
+                    min_price=round(price, 2),
+                    flight_count=count,
+                    expires_at=expires_at,
+                )
+                for (origin, destination, date, seat_class), (
+                    price,
+                    count,
+                    expires_at,
+                ) in fares.items()
+            ],
+            batch_size=500,
+            **upsert,
+        )
+        FlightFare.objects.filter(stale).delete()
+    return len(fares)
+
+
+def refresh_flights(flight_ids):
+    """Tính lại các key mà các flight đang thuộc về."""
+    from flights.models import Flight
+
+    flight_ids = [pk for pk in flight_ids if pk is not None]
+    if not flight_ids:
+        return 0
+    return refresh(
+        Flight.objects.filter(id__in=flight_ids).values_list(
+            "origin_airport_id", "destination_airport_id", "departure_date"
+        )
+    )
+
+
+def rebuild(since=None):
+    """Dựng lại toàn bộ bảng giá (hoặc từ ngày `since`), theo từng lô key."""
+    from flights.models import Flight, FlightFare
+
+    flights = Flight.objects.filter(departure_date__isnull=False)
+    stale = FlightFare.objects.all()
+    if since:
+        flights = flights.filter(departure_date__gte=since)
+        stale = stale.filter(departure_date__gte=since)
+    stale.delete()
+
+    keys = list(
+        flights.values_list(
+            "origin_airport_id", "destination_airport_id", "departure_date"
+        ).distinct()
+    )
+    total = 0
+    for start in range(0, len(keys), 200):
+        total += refresh(keys[start : start + 200])
+    return total
+
+
+def _read(queryset):
+    """Đọc bảng giá; dòng quá hạn (promotion vừa bắt đầu / kết thúc) được tính lại."""
+    fields = (
+        "origin_airport_id",
+        "destination_airport_id",
+        "departure_date",
+        "min_price",
+        "flight_count",
+        "expires_at",
+    )
+    fares = list(queryset.values(*fields))
+    now = timezone.now()
+    expired = {
+        (
+            fare["origin_airport_id"],
+            fare["destination_airport_id"],
+            fare["departure_date"],
+        )
+        for fare in fares
+        if fare["expires_at"] is not None and fare["expires_at"] <= now
+    }
+    if expired:
+        refresh(expired)
+        fares = list(queryset.values(*fields))
+    return fares
+
+
+def calendar(origin, destination, seat_class, start, days):
+    """
+    Giá thấp nhất mỗi ngày trong [start, start + days) của 1 tuyến: 1 lần đọc theo
+    index (origin, destination, seat_class, date).
+    """
+    from flights.models import FlightFare
+
+    fares = _read(
+        FlightFare.objects.filter(
+            origin_airport_id=origin,
+            destination_airport_id=destination,
+            seat_class=seat_class,
+            departure_date__range=(start, start + timedelta(days=days - 1)),
+        )
+    )
+    by_date = {fare["departure_date"]: fare for fare in fares}
+    return [
+        {
+            "date": day,
+            "min_price": by_date[day]["min_price"] if day in by_date else None,
+            "flight_count": by_date[day]["flight_count"] if day in by_date else 0,
+        }
+        for day in (start + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def destinations(origin, seat_class, start, days):
+    """
+    Đồ thị tuyến của 1 sân bay đi: các điểm đến có chuyến trong khoảng ngày, kèm giá
+    thấp nhất và ngày rẻ nhất, đọc từ cùng bảng giá.
+    """
+    from flights.models import FlightFare
+
+    cheapest = {}
+    for fare in _read(
+        FlightFare.objects.filter(
+            origin_airport_id=origin,
+            seat_class=seat_class,
+            departure_date__range=(start, start + timedelta(days=days - 1)),
+        )
+    ):
+        current = cheapest.get(fare["destination_airport_id"])
+        if current is None or fare["min_price"] < current["min_price"]:
+            cheapest[fare["destination_airport_id"]] = fare
+    return [
+        {
+            "destination_airport_id": fare["destination_airport_id"],
+            "date": fare["departure_date"],
+            "min_price": fare["min_price"],
+        }
+        for fare in sorted(cheapest.values(), key=lambda fare: fare["min_price"])
+    ]
@@ -0,0 +1,225 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from flights.constants.seat_hold_status import SeatHoldStatus
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_CHUNK_SIZE = 500
+# Stripe chỉ nhận expires_at của Checkout Session từ 30 phút sau khi tạo (+ 1 phút dự phòng)
+CHECKOUT_MIN_SECONDS = 31 * 60
+
+
+class SeatsUnavailable(Exception):
+    """Hạng ghế không còn đủ chỗ cho số khách yêu cầu."""
+
+
+def _take(seat_class_id, seats):
+    """UPDATE ... SET available_seats = available_seats - n WHERE available_seats >= n."""
+    from flights.models import SeatClassPricing
+
+    return SeatClassPricing.objects.filter(
+        pk=seat_class_id, available_seats__gte=seats
+    ).update(available_seats=F("available_seats") - seats)
+
+
+def _refresh_fares_if(seat_class, **condition):
+    """
+    Hạng ghế vừa hết / vừa có lại chỗ: lịch giá (flights.fares) đổi theo. Tính lại
+    sau khi transaction của booking commit: bảng giá chỉ là cache, lỗi ở đây không
+    được làm hỏng booking.
+    """
+    from flights.fares import refresh_flights
+    from flights.models import SeatClassPricing
+
+    if SeatClassPricing.objects.filter(pk=seat_class.pk, **condition).exists():
+        flight_id = seat_class.flight_id
+        transaction.on_commit(lambda: refresh_flights([flight_id]), robust=True)
+
+
+def reserve(seat_class, seats):
+    """
+    Trừ `seats` ghế của seat_class bằng 1 câu UPDATE có điều kiện, không đọc trước
+    nên các request đồng thời không bán quá số ghế. Không đủ chỗ -> SeatsUnavailable.
+    """
+    if seats <= 0:
+        return
+    if not _take(seat_class.pk, seats):
+        # Ghế có thể đang nằm trong hold đã hết hạn mà chưa được trả
+        if not expire_holds(seat_class_id=seat_class.pk) or not _take(
+            seat_class.pk, seats
+        ):
+            seat_class.refresh_from_db(fields=["available_seats"])
+            raise SeatsUnavailable(
+                f"Only {seat_class.available_seats} seats available in "
+                f"{seat_class.seat_class}"
+            )
+    _refresh_fares_if(seat_class, available_seats=0)
+
+
+def release(seat_class, seats):
+    """Trả ghế (không vượt quá capacity)."""
+    from flights.models import SeatClassPricing
+
+    if seats <= 0:
+        return
+    SeatClassPricing.objects.filter(pk=seat_class.pk).update(
+        available_seats=Least(F("available_seats") + seats, F("capacity"))
+    )
+    _refresh_fares_if(seat_class, available_seats__lte=seats)
+
+
+def hold(booking_detail, seat_class, ttl=None):
+    """
+    Giữ ghế cho 1 FlightBookingDetail vừa tạo. Ghế bị trừ ngay; nếu booking không
+    được thanh toán trước expires_at, expire_holds() trả ghế lại.
+    """
+    from flights.models import SeatHold
+
+    ttl = settings.FLIGHT_SEAT_HOLD_TTL if ttl is None else ttl
+    reserve(seat_class, booking_detail.num_passengers)
+    return SeatHold.objects.create(
+        booking_detail=booking_detail,
+        seat_class=seat_class,
+        seats=booking_detail.num_passengers,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+
+
+def _release_holds(holds):
+    """Đánh dấu RELEASED rồi trả ghế, gộp 1 câu UPDATE cho mỗi hạng ghế."""
+    from flights.models import SeatHold
+
+    if not holds:
+        return
+    SeatHold.objects.filter(id__in=[h.id for h in holds]).update(
+        status=SeatHoldStatus.RELEASED, updated_at=timezone.now()
+    )
+    seats = defaultdict(int)
+    seat_classes = {}
+    for h in holds:
+        seats[h.seat_class_id] += h.seats
+        seat_classes[h.seat_class_id] = h.seat_class
+    for seat_class_id, count in seats.items():
+        release(seat_classes[seat_class_id], count)
+
+
+def checkout_holds(booking_id):
+    """
+    Giữ ghế của booking cho tới khi Checkout Session hết hạn; trả về hạn đó (None
+    nếu booking không giữ ghế). Hold còn đủ lâu thì giữ nguyên hạn, để request pay
+    gửi lại tạo session với đúng tham số cũ. Hold đã bị trả thì giữ lại nếu còn chỗ,
+    không thì SeatsUnavailable (không mở thanh toán cho ghế đã mất).
+    """
+    from flights.models import SeatHold
+
+    now = timezone.now()
+    with transaction.atomic():
+        holds = list(
+            SeatHold.objects.select_for_update(of=("self",))
+            .select_related("seat_class")
+            .filter(booking_detail__booking_id=booking_id)
+            .exclude(status=SeatHoldStatus.CONFIRMED)
+        )
+        if not holds:
+            return None
+        held_until = [h.expires_at for h in holds if h.status == SeatHoldStatus.HELD]
+        if len(held_until) == len(holds) and min(held_until) >= now + timedelta(
+            seconds=CHECKOUT_MIN_SECONDS
+        ):
+            return min(held_until)
+
+        expires_at = now + timedelta(
+            seconds=max(settings.FLIGHT_SEAT_HOLD_TTL, CHECKOUT_MIN_SECONDS)
+        )
+        for released in holds:
+            if released.status == SeatHoldStatus.RELEASED:
+                reserve(released.seat_class, released.seats)
+        SeatHold.objects.filter(id__in=[h.id for h in holds]).update(
+            status=SeatHoldStatus.HELD, expires_at=expires_at, updated_at=now
+        )
+    return expires_at
+
+
+def confirm_holds(booking_id):
+    """
+    Booking đã thanh toán / xác nhận: giữ ghế vĩnh viễn. Hold đã hết hạn trước khi
+    thanh toán tới thì giữ lại ghế nếu còn chỗ; 1 chặng không còn chỗ thì không
+    chặng nào được xác nhận và SeatsUnavailable được raise để caller hủy / hoàn tiền.
+    """
+    from flights.models import SeatHold
+
+    holds = SeatHold.objects.filter(booking_detail__booking_id=booking_id)
+    with transaction.atomic():
+        confirmed = holds.filter(status=SeatHoldStatus.HELD).update(
+            status=SeatHoldStatus.CONFIRMED,
+            expires_at=None,
+            updated_at=timezone.now(),
+        )
+        for expired in holds.filter(status=SeatHoldStatus.RELEASED).select_related(
+            "seat_class"
+        ):
+            try:
+                reserve(expired.seat_class, expired.seats)
+            except SeatsUnavailable as e:
+                logger.warning(
+                    f"Booking {booking_id} paid after its seat hold expired: {e}"
+                )
+                raise
+            SeatHold.objects.filter(pk=expired.pk).update(
+                status=SeatHoldStatus.CONFIRMED,
+                expires_at=None,
+                updated_at=timezone.now(),
+            )
+            confirmed += 1
+    return confirmed
+
+
+def release_holds(booking_id=None, booking_detail_id=None):
+    """Hủy booking / chi tiết booking: trả lại ghế đang giữ hoặc đã xác nhận."""
+    from flights.models import SeatHold
+
+    queryset = SeatHold.objects.select_for_update(of=("self",)).select_related(
+        "seat_class"
+    ).filter(status__in=[SeatHoldStatus.HELD, SeatHoldStatus.CONFIRMED])
+    if booking_id is not None:
+        queryset = queryset.filter(booking_detail__booking_id=booking_id)
+    if booking_detail_id is not None:
+        queryset = queryset.filter(booking_detail_id=booking_detail_id)
+    with transaction.atomic():
+        holds = list(queryset)
+        _release_holds(holds)
+    return len(holds)
+
+
+def expire_holds(now=None, seat_class_id=None, chunk_size=EXPIRE_CHUNK_SIZE):
+    """
+    Trả ghế của các hold HELD đã quá expires_at, theo lô. Hold đang bị khóa (vd.
+    đang được xác nhận) được bỏ qua ở lượt này. Trả về số hold đã trả ghế.
+    """
+    from flights.models import SeatHold
+
+    now = now or timezone.now()
+    total = 0
+    while True:
+        queryset = SeatHold.objects.select_for_update(
+            skip_locked=True, of=("self",)
+        ).filter(status=SeatHoldStatus.HELD, expires_at__lte=now)
+        if seat_class_id is not None:
+            queryset = queryset.filter(seat_class_id=seat_class_id)
+        with transaction.atomic():
+            holds = list(queryset.select_related("seat_class").order_by("id")[:chunk_size])
+            _release_holds(holds)
+        total += len(holds)
+        if len(holds) < chunk_size:
+            break
+    if total:
+        logger.info(f"Released {total} expired seat hold(s)")
+    return total
@@ -0,0 +1,401 @@
+import heapq
+import itertools
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from rest_framework.exceptions import ValidationError
+
+from promotions.services import apply_discount, resolve_active_promotions
+
+# Quy tắc nối chuyến (self-transfer giữa các Flight)
+MIN_CONNECTION_MINUTES = 60
+MAX_CONNECTION_HOURS = 12
+MAX_FLIGHTS_PER_SEGMENT = 3  # tối đa 2 lần nối chuyến trong 1 chặng
+
+# Giới hạn tìm kiếm
+MAX_SEGMENTS = 6
+MAX_RESULTS = 50
+MAX_EXPANSIONS = 20000
+
+SORT_PRICE = "price"
+SORT_DURATION = "duration"
+
+
+class Edge:
+    """1 Flight trong đồ thị tuyến bay: cạnh origin -> destination (đã tính giá)."""
+
+    __slots__ = (
+        "flight_id",
+        "airline_id",
+        "origin",
+        "destination",
+        "departure",
+        "arrival",
+        "departure_date",
+        "stops",
+        "price",
+    )
+
+    def __init__(
+        self,
+        flight_id,
+        airline_id,
+        origin,
+        destination,
+        departure,
+        arrival,
+        departure_date,
+        stops,
+        price,
+    ):
+        self.flight_id = flight_id
+        self.airline_id = airline_id
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.departure_date = departure_date
+        self.stops = stops
+        self.price = price
+
+
+class RouteGraph:
+    """
+    Đồ thị tuyến bay trong bộ nhớ: mỗi sân bay -> các Flight khởi hành từ đó, sắp
+    theo giờ bay. Chỉ gồm Flight còn đủ ghế hạng seat_class cho số khách, giá đã
+    nhân multiplier, số khách và trừ promotion đang active.
+    """
+
+    def __init__(self, edges):
+        self.departures = {}
+        for edge in sorted(edges, key=lambda e: (e.departure, e.flight_id)):
+            self.departures.setdefault(edge.origin, []).append(edge)
+        self.times = {
+            airport: [edge.departure for edge in edges]
+            for airport, edges in self.departures.items()
+        }
+
+    @classmethod
+    def load(cls, dates, seat_class, passengers):
+        """1 query SeatClassPricing + 1 query promotion cho mọi chuyến trong khoảng."""
+        from flights.models import Flight, SeatClassPricing
+
+        extra_days = (MAX_FLIGHTS_PER_SEGMENT - 1) * MAX_CONNECTION_HOURS // 24 + 1
+        rows = list(
+            SeatClassPricing.objects.filter(
+                seat_class=seat_class,
+                available_seats__gte=passengers,
+                flight__first_departure_time__isnull=False,
+                flight__departure_date__gte=min(dates),
+                flight__departure_date__lte=max(dates) + timedelta(days=extra_days),
+            ).values_list(
+                "flight_id",
+                "multiplier",
+                "flight__airline_id",
+                "flight__base_price",
+                "flight__origin_airport_id",
+                "flight__destination_airport_id",
+                "flight__first_departure_time",
+                "flight__last_arrival_time",
+                "flight__departure_date",
+                "flight__stops",
+            )
+        )
+        promotions = resolve_active_promotions(Flight, [row[0] for row in rows])
+        edges = []
+        for (
+            flight_id,
+            multiplier,
+            airline_id,
+            base_price,
+            origin,
+            destination,
+            departure,
+            arrival,
+            departure_date,
+            stops,
+        ) in rows:
+            total = float(base_price) * multiplier * passengers
+            price = total - apply_discount(total, promotions.get(flight_id))
+            edges.append(
+                Edge(
+                    flight_id,
+                    airline_id,
+                    origin,
+                    destination,
+                    departure,
+                    arrival,
+                    departure_date,
+                    stops,
+                    price,
+                )
+            )
+        return cls(edges)
+
+    def between(self, airport, earliest, latest):
+        """Các Flight rời airport trong [earliest, latest]."""
+        edges = self.departures.get(airport, [])
+        times = self.times.get(airport, [])
+        return edges[bisect_left(times, earliest) : bisect_right(times, latest)]
+
+
+class Option:
+    """1 phương án cho 1 chặng: chuỗi Flight nối nhau từ điểm đi tới điểm đến."""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.price = sum(edge.price for edge in edges)
+        self.departure = edges[0].departure
+        self.arrival = edges[-1].arrival
+        self.duration = int((self.arrival - self.departure).total_seconds() // 60)
+
+    def cost(self, sort):
+        if sort == SORT_DURATION:
+            return (self.duration, self.price)
+        return (self.price, self.duration)
+
+
+def search_segment(graph, origin, destination, date, sort, limit):
+    """
+    Best-first trên đồ thị: luôn mở rộng đường đi có chi phí (giá hoặc thời gian)
+    nhỏ nhất; chi phí không giảm khi nối thêm chuyến nên các phương án tới đích
+    được lấy ra đúng theo thứ tự tốt nhất. Dừng khi đủ `limit` hoặc hết
+    MAX_EXPANSIONS lượt mở rộng.
+    """
+    counter = itertools.count()
+    heap = []
+    for edge in graph.departures.get(origin, []):
+        if edge.departure_date != date:
+            continue
+        option = Option([edge])
+        heapq.heappush(heap, (option.cost(sort), next(counter), option))
+
+    results = []
+    expansions = 0
+    while heap and len(results) < limit and expansions < MAX_EXPANSIONS:
+        _, _, option = heapq.heappop(heap)
+        expansions += 1
+        last = option.edges[-1]
+        if last.destination == destination:
+            results.append(option)
+            continue
+        if len(option.edges) >= MAX_FLIGHTS_PER_SEGMENT:
+            continue
+
+        visited = {edge.origin for edge in option.edges}
+        for edge in graph.between(
+            last.destination,
+            last.arrival + timedelta(minutes=MIN_CONNECTION_MINUTES),
+            last.arrival + timedelta(hours=MAX_CONNECTION_HOURS),
+        ):
+            if edge.destination in visited:
+                continue  # không quay lại sân bay đã đi qua
+            extended = Option(option.edges + [edge])
+            heapq.heappush(heap, (extended.cost(sort), next(counter), extended))
+    return results
+
+
+def combine(options_per_segment, sort, limit):
+    """
+    K tổ hợp tốt nhất (1 phương án mỗi chặng) theo tổng chi phí: duyệt best-first
+    trên bộ chỉ số, mỗi chặng đã sắp tăng dần. Chặng sau phải khởi hành sau khi
+    chặng trước hạ cánh ít nhất MIN_CONNECTION_MINUTES.
+    """
+    if not options_per_segment or not all(options_per_segment):
+        return []
+
+    def cost(indexes):
+        costs = [
+            options[i].cost(sort) for options, i in zip(options_per_segment, indexes)
+        ]
+        return tuple(sum(values) for values in zip(*costs))
+
+    start = (0,) * len(options_per_segment)
+    heap = [(cost(start), start)]
+    seen = {start}
+    results = []
+    expansions = 0
+    while heap and len(results) < limit and expansions < MAX_EXPANSIONS:
+        _, indexes = heapq.heappop(heap)
+        expansions += 1
+        chosen = [options[i] for options, i in zip(options_per_segment, indexes)]
+        if all(
+            later.departure
+            >= earlier.arrival + timedelta(minutes=MIN_CONNECTION_MINUTES)
+            for earlier, later in zip(chosen, chosen[1:])
+        ):
+            results.append(chosen)
+
+        for position, options in enumerate(options_per_segment):
+            if indexes[position] + 1 >= len(options):
+                continue
+            following = (
+                indexes[:position] + (indexes[position] + 1,) + indexes[position + 1 :]
+            )
+            if following not in seen:
+                seen.add(following)
+                heapq.heappush(heap, (cost(following), following))
+    return results
+
+
+def search_itineraries(
+    segments, passengers=1, seat_class="economy", sort=SORT_PRICE, limit=10
+):
+    """
+    segments: [(origin_airport_id, destination_airport_id, date)], 1 phần tử cho
+    1 chiều, 2 cho khứ hồi, nhiều hơn cho nhiều chặng. Trả về tối đa `limit`
+    hành trình, mỗi hành trình là list Option (1 Option mỗi chặng).
+    """
+    graph = RouteGraph.load([date for _, _, date in segments], seat_class, passengers)
+    # Lấy dư phương án mỗi chặng để còn tổ hợp hợp lệ khi có chặng bị trùng giờ
+    per_segment = limit if len(segments) == 1 else min(limit * 3, MAX_RESULTS * 2)
+    options_per_segment = [
+        search_segment(graph, origin, destination, date, sort, per_segment)
+        for origin, destination, date in segments
+    ]
+    return combine(options_per_segment, sort, limit)
+
+
+def serialize_itineraries(itineraries, passengers, seat_class):
+    """Dữ liệu trả về cho client: 3 query (legs, sân bay, hãng) cho cả kết quả."""
+    from airlines.models import Airline
+    from airports.models import Airport
+    from flights.models import FlightLeg
+
+    edges = [
+        edge for options in itineraries for option in options for edge in option.edges
+    ]
+    legs = {}
+    flight_legs = FlightLeg.objects.filter(
+        flight_id__in={edge.flight_id for edge in edges}
+    ).order_by("departure_time", "id")
+    for leg in flight_legs:
+        legs.setdefault(leg.flight_id, []).append(
+            {
+                "id": leg.id,
+                "flight_code": leg.flight_code,
+                "departure_airport_id": leg.departure_airport_id,
+                "arrival_airport_id": leg.arrival_airport_id,
+                "departure_time": leg.departure_time,
+                "arrival_time": leg.arrival_time,
+                "duration_minutes": leg.duration_minutes,
+            }
+        )
+    airport_ids = {
+        leg[key]
+        for flight_legs in legs.values()
+        for leg in flight_legs
+        for key in ("departure_airport_id", "arrival_airport_id")
+    }
+    airports = {
+        airport["id"]: airport
+        for airport in Airport.objects.filter(id__in=airport_ids).values(
+            "id", "code", "name"
+        )
+    }
+    airlines = {
+        airline["id"]: airline
+        for airline in Airline.objects.filter(
+            id__in={edge.airline_id for edge in edges}
+        ).values("id", "code", "name", "logo")
+    }
+
+    def segment(option):
+        return {
+            "origin_airport_id": option.edges[0].origin,
+            "destination_airport_id": option.edges[-1].destination,
+            "departure_time": option.departure,
+            "arrival_time": option.arrival,
+            "duration": option.duration,
+            "connections": len(option.edges) - 1,
+            "price": round(option.price, 2),
+            "flights": [
+                {
+                    "flight_id": edge.flight_id,
+                    "airline": airlines.get(edge.airline_id),
+                    "departure_time": edge.departure,
+                    "arrival_time": edge.arrival,
+                    "stops": edge.stops,
+                    "price": round(edge.price, 2),
+                    "legs": legs.get(edge.flight_id, []),
+                }
+                for edge in option.edges
+            ],
+        }
+
+    return {
+        "passengers": passengers,
+        "seat_class": seat_class,
+        "airports": airports,
+        "itineraries": [
+            {
+                "total_price": round(sum(option.price for option in options), 2),
+                "total_duration": sum(option.duration for option in options),
+                "segments": [segment(option) for option in options],
+            }
+            for options in itineraries
+        ],
+    }
+
+
+def _parse_segment(origin, destination, date):
+    try:
+        date = datetime.strptime(date, "%Y-%m-%d").date()
+        return int(origin), int(destination), date
+    except (TypeError, ValueError):
+        raise ValidationError("Each segment needs origin, destination and date")
+
+
+def parse_search_params(query_params):
+    """
+    Query params -> tham số cho search_itineraries:
+    - 1 chiều / khứ hồi: origin, destination, departureDate (+ returnDate);
+    - nhiều chặng: segments[]=origin,destination,YYYY-MM-DD (lặp lại theo thứ tự);
+    - passengers (mặc định 1), seatClass (mặc định economy),
+      sortBy=price|duration, limit (mặc định 10, tối đa MAX_RESULTS).
+    """
+    from flights.models import SeatClassPricing
+
+    raw_segments = query_params.getlist("segments[]")
+    if raw_segments:
+        segments = [
+            _parse_segment(*(raw.split(",") + [None] * 3)[:3]) for raw in raw_segments
+        ]
+    else:
+        origin = query_params.get("origin")
+        destination = query_params.get("destination")
+        departure_date = query_params.get("departureDate")
+        segments = [_parse_segment(origin, destination, departure_date)]
+        return_date = query_params.get("returnDate")
+        if return_date:
+            segments.append(_parse_segment(destination, origin, return_date))
+    if len(segments) > MAX_SEGMENTS:
+        raise ValidationError(f"At most {MAX_SEGMENTS} segments are supported")
+    if any(origin == destination for origin, destination, _ in segments):
+        raise ValidationError("Origin and destination must differ")
+    if any(later[2] < earlier[2] for earlier, later in zip(segments, segments[1:])):
+        raise ValidationError("Segment dates must be in chronological order")
+
+    try:
+        passengers = int(query_params.get("passengers") or 1)
+        limit = int(query_params.get("limit") or 10)
+    except ValueError:
+        raise ValidationError("passengers and limit must be integers")
+    if passengers < 1 or limit < 1:
+        raise ValidationError("passengers and limit must be positive")
+
+    seat_class = query_params.get("seatClass") or "economy"
+    if seat_class not in dict(SeatClassPricing.FLIGHT_CLASSES):
+        raise ValidationError(f"Invalid seatClass: {seat_class}")
+
+    sort = (query_params.get("sortBy") or SORT_PRICE).split("_")[0]
+    if sort not in (SORT_PRICE, SORT_DURATION):
+        raise ValidationError(f"Invalid sortBy: {sort}")
+
+    return {
+        "segments": segments,
+        "passengers": passengers,
+        "seat_class": seat_class,
+        "sort": sort,
+        "limit": min(limit, MAX_RESULTS),
+    }
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flights.inventory import EXPIRE_CHUNK_SIZE, expire_holds
+
+
+class Command(BaseCommand):
+    help = "Trả lại ghế của các SeatHold đã hết hạn mà booking chưa được thanh toán"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=EXPIRE_CHUNK_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục thay vì 1 lượt"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=30.0, help="Số giây nghỉ giữa 2 lượt"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = expire_holds(chunk_size=options["chunk_size"])
+            if released:
+                self.stdout.write(f"Released {released} expired seat hold(s)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
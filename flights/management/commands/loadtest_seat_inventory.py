@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+
+from airlines.models import Airline
+from bookings.constants.service_type import ServiceType
+from bookings.models import Booking
+from flights.inventory import SeatsUnavailable
+from flights.models import Flight, FlightBookingDetail, SeatClassPricing
+
+
+class Command(BaseCommand):
+    help = (
+        "Đặt vé đồng thời vào 1 chuyến bay tạm có `--capacity` ghế và kiểm tra không "
+        "bán quá số ghế. Chạy trên MySQL / PostgreSQL (sqlite tuần tự hóa mọi lệnh ghi)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--capacity", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--passengers", type=int, default=1)
+        parser.add_argument(
+            "--keep", action="store_true", help="Giữ lại dữ liệu tạm sau khi chạy"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stderr.write(
+                "sqlite tuần tự hóa các transaction ghi: kết quả không phản ánh tải thật"
+            )
+
+        airline, airline_created = Airline.objects.get_or_create(
+            code="LOADTEST", defaults={"name": "Seat inventory load test"}
+        )
+        flight = Flight.objects.create(airline=airline, base_price=100)
+        seat_class = SeatClassPricing.objects.create(
+            flight=flight,
+            seat_class="economy",
+            multiplier=1,
+            capacity=options["capacity"],
+            available_seats=options["capacity"],
+        )
+
+        def book(_):
+            close_old_connections()
+            booking = Booking.objects.create(service_type=ServiceType.FLIGHT)
+            try:
+                FlightBookingDetail.objects.create(
+                    booking=booking,
+                    flight=flight,
+                    seat_class="economy",
+                    num_passengers=options["passengers"],
+                )
+                return True
+            except SeatsUnavailable:
+                booking.delete()
+                return False
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                results = list(executor.map(book, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+
+            seat_class.refresh_from_db()
+            booked = FlightBookingDetail.objects.filter(flight=flight).count()
+            held = sum(seat_class.holds.values_list("seats", flat=True))
+            succeeded = sum(results)
+            self.stdout.write(
+                f"{options['requests']} request(s) in {elapsed:.2f}s "
+                f"({options['requests'] / elapsed:.1f}/s, {options['threads']} threads): "
+                f"{succeeded} booked, {len(results) - succeeded} sold out, "
+                f"{held} seat(s) held, {seat_class.available_seats} left"
+            )
+
+            expected = min(
+                options["requests"], options["capacity"] // options["passengers"]
+            )
+            errors = []
+            if succeeded != booked or succeeded != expected:
+                errors.append(f"expected {expected} booking(s), got {succeeded}/{booked}")
+            if seat_class.available_seats < 0 or (
+                held + seat_class.available_seats != options["capacity"]
+            ):
+                errors.append(
+                    f"seats out of balance: {held} held + "
+                    f"{seat_class.available_seats} left != {options['capacity']}"
+                )
+            if errors:
+                raise CommandError("; ".join(errors))
+            self.stdout.write(self.style.SUCCESS("No overselling"))
+        finally:
+            if not options["keep"]:
+                Booking.objects.filter(flight_details__flight=flight).delete()
+                flight.delete()
+                if airline_created:
+                    airline.delete()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from flights.fares import rebuild
+
+
+class Command(BaseCommand):
+    help = "Tính lại bảng giá FlightFare của lịch giá vé (backfill / sửa lệch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Chỉ tính lại các ngày bay từ ngày này (YYYY-MM-DD), mặc định toàn bộ",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError("--since phải có dạng YYYY-MM-DD")
+
+        count = rebuild(since)
+        self.stdout.write(f"Rebuilt {count} fare calendar row(s)")
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.21 on 2026-10-17 21:10
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_itinerary(apps, schema_editor):
+    Flight = apps.get_model("flights", "Flight")
+    FlightLeg = apps.get_model("flights", "FlightLeg")
+
+    # legs theo (flight, departure_time): leg đầu / leg cuối của từng flight
+    itineraries = {}
+    for leg in FlightLeg.objects.order_by("flight_id", "departure_time", "id").iterator():
+        itinerary = itineraries.setdefault(leg.flight_id, [leg, leg])
+        itinerary[1] = leg
+
+    flights = []
+    for flight in Flight.objects.filter(id__in=itineraries):
+        first, last = itineraries[flight.id]
+        departure = timezone.localtime(first.departure_time)
+        flight.origin_airport_id = first.departure_airport_id
+        flight.destination_airport_id = last.arrival_airport_id
+        flight.first_departure_time = first.departure_time
+        flight.last_arrival_time = last.arrival_time
+        flight.departure_date = departure.date()
+        flight.departure_hour = departure.hour
+        flight.arrival_hour = timezone.localtime(last.arrival_time).hour
+        flights.append(flight)
+    Flight.objects.bulk_update(
+        flights,
+        [
+            "origin_airport",
+            "destination_airport",
+            "first_departure_time",
+            "last_arrival_time",
+            "departure_date",
+            "departure_hour",
+            "arrival_hour",
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0002_airport_airport_lat_lng_idx'),
+        ('flights', '0003_flight_created_at_flight_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='arrival_hour',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='departure_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='departure_hour',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='destination_airport',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='destination_flights', to='airports.airport'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='first_departure_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='last_arrival_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='origin_airport',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='origin_flights', to='airports.airport'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin_airport', 'destination_airport', 'departure_date'], name='flight_route_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['destination_airport', 'departure_date'], name='flight_destination_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_date'], name='flight_departure_date_idx'),
+        ),
+        migrations.RunPython(backfill_itinerary, migrations.RunPython.noop),
+    ]
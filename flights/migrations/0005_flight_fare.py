@@ -0,0 +1,36 @@
+# Generated by Django 4.2.21 on 2026-10-17 21:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0002_airport_airport_lat_lng_idx'),
+        ('flights', '0004_flight_itinerary_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightFare',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_date', models.DateField()),
+                ('seat_class', models.CharField(choices=[('economy', 'Economy'), ('business', 'Business'), ('first', 'First Class')], max_length=20)),
+                ('min_price', models.FloatField()),
+                ('flight_count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='airports.airport')),
+                ('origin_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='airports.airport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['origin_airport', 'seat_class', 'departure_date'], name='flight_fare_origin_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='flightfare',
+            constraint=models.UniqueConstraint(fields=('origin_airport', 'destination_airport', 'seat_class', 'departure_date'), name='flight_fare_route_class_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.21 on 2026-10-17 21:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0005_flight_fare'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField()),
+                ('status', models.IntegerField(choices=[(1, 'Held'), (2, 'Confirmed'), (3, 'Released')], default=1)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking_detail', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='seat_hold', to='flights.flightbookingdetail')),
+                ('seat_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='flights.seatclasspricing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='seat_hold_status_expiry_idx')],
+            },
+        ),
+    ]
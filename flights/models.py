@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
 from django.utils import timezone
 
 from bookings.models import Booking
 from airports.models import Airport
 from airlines.models import Airline, Aircraft
+from promotions.services import apply_discount
+from flights.constants.seat_hold_status import SeatHoldStatus
 
 
 class Flight(models.Model):
@@ -22,56 +25,129 @@ class Flight(models.Model):
     stops = models.IntegerField(default=0)
     base_price = models.FloatField(default=0.0)
 
+    # Hành trình (leg đầu -> leg cuối), do calculate_values cập nhật khi legs đổi
+    origin_airport = models.ForeignKey(
+        Airport,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="origin_flights",
+    )
+    destination_airport = models.ForeignKey(
+        Airport,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="destination_flights",
+    )
+    first_departure_time = models.DateTimeField(null=True, blank=True)
+    last_arrival_time = models.DateTimeField(null=True, blank=True)
+    # Theo giờ địa phương (settings.TIME_ZONE)
+    departure_date = models.DateField(null=True, blank=True)
+    departure_hour = models.PositiveSmallIntegerField(null=True, blank=True)
+    arrival_hour = models.PositiveSmallIntegerField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    ITINERARY_FIELDS = [
+        "origin_airport",
+        "destination_airport",
+        "first_departure_time",
+        "last_arrival_time",
+        "departure_date",
+        "departure_hour",
+        "arrival_hour",
+    ]
+
+    class Meta:
+        # Tìm chuyến theo tuyến + ngày bay (FlightViewSet.list)
+        indexes = [
+            models.Index(
+                fields=["origin_airport", "destination_airport", "departure_date"],
+                name="flight_route_date_idx",
+            ),
+            models.Index(
+                fields=["destination_airport", "departure_date"],
+                name="flight_destination_date_idx",
+            ),
+            models.Index(fields=["departure_date"], name="flight_departure_date_idx"),
+        ]
+
     def __str__(self):
         return f"Flight #{self.id} - {self.airline.name}"
 
-    # Gợi ý: tự tính stops & total_duration
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bỏ qua khi nạp thiếu cột (only / refresh_from_db), tránh nạp lại đệ quy
+        if {
+            "origin_airport_id",
+            "destination_airport_id",
+            "departure_date",
+            "base_price",
+        }.issubset(field_names):
+            instance._fare_state = instance.fare_state
+        return instance
+
+    @property
+    def fare_key(self):
+        """Key của bảng giá FlightFare (tuyến + ngày bay)."""
+        return (
+            self.origin_airport_id,
+            self.destination_airport_id,
+            self.departure_date,
+        )
+
+    @property
+    def fare_state(self):
+        return (self.fare_key, self.base_price)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        previous = getattr(self, "_fare_state", None)
+        if previous != self.fare_state:
+            from flights.fares import refresh
+
+            # Đổi tuyến / ngày: tính lại cả ngày cũ lẫn ngày mới
+            refresh({self.fare_key, previous[0] if previous else None})
+        self._fare_state = self.fare_state
+
+    def delete(self, *args, **kwargs):
+        fare_key = self.fare_key
+        result = super().delete(*args, **kwargs)
+        from flights.fares import refresh
+
+        refresh([fare_key])
+        return result
+
+    # Gợi ý: tự tính stops & total_duration + các cột hành trình
     def calculate_values(self):
-        legs = self.legs.all().order_by("departure_time")
-        if legs.exists():
-            self.stops = legs.count() - 1
-            first = legs.first().departure_time
-            last = legs.last().arrival_time
-            self.total_duration = int((last - first).total_seconds() // 60)
+        legs = list(self.legs.order_by("departure_time", "id"))
+        if legs:
+            first, last = legs[0], legs[-1]
+            self.stops = len(legs) - 1
+            self.total_duration = int(
+                (last.arrival_time - first.departure_time).total_seconds() // 60
+            )
+            departure = timezone.localtime(first.departure_time)
+            self.origin_airport_id = first.departure_airport_id
+            self.destination_airport_id = last.arrival_airport_id
+            self.first_departure_time = first.departure_time
+            self.last_arrival_time = last.arrival_time
+            self.departure_date = departure.date()
+            self.departure_hour = departure.hour
+            self.arrival_hour = timezone.localtime(last.arrival_time).hour
+        else:
+            for field in self.ITINERARY_FIELDS:
+                setattr(self, field, None)
         self.save()
 
     def get_active_promotion(self):
-        now = timezone.now()
-        flight_promotions = self.promotions.select_related("promotion").all()
-
-        # Chỉ lấy những promotion đang active
-        active_promos = [
-            fp
-            for fp in flight_promotions
-            if fp.promotion.is_active
-            and fp.promotion.start_date <= now <= fp.promotion.end_date
-        ]
+        """Promotion active có discount lớn nhất (xem promotions.services)"""
+        from promotions.services import get_active_promotion
 
-        if not active_promos:
-            return None
-
-        # Lấy promotion có discount lớn nhất
-        best_promo = max(
-            active_promos,
-            key=lambda fp: (
-                fp.discount_percent
-                if fp.discount_percent is not None
-                else (fp.promotion.discount_percent or 0)
-            ),
-        )
-
-        promo = best_promo.promotion
-        return {
-            "id": promo.id,
-            "title": promo.title,
-            "discount_percent": best_promo.discount_percent or promo.discount_percent,
-            "discount_amount": best_promo.discount_amount or promo.discount_amount,
-            "start_date": promo.start_date,
-            "end_date": promo.end_date,
-        }
+        return get_active_promotion(self)
 
 
 class FlightLeg(models.Model):
@@ -148,11 +224,89 @@ class SeatClassPricing(models.Model):
     def price(self):
         return float(self.flight.base_price) * self.multiplier
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bỏ qua khi nạp thiếu cột (only / refresh_from_db), tránh nạp lại đệ quy
+        if {"seat_class", "multiplier", "available_seats"}.issubset(field_names):
+            instance._fare_state = instance.fare_state
+        return instance
+
+    @property
+    def fare_state(self):
+        """Phần ảnh hưởng tới FlightFare: hạng ghế, multiplier, còn chỗ hay không."""
+        return (self.seat_class, self.multiplier, self.available_seats > 0)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if getattr(self, "_fare_state", None) != self.fare_state:
+            from flights.fares import refresh_flights
+
+            refresh_flights([self.flight_id])
+        self._fare_state = self.fare_state
+
+    def delete(self, *args, **kwargs):
+        flight_id = self.flight_id
+        result = super().delete(*args, **kwargs)
+        from flights.fares import refresh_flights
+
+        refresh_flights([flight_id])
+        return result
+
     @property
     def seats_sold(self):
         return self.capacity - self.available_seats
 
 
+class FlightFare(models.Model):
+    """
+    Giá thấp nhất 1 khách theo (tuyến, ngày bay, hạng ghế) cho lịch giá vé, do
+    flights.fares cập nhật khi flight / leg / hạng ghế / promotion thay đổi.
+    """
+
+    origin_airport = models.ForeignKey(
+        Airport, on_delete=models.CASCADE, related_name="+"
+    )
+    destination_airport = models.ForeignKey(
+        Airport, on_delete=models.CASCADE, related_name="+"
+    )
+    departure_date = models.DateField()
+    seat_class = models.CharField(
+        max_length=20, choices=SeatClassPricing.FLIGHT_CLASSES
+    )
+    min_price = models.FloatField()
+    flight_count = models.PositiveIntegerField(default=0)
+    # Promotion sớm nhất bắt đầu / hết hạn: sau thời điểm này phải tính lại
+    expires_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "origin_airport",
+                    "destination_airport",
+                    "seat_class",
+                    "departure_date",
+                ],
+                name="flight_fare_route_class_date_uniq",
+            )
+        ]
+        indexes = [
+            # destinations(): mọi điểm đến của 1 sân bay đi trong khoảng ngày
+            models.Index(
+                fields=["origin_airport", "seat_class", "departure_date"],
+                name="flight_fare_origin_date_idx",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.origin_airport_id} → {self.destination_airport_id} "
+            f"{self.departure_date} {self.seat_class}: {self.min_price}"
+        )
+
+
 class FlightBookingDetail(models.Model):
     booking = models.ForeignKey(
         Booking, on_delete=models.CASCADE, related_name="flight_details"
@@ -187,58 +341,72 @@ class FlightBookingDetail(models.Model):
             self.total_price = seat_class_pricing.price() * self.num_passengers
         else:
             self.total_price = 0
+        promo = None
         if self.flight and hasattr(self.flight, "get_active_promotion"):
             promo = self.flight.get_active_promotion()
-            if promo:
-                percent = float(promo.get("discount_percent") or 0)
-                amount = float(promo.get("discount_amount") or 0)
-                if percent > 0:
-                    percent_discount = float(self.total_price) * percent / 100
-                    if amount > 0:
-                        self.discount_amount = min(percent_discount, amount)
-                    else:
-                        self.discount_amount = percent_discount
-                elif amount > 0:
-                    self.discount_amount = min(amount, float(self.total_price))
-                else:
-                    self.discount_amount = 0
-                self.final_price = float(self.total_price) - self.discount_amount
-            else:
-                self.discount_amount = 0
-                self.final_price = float(self.total_price)
-        else:
-            self.discount_amount = 0
-            self.final_price = float(self.total_price)
+        self.discount_amount = apply_discount(self.total_price, promo)
+        self.final_price = float(self.total_price) - self.discount_amount
 
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Booking mới: giữ ghế bằng 1 UPDATE có điều kiện (không bán quá số ghế);
+            # hết chỗ -> SeatsUnavailable, transaction rollback cả chi tiết vừa lưu
+            if is_new and seat_class_pricing and self.num_passengers > 0:
+                from flights.inventory import hold
+
+                hold(self, seat_class_pricing)
+
+            # Cập nhật tổng giá cho booking: 1 câu aggregate + 1 UPDATE
+            if self.booking_id:
+                totals = FlightBookingDetail.objects.filter(
+                    booking_id=self.booking_id
+                ).aggregate(
+                    total_price=Sum("total_price"),
+                    discount_amount=Sum("discount_amount"),
+                    final_price=Sum("final_price"),
+                )
+                Booking.objects.filter(pk=self.booking_id).update(
+                    **{field: total or 0 for field, total in totals.items()}
+                )
 
-        # Khi booking mới được tạo, giảm available_seats của SeatClassPricing
-        if is_new and seat_class_pricing and self.num_passengers > 0:
-            seat_class_pricing.available_seats = max(
-                0, seat_class_pricing.available_seats - self.num_passengers
-            )
-            seat_class_pricing.save(update_fields=["available_seats"])
-
-        # Cập nhật tổng discount_amount và final_price cho booking (tránh lặp vô hạn)
-        if self.booking_id:
-            from django.db.models import Sum
-
-            BookingModel = type(self.booking)
-            BookingModel.objects.filter(pk=self.booking_id).update(
-                discount_amount=self.booking.flight_details.aggregate(
-                    total=Sum("discount_amount")
-                )["total"]
-                or 0,
-                final_price=self.booking.flight_details.aggregate(
-                    total=Sum("final_price")
-                )["total"]
-                or 0,
-                total_price=self.booking.flight_details.aggregate(
-                    total=Sum("total_price")
-                )["total"]
-                or 0,
-            )
+    def delete(self, *args, **kwargs):
+        from flights.inventory import release_holds
+
+        with transaction.atomic():
+            release_holds(booking_detail_id=self.pk)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"FlightBooking {self.booking.booking_code} - Flight {self.flight_id}"
+
+
+class SeatHold(models.Model):
+    """Số ghế 1 FlightBookingDetail đang giữ trên 1 hạng ghế (flights/inventory.py)."""
+
+    booking_detail = models.OneToOneField(
+        FlightBookingDetail, on_delete=models.CASCADE, related_name="seat_hold"
+    )
+    seat_class = models.ForeignKey(
+        SeatClassPricing, on_delete=models.CASCADE, related_name="holds"
+    )
+    seats = models.PositiveIntegerField()
+    status = models.IntegerField(
+        choices=SeatHoldStatus.choices, default=SeatHoldStatus.HELD
+    )
+    # HELD quá thời điểm này thì expire_seat_holds trả ghế; None khi đã xác nhận
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "expires_at"], name="seat_hold_status_expiry_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"SeatHold {self.booking_detail_id} - {self.seats} seat(s)"
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from promotions.services import ACTIVE_PROMOTION_ATTR, attach_active_promotions
+from django.db.models import Manager, Prefetch, QuerySet, prefetch_related_objects
 from django.utils import timezone
 from .models import Flight, FlightLeg, FlightBookingDetail, SeatClassPricing
 from airports.models import Airport
@@ -75,7 +77,87 @@ class SeatClassPricingSerializer(serializers.ModelSerializer):
         return obj.price()
 
 
-class FlightSimpleSerializer(serializers.ModelSerializer):
+def legs_prefetch():
+    """legs theo giờ bay, kèm sân bay + city (AirportSerializer lồng city)."""
+    return Prefetch(
+        "legs",
+        queryset=FlightLeg.objects.select_related(
+            "departure_airport__city", "arrival_airport__city"
+        ).order_by("departure_time", "id"),
+    )
+
+
+def prepare_flights(flights):
+    """
+    Nạp sẵn cho cả trang những gì FlightSerializer cần: legs (theo giờ bay, kèm
+    sân bay + city), seat classes, hãng / máy bay và promotion active. Số query cố
+    định, không phụ thuộc số flight; phần đã prefetch / resolve sẵn được bỏ qua.
+    """
+    flights = [flight for flight in flights if flight is not None]
+    if not flights:
+        return
+    prefetch_related_objects(
+        flights,
+        legs_prefetch(),
+        "seat_classes",
+        "airline__flight_operations_staff",
+        "aircraft__airline__flight_operations_staff",
+    )
+    attach_active_promotions(
+        [flight for flight in flights if not hasattr(flight, ACTIVE_PROMOTION_ATTR)]
+    )
+
+
+def _items(data):
+    return list(data.all() if isinstance(data, (Manager, QuerySet)) else data)
+
+
+class FlightListSerializer(serializers.ListSerializer):
+    """list_serializer_class của các serializer Flight: chuẩn bị cả trang 1 lần."""
+
+    def to_representation(self, data):
+        items = _items(data)
+        prepare_flights(items)
+        return super().to_representation(items)
+
+
+class FlightItineraryMixin:
+    """
+    departure/arrival time + airport tính từ legs đã prefetch (1 lần mỗi flight),
+    không chạy obj.legs.order_by(...) riêng cho từng field.
+    """
+
+    def _legs(self, obj):
+        if "legs" not in getattr(obj, "_prefetched_objects_cache", {}):
+            prepare_flights([obj])
+        return list(obj.legs.all())
+
+    def _first_leg(self, obj):
+        legs = self._legs(obj)
+        return min(legs, key=lambda leg: (leg.departure_time, leg.id)) if legs else None
+
+    def _last_leg(self, obj):
+        legs = self._legs(obj)
+        return max(legs, key=lambda leg: (leg.arrival_time, leg.id)) if legs else None
+
+    def get_departure_time(self, obj):
+        first_leg = self._first_leg(obj)
+        return first_leg.departure_time if first_leg else None
+
+    def get_arrival_time(self, obj):
+        last_leg = self._last_leg(obj)
+        return last_leg.arrival_time if last_leg else None
+
+    def get_departure_airport(self, obj):
+        leg = self._first_leg(obj)
+        return AirportSerializer(leg.departure_airport).data if leg else None
+
+    def get_arrival_airport(self, obj):
+        leg = self._last_leg(obj)
+        return AirportSerializer(leg.arrival_airport).data if leg else None
+
+
+class FlightSimpleSerializer(FlightItineraryMixin, serializers.ModelSerializer):
     airline = AirlineSerializer(read_only=True)
 
     # Computed fields
@@ -86,6 +168,7 @@ class FlightSimpleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Flight
+        list_serializer_class = FlightListSerializer
         fields = [
             "id",
             "airline",
@@ -99,22 +182,6 @@ class FlightSimpleSerializer(serializers.ModelSerializer):
             "arrival_airport",
         ]
 
-    def get_departure_time(self, obj):
-        first_leg = obj.legs.order_by("departure_time").first()
-        return first_leg.departure_time if first_leg else None
-
-    def get_arrival_time(self, obj):
-        last_leg = obj.legs.order_by("arrival_time").last()
-        return last_leg.arrival_time if last_leg else None
-
-    def get_departure_airport(self, obj):
-        leg = obj.legs.order_by("departure_time").first()
-        return AirportSerializer(leg.departure_airport).data if leg else None
-
-    def get_arrival_airport(self, obj):
-        leg = obj.legs.order_by("arrival_time").last()
-        return AirportSerializer(leg.arrival_airport).data if leg else None
-
 
 class FlightGetListSerializer(serializers.ModelSerializer):
     airline = AirlineSerializer(read_only=True)
@@ -129,6 +196,7 @@ class FlightGetListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Flight
+        list_serializer_class = FlightListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
@@ -156,7 +224,7 @@ class SeatClassPricingGetListSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class FlightSerializer(serializers.ModelSerializer):
+class FlightSerializer(FlightItineraryMixin, serializers.ModelSerializer):
     airline = AirlineSerializer(read_only=True)
     airline_id = serializers.PrimaryKeyRelatedField(
         queryset=Airline.objects.all(), source="airline", write_only=True
@@ -193,6 +261,7 @@ class FlightSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Flight
+        list_serializer_class = FlightListSerializer
         fields = [
             "id",
             "airline",
@@ -242,25 +311,6 @@ class FlightSerializer(serializers.ModelSerializer):
 
         return flight
 
-    # ───────────────────────────────────────────
-    # HELPER FIELDS
-    # ───────────────────────────────────────────
-    def get_departure_time(self, obj):
-        first_leg = obj.legs.order_by("departure_time").first()
-        return first_leg.departure_time if first_leg else None
-
-    def get_arrival_time(self, obj):
-        last_leg = obj.legs.order_by("arrival_time").last()
-        return last_leg.arrival_time if last_leg else None
-
-    def get_departure_airport(self, obj):
-        leg = obj.legs.order_by("departure_time").first()
-        return AirportSerializer(leg.departure_airport).data if leg else None
-
-    def get_arrival_airport(self, obj):
-        leg = obj.legs.order_by("arrival_time").last()
-        return AirportSerializer(leg.arrival_airport).data if leg else None
-
     def get_promotion(self, obj):
         return obj.get_active_promotion()
 
@@ -307,12 +357,23 @@ class FlightBookingDetailCreateSerializer(serializers.ModelSerializer):
         return data
 
 
+class FlightBookingDetailListSerializer(serializers.ListSerializer):
+    """Chuẩn bị flight của mọi chi tiết booking (khứ hồi / nhiều chặng) 1 lần."""
+
+    def to_representation(self, data):
+        items = _items(data)
+        prefetch_related_objects(items, "flight")
+        prepare_flights([detail.flight for detail in items])
+        return super().to_representation(items)
+
+
 # 👇 Dùng khi hiển thị trong Booking detail
 class FlightBookingDetailSerializer(serializers.ModelSerializer):
     flight = FlightSerializer(read_only=True)
 
     class Meta:
         model = FlightBookingDetail
+        list_serializer_class = FlightBookingDetailListSerializer
         fields = [
             "id",
             "flight",
@@ -2,6 +2,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework import viewsets
 from rest_framework.response import Response
 from datetime import datetime
+from django.utils import timezone
 from .models import Flight, FlightLeg, FlightBookingDetail, SeatClassPricing
 from .serializers import (
     FlightBookingDetailSerializer,
@@ -11,11 +12,15 @@ from .serializers import (
     FlightLegGetListSerializer,
     SeatClassPricingGetListSerializer,
     FlightGetListSerializer,
+    legs_prefetch,
 )
 from rest_framework import status
-from django.db.models import Q, Max, F, Min
+from django.db.models import Q
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import generics
+from rest_framework.decorators import action
+from .itinerary import parse_search_params, search_itineraries, serialize_itineraries
+from . import fares
 
 
 class CommonPagination(PageNumberPagination):
@@ -51,12 +56,6 @@ class FlightListView(generics.ListAPIView):
         filter_params = self.request.query_params
         query_filter = Q()
 
-        # ⭐ Leg cuối là leg có arrival_time lớn nhất
-        queryset = Flight.objects.annotate(
-            first_departure_time=Min("legs__departure_time"),
-            last_arrival_time=Max("legs__arrival_time"),
-        )
-
         # Duyệt qua các tham số query để tạo bộ lọc cho mỗi trường
         for field, value in filter_params.items():
             if (
@@ -91,11 +90,8 @@ class FlightListView(generics.ListAPIView):
             if field == "flight_operations_staff_id":
                 query_filter &= Q(**{f"airline__flight_operations_staff_id": value})
             if field == "arrival_city_id":
-                # ⭐ Lọc đúng leg cuối cùng
-                query_filter &= Q(
-                    legs__arrival_time=F("last_arrival_time"),
-                    legs__arrival_airport__city_id=value,
-                )
+                # ⭐ Điểm đến của leg cuối cùng
+                query_filter &= Q(destination_airport__city_id=value)
             if field == "min_total_duration":
                 query_filter &= Q(**{f"total_duration__gte": value})
             if field == "max_total_duration":
@@ -111,16 +107,10 @@ class FlightListView(generics.ListAPIView):
             if field == "max_base_price":
                 query_filter &= Q(**{f"base_price__lte": value})
             if field == "departure_airport_id":
-                query_filter &= Q(
-                    legs__departure_time=F("first_departure_time"),
-                    legs__departure_airport_id=value,
-                )
+                query_filter &= Q(origin_airport_id=value)
 
             if field == "arrival_airport_id":
-                query_filter &= Q(
-                    legs__arrival_time=F("last_arrival_time"),
-                    legs__arrival_airport_id=value,
-                )
+                query_filter &= Q(destination_airport_id=value)
 
         min_flight_leg_departure = filter_params.get("min_flight_leg_departure")
         max_flight_leg_departure = filter_params.get("max_flight_leg_departure")
@@ -198,9 +188,7 @@ class FlightListView(generics.ListAPIView):
 class FlightViewSet(viewsets.ModelViewSet):
     queryset = (
         Flight.objects.select_related("airline", "aircraft", "aircraft__airline")
-        .prefetch_related(
-            "legs__departure_airport", "legs__arrival_airport", "seat_classes"
-        )
+        .prefetch_related(legs_prefetch(), "seat_classes")
         .all()
         .order_by("-id")
     )
@@ -263,88 +251,136 @@ class FlightViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        q = request.query_params
+    def filter_itinerary(self, queryset):
+        """
+        Lọc theo điểm đi / điểm đến / ngày / giờ bằng các cột hành trình của Flight
+        (do FlightLeg cập nhật), toàn bộ chạy trong DB.
+        """
+        q = self.request.query_params
 
-        # Lấy params để filter thêm
-        origin = q.get("origin")
-        destination = q.get("destination")
-        departure_date = q.get("departureDate")
-        departure_hour = q.get("departureHour")  # 0-24
-        arrival_hour = q.get("arrivalHour")  # 0-24
+        # Flight chưa có leg không hiện trong danh sách
+        queryset = queryset.filter(first_departure_time__isnull=False)
 
-        # Filter theo origin, destination, departure_date, hours
-        filtered_flights = []
-        for flight in queryset:
-            legs = list(flight.legs.order_by("departure_time"))
-            if not legs:
-                continue
+        origin = q.get("origin")
+        if origin:
+            queryset = queryset.filter(origin_airport_id=origin)
 
-            first_leg = legs[0]
-            last_leg = legs[-1]
+        destination = q.get("destination")
+        if destination:
+            queryset = queryset.filter(destination_airport_id=destination)
 
-            # Check origin
-            if origin and str(first_leg.departure_airport_id) != origin:
-                continue
+        departure_date = q.get("departureDate")
+        if departure_date:
+            try:
+                date_obj = datetime.strptime(departure_date, "%Y-%m-%d").date()
+                queryset = queryset.filter(departure_date=date_obj)
+            except ValueError:
+                pass
 
-            # Check destination
-            if destination and str(last_leg.arrival_airport_id) != destination:
-                continue
+        departure_hour = q.get("departureHour")  # 0-24
+        if departure_hour:
+            queryset = queryset.filter(departure_hour__gte=int(departure_hour))
 
-            # Check departure date
-            if departure_date:
-                try:
-                    date_obj = datetime.strptime(departure_date, "%Y-%m-%d").date()
-                    if first_leg.departure_time.date() != date_obj:
-                        continue
-                except ValueError:
-                    pass
+        arrival_hour = q.get("arrivalHour")  # 0-24
+        if arrival_hour:
+            queryset = queryset.filter(arrival_hour__gte=int(arrival_hour))
 
-            # Check departure hour
-            if departure_hour:
-                dep_hour = first_leg.departure_time.hour
-                target_hour = int(departure_hour)
-                if dep_hour < target_hour:
-                    continue
+        return queryset
 
-            # Check arrival hour
-            if arrival_hour:
-                arr_hour = last_leg.arrival_time.hour
-                target_hour = int(arrival_hour)
-                if arr_hour < target_hour:
-                    continue
+    SORT_FIELDS = {
+        "price_asc": ["base_price", "-id"],
+        "price_desc": ["-base_price", "-id"],
+        "duration_asc": ["total_duration", "-id"],
+        "duration_desc": ["-total_duration", "-id"],
+    }
 
-            filtered_flights.append(flight)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_itinerary(self.get_queryset())
 
         # Sort if needed
-        sort_by = q.get("sortBy")
-        if sort_by == "price_asc":
-            filtered_flights.sort(key=lambda f: f.base_price)
-        elif sort_by == "price_desc":
-            filtered_flights.sort(key=lambda f: f.base_price, reverse=True)
-        elif sort_by == "duration_asc":
-            filtered_flights.sort(key=lambda f: f.total_duration)
-        elif sort_by == "duration_desc":
-            filtered_flights.sort(key=lambda f: f.total_duration, reverse=True)
+        sort_fields = self.SORT_FIELDS.get(request.query_params.get("sortBy"))
+        if sort_fields:
+            queryset = queryset.order_by(*sort_fields)
 
         # Paginate
-        page = self.paginate_queryset(filtered_flights)
+        page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             self.paginator.context = {"message": "Fetched flights successfully!"}
             return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(filtered_flights, many=True)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(
             {
                 "isSuccess": True,
                 "message": "Fetched flights successfully!",
-                "meta": {"totalItems": len(filtered_flights), "pagination": None},
+                "meta": {"totalItems": len(serializer.data), "pagination": None},
                 "data": serializer.data,
             }
         )
 
+    @action(detail=False, methods=["get"], url_path="itineraries")
+    def itineraries(self, request):
+        """
+        Tìm hành trình 1 chiều / khứ hồi / nhiều chặng (kể cả nối chuyến) trên
+        server, trả về top-K theo giá hoặc thời gian bay (flights.itinerary).
+        """
+        params = parse_search_params(request.query_params)
+        itineraries = search_itineraries(**params)
+        data = serialize_itineraries(
+            itineraries, params["passengers"], params["seat_class"]
+        )
+        return Response(
+            {
+                "isSuccess": True,
+                "message": "Fetched itineraries successfully!",
+                "meta": {"totalItems": len(itineraries), "sortBy": params["sort"]},
+                "data": data,
+            }
+        )
+
+    @action(detail=False, methods=["get"], url_path="fare-calendar")
+    def fare_calendar(self, request):
+        """
+        Giá thấp nhất mỗi ngày (1 khách) của tuyến origin -> destination trong `days`
+        ngày từ startDate, đọc từ bảng FlightFare. Không có destination: giá thấp
+        nhất tới từng điểm đến từ origin trong khoảng đó.
+        """
+        q = request.query_params
+        try:
+            origin = int(q.get("origin"))
+            destination = int(q["destination"]) if q.get("destination") else None
+            start = (
+                datetime.strptime(q["startDate"], "%Y-%m-%d").date()
+                if q.get("startDate")
+                else timezone.localdate()
+            )
+            days = int(q.get("days") or 30)
+        except (TypeError, ValueError):
+            return Response(
+                {
+                    "isSuccess": False,
+                    "message": "origin, destination, startDate or days is invalid",
+                    "data": None,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        days = max(1, min(days, fares.MAX_CALENDAR_DAYS))
+        seat_class = q.get("seatClass") or "economy"
+
+        if destination is None:
+            data = fares.destinations(origin, seat_class, start, days)
+        else:
+            data = fares.calendar(origin, destination, seat_class, start, days)
+        return Response(
+            {
+                "isSuccess": True,
+                "message": "Fetched fare calendar successfully!",
+                "meta": {"startDate": start, "days": days, "seatClass": seat_class},
+                "data": data,
+            }
+        )
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         q = self.request.query_params
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+# Alias trong settings.CACHES (locmem khi dev/test, Redis khi production)
+HOTEL_LIST_CACHE_ALIAS = "hotel_list"
+KEY_PREFIX = "hotel_list"
+
+# Lọc theo ngày phụ thuộc RoomInventory (thay đổi theo booking) nên không cache
+UNCACHEABLE_PARAMS = ("startDate", "endDate")
+
+
+def get_hotel_list_cache():
+    return caches[HOTEL_LIST_CACHE_ALIAS]
+
+
+def _generation_key(scope, object_id=None):
+    if object_id is None:
+        return f"{KEY_PREFIX}:gen:{scope}"
+    return f"{KEY_PREFIX}:gen:{scope}:{object_id}"
+
+
+def _new_generation():
+    return uuid.uuid4().hex[:12]
+
+
+def get_generations(keys):
+    """
+    Đọc generation hiện tại của các key. Key chưa có (hoặc đã bị evict) được gán
+    giá trị mới, nên trang cache trước đó không bao giờ khớp lại được.
+    """
+    cache = get_hotel_list_cache()
+    generations = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+    return generations
+
+
+def invalidate_hotel_list(hotel_id=None, city_ids=()):
+    """
+    Tăng generation của hotel, các city liên quan và phạm vi "all" để các trang
+    danh sách chứa / có thể chứa hotel này không còn được trả từ cache.
+    """
+    keys = [_generation_key("all")]
+    if hotel_id:
+        keys.append(_generation_key("hotel", hotel_id))
+    keys += [_generation_key("city", city_id) for city_id in city_ids if city_id]
+    get_hotel_list_cache().set_many(
+        {key: _new_generation() for key in keys}, timeout=None
+    )
+
+
+class HotelListCacheMixin:
+    """
+    Cache response đã serialize của list view hotel cho request ẩn danh.
+
+    - Key = view + query params đã chuẩn hóa + generation của phạm vi (city hoặc all).
+    - Mỗi entry lưu generation của từng hotel trong trang; khi đọc ra nếu có hotel
+      đã bị sửa (kể cả đổi sang city khác) thì bỏ entry và tính lại.
+    """
+
+    def get_list_cache_city_id(self):
+        city_id = self.kwargs.get("city_id") or self.request.query_params.get("cityId")
+        try:
+            return int(city_id)
+        except (TypeError, ValueError):
+            return None
+
+    def get_list_cache_key(self, request):
+        # Kết quả cá nhân hóa theo user (recommended) nên chỉ cache request ẩn danh
+        if request.user and request.user.is_authenticated:
+            return None
+        params = request.query_params
+        if any(params.get(param) for param in UNCACHEABLE_PARAMS):
+            return None
+
+        normalized = sorted(
+            (key, sorted(value for value in params.getlist(key) if value))
+            for key in params
+            if any(params.getlist(key))
+        )
+        digest = hashlib.sha1(
+            json.dumps(
+                [type(self).__name__, self.kwargs, normalized],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+
+        city_id = self.get_list_cache_city_id()
+        scope_key = (
+            _generation_key("city", city_id) if city_id else _generation_key("all")
+        )
+        scope_generation = get_generations([scope_key])[scope_key]
+        return f"{KEY_PREFIX}:page:{scope_generation}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        cache_key = self.get_list_cache_key(request)
+        if cache_key is None:
+            return super().list(request, *args, **kwargs)
+
+        cache = get_hotel_list_cache()
+        entry = cache.get(cache_key)
+        if entry is not None:
+            hotel_generations = entry["hotels"]
+            if get_generations(list(hotel_generations)) == hotel_generations:
+                return Response(entry["data"])
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            hotel_ids = [item["id"] for item in response.data.get("data") or []]
+            cache.set(
+                cache_key,
+                {
+                    "hotels": get_generations(
+                        [_generation_key("hotel", hotel_id) for hotel_id in hotel_ids]
+                    ),
+                    "data": response.data,
+                },
+            )
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0004_alter_hotel_min_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['total_weighted_score', 'id'], name='hotel_score_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['min_price', 'id'], name='hotel_min_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['avg_star', 'id'], name='hotel_avg_star_id_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:32
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_search_summary(apps, schema_editor):
+    Room = apps.get_model("rooms", "Room")
+    HotelSearchSummary = apps.get_model("hotels", "HotelSearchSummary")
+
+    rows = (
+        Room.objects.filter(hotel__isnull=False)
+        .values("hotel_id")
+        .annotate(
+            overnight_count=Count("id", filter=Q(stay_type="overnight")),
+            dayuse_count=Count("id", filter=Q(stay_type="dayuse")),
+            max_adults_capacity=Max("adults_capacity"),
+            max_children_capacity=Max("children_capacity"),
+            total_available_rooms=Sum("available_rooms"),
+            available_start_date=Min("start_date"),
+            available_end_date=Max("end_date"),
+        )
+        .order_by()
+    )
+    HotelSearchSummary.objects.bulk_create(
+        [
+            HotelSearchSummary(
+                hotel_id=row["hotel_id"],
+                has_overnight=row["overnight_count"] > 0,
+                has_dayuse=row["dayuse_count"] > 0,
+                max_adults_capacity=row["max_adults_capacity"],
+                max_children_capacity=row["max_children_capacity"],
+                total_available_rooms=row["total_available_rooms"],
+                available_start_date=row["available_start_date"],
+                available_end_date=row["available_end_date"],
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0005_hotel_keyset_indexes'),
+        ('rooms', '0006_room_dayuse_duration_hours_room_price_per_day_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelSearchSummary',
+            fields=[
+                ('hotel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_summary', serialize=False, to='hotels.hotel')),
+                ('has_overnight', models.BooleanField(default=False)),
+                ('has_dayuse', models.BooleanField(default=False)),
+                ('max_adults_capacity', models.PositiveIntegerField(default=0)),
+                ('max_children_capacity', models.PositiveIntegerField(default=0)),
+                ('total_available_rooms', models.PositiveIntegerField(default=0)),
+                ('available_start_date', models.DateField(blank=True, null=True)),
+                ('available_end_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_search_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Giữ đồng bộ với hotels/recommendations.py tại thời điểm tạo migration
+USER_WEIGHT = 0.6
+GLOBAL_WEIGHT = 0.4
+TOP_N = 50
+
+
+def backfill_recommendations(apps, schema_editor):
+    UserHotelInteraction = apps.get_model("hotels", "UserHotelInteraction")
+    HotelRecommendation = apps.get_model("hotels", "HotelRecommendation")
+
+    groups = {}
+    rows = UserHotelInteraction.objects.values_list(
+        "user_id", "hotel_id", "hotel__city_id", "weighted_score",
+        "hotel__total_weighted_score",
+    )
+    for user_id, hotel_id, city_id, user_score, total in rows.iterator():
+        score = USER_WEIGHT * (user_score or 0) + GLOBAL_WEIGHT * (total or 0)
+        groups.setdefault((user_id, city_id), []).append(
+            (score, hotel_id, user_score or 0)
+        )
+
+    HotelRecommendation.objects.bulk_create(
+        [
+            HotelRecommendation(
+                user_id=user_id,
+                hotel_id=hotel_id,
+                city_id=city_id,
+                user_score=user_score,
+                score=score,
+            )
+            for (user_id, city_id), ranked in groups.items()
+            for score, hotel_id, user_score in sorted(ranked, reverse=True)[:TOP_N]
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cities', '0001_initial'),
+        ('hotels', '0007_hotel_hotel_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_score', models.FloatField(default=0.0)),
+                ('score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hotel_recommendations', to='cities.city')),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='hotels.hotel')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hotel_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'city', '-score'], name='hotel_rec_user_city_idx')],
+                'unique_together': {('user', 'hotel')},
+            },
+        ),
+        migrations.RunPython(backfill_recommendations, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from cities.models import City
-from django.db.models import Avg
+from django.db.models import Avg, Count, Max, Min, Q, Sum
 import math
 
 from django.utils import timezone
@@ -45,6 +45,18 @@ class Hotel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Phục vụ keyset pagination (cursor=) của HotelPagination
+        indexes = [
+            models.Index(
+                fields=["total_weighted_score", "id"], name="hotel_score_id_idx"
+            ),
+            models.Index(fields=["min_price", "id"], name="hotel_min_price_id_idx"),
+            models.Index(fields=["avg_star", "id"], name="hotel_avg_star_id_idx"),
+            # Bounding box của near= (agoda_be.geo)
+            models.Index(fields=["lat", "lng"], name="hotel_lat_lng_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -60,6 +72,30 @@ class Hotel(models.Model):
         self.min_price = avg_price or 0
         self.save(update_fields=["min_price"])
 
+    # ✅ Hàm tự cập nhật HotelSearchSummary (1 aggregate trên rooms của hotel này)
+    def update_search_summary(self):
+        from rooms.models import Room
+
+        summary = Room.objects.filter(hotel=self).aggregate(
+            room_count=Count("id"),
+            overnight_count=Count("id", filter=Q(stay_type="overnight")),
+            dayuse_count=Count("id", filter=Q(stay_type="dayuse")),
+            max_adults_capacity=Max("adults_capacity"),
+            max_children_capacity=Max("children_capacity"),
+            total_available_rooms=Sum("available_rooms"),
+            available_start_date=Min("start_date"),
+            available_end_date=Max("end_date"),
+        )
+
+        # Hotel không còn phòng nào thì không khớp bất kỳ bộ lọc phòng nào
+        if not summary.pop("room_count"):
+            HotelSearchSummary.objects.filter(hotel=self).delete()
+            return
+
+        summary["has_overnight"] = summary.pop("overnight_count") > 0
+        summary["has_dayuse"] = summary.pop("dayuse_count") > 0
+        HotelSearchSummary.objects.update_or_create(hotel=self, defaults=summary)
+
     # ✅ Tính sentiment score (từ review)
     @property
     def sentiment_score(self):
@@ -83,12 +119,71 @@ class Hotel(models.Model):
         self.total_weighted_score = self.calc_total_weighted_score
         self.save(update_fields=["total_weighted_score"])
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # City lúc nạp: đổi city thì top-N gợi ý của city cũ / mới phải tính lại
+        if "city_id" in field_names:
+            instance._loaded_city_id = instance.city_id
+        return instance
+
     def save(self, *args, **kwargs):
         try:
             self.total_weighted_score = self.calc_total_weighted_score
         except Exception:
             self.total_weighted_score = 0.0
         super().save(*args, **kwargs)
+        self.invalidate_list_cache()
+        from locations.search import reindex_on_save
+
+        reindex_on_save("hotel", self.pk, kwargs.get("update_fields"))
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"total_weighted_score", "city"} & set(
+            update_fields
+        ):
+            from hotels.recommendations import refresh_for_hotel
+
+            refresh_for_hotel(self, getattr(self, "_loaded_city_id", None))
+            self._loaded_city_id = self.city_id
+
+    def delete(self, *args, **kwargs):
+        hotel_id, city_id = self.pk, self.city_id
+        result = super().delete(*args, **kwargs)
+        from hotels.cache import invalidate_hotel_list
+        from locations.search import reindex
+
+        invalidate_hotel_list(hotel_id, [city_id])
+        reindex("hotel", [hotel_id])
+        return result
+
+    # ✅ Bỏ các trang danh sách hotel đã cache có liên quan (xem hotels/cache.py)
+    def invalidate_list_cache(self):
+        from hotels.cache import invalidate_hotel_list
+
+        invalidate_hotel_list(self.pk, [self.city_id])
+
+
+# Bảng tóm tắt phòng của mỗi hotel, dùng cho bộ lọc tìm kiếm thay vì join rooms
+class HotelSearchSummary(models.Model):
+    hotel = models.OneToOneField(
+        Hotel,
+        on_delete=models.CASCADE,
+        related_name="search_summary",
+        primary_key=True,
+    )
+    has_overnight = models.BooleanField(default=False)
+    has_dayuse = models.BooleanField(default=False)
+    max_adults_capacity = models.PositiveIntegerField(default=0)
+    max_children_capacity = models.PositiveIntegerField(default=0)
+    total_available_rooms = models.PositiveIntegerField(default=0)
+    # Khoảng ngày bao phủ bởi các phòng: min(start_date) -> max(end_date)
+    available_start_date = models.DateField(null=True, blank=True)
+    available_end_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search summary for {self.hotel.name}"
 
 
 # Model để lưu thông tin về hình ảnh khách sạn
@@ -100,6 +195,20 @@ class HotelImage(models.Model):
     def __str__(self):
         return f"Image for {self.hotel.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from hotels.cache import invalidate_hotel_list
+
+        invalidate_hotel_list(self.hotel_id)
+
+    def delete(self, *args, **kwargs):
+        hotel_id = self.hotel_id
+        result = super().delete(*args, **kwargs)
+        from hotels.cache import invalidate_hotel_list
+
+        invalidate_hotel_list(hotel_id)
+        return result
+
 
 class UserHotelInteraction(models.Model):
     user = models.ForeignKey(
@@ -134,3 +243,43 @@ class UserHotelInteraction(models.Model):
         w1, w2 = 0.7, 0.3  # trọng số có thể tinh chỉnh
         self.weighted_score = w1 * sentiment + w2 * click_factor
         self.save(update_fields=["weighted_score"])
+
+        from hotels.recommendations import refresh_for_user_city
+
+        refresh_for_user_city(self.user_id, self.hotel.city_id)
+
+
+# Xếp hạng gợi ý đã tính sẵn: top-N hotel của mỗi user trong từng city
+# (xem hotels/recommendations.py)
+class HotelRecommendation(models.Model):
+    user = models.ForeignKey(
+        "accounts.CustomUser",
+        on_delete=models.CASCADE,
+        related_name="hotel_recommendations",
+    )
+    hotel = models.ForeignKey(
+        Hotel, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    city = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name="hotel_recommendations",
+        null=True,
+        blank=True,
+    )
+    # UserHotelInteraction.weighted_score tại thời điểm tính
+    user_score = models.FloatField(default=0.0)
+    # Điểm đã trộn user_score với Hotel.total_weighted_score
+    score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "hotel")
+        indexes = [
+            models.Index(
+                fields=["user", "city", "-score"], name="hotel_rec_user_city_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} → {self.hotel_id}: {self.score:.3f}"
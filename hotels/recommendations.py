@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q, Value
+from django.db.models.functions import Coalesce
+
+# Trọng số trộn điểm cá nhân (UserHotelInteraction) với điểm chung của hotel
+USER_WEIGHT = 0.6
+GLOBAL_WEIGHT = 0.4
+# Số hotel giữ lại cho mỗi (user, city)
+TOP_N = 50
+
+
+def blend(user_score, total_weighted_score):
+    return USER_WEIGHT * (user_score or 0) + GLOBAL_WEIGHT * (total_weighted_score or 0)
+
+
+def refresh_for_user_city(user_id, city_id):
+    """Tính lại top-N của 1 user trong 1 city từ UserHotelInteraction."""
+    from hotels.models import HotelRecommendation, UserHotelInteraction
+
+    interactions = UserHotelInteraction.objects.filter(
+        user_id=user_id, hotel__city_id=city_id
+    ).values_list("hotel_id", "weighted_score", "hotel__total_weighted_score")
+    ranked = sorted(
+        (
+            (blend(user_score, total), hotel_id, user_score)
+            for hotel_id, user_score, total in interactions
+        ),
+        reverse=True,
+    )[:TOP_N]
+
+    with transaction.atomic():
+        HotelRecommendation.objects.filter(user_id=user_id, city_id=city_id).delete()
+        HotelRecommendation.objects.bulk_create(
+            [
+                HotelRecommendation(
+                    user_id=user_id,
+                    hotel_id=hotel_id,
+                    city_id=city_id,
+                    user_score=user_score,
+                    score=score,
+                )
+                for score, hotel_id, user_score in ranked
+            ]
+        )
+
+
+def refresh_for_hotel(hotel, old_city_id=None):
+    """
+    total_weighted_score của hotel đổi: cập nhật điểm trộn tại chỗ.
+    Hotel chuyển city: top-N của city cũ và city mới đều đổi, tính lại cả hai
+    cho các user đã tương tác với hotel.
+    """
+    from hotels.models import HotelRecommendation, UserHotelInteraction
+
+    rows = HotelRecommendation.objects.filter(hotel=hotel)
+    # Dòng còn mang city cũ: hotel đã chuyển city (kể cả khi không biết old_city_id)
+    old_city_ids = set(
+        rows.exclude(city_id=hotel.city_id).values_list("city_id", flat=True)
+    )
+    if old_city_id is not None and old_city_id != hotel.city_id:
+        old_city_ids.add(old_city_id)
+    if old_city_ids:
+        user_ids = (
+            UserHotelInteraction.objects.filter(hotel=hotel)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        for user_id in user_ids:
+            # City cũ trước: xóa dòng (user, hotel) cũ rồi mới thêm vào city mới
+            for city_id in [*old_city_ids, hotel.city_id]:
+                refresh_for_user_city(user_id, city_id)
+        return
+
+    rows.update(
+        score=USER_WEIGHT * F("user_score")
+        + Value(GLOBAL_WEIGHT * (hotel.total_weighted_score or 0)),
+    )
+
+
+def order_by_recommendation(queryset, user, *order_fields):
+    """
+    Sắp xếp hotel theo gợi ý cá nhân: LEFT JOIN HotelRecommendation theo
+    (user, hotel) (unique index) thay cho subquery tương quan trên từng dòng.
+    Hotel ngoài top-N của user dùng điểm chung.
+    """
+    return queryset.annotate(
+        user_recommendation=FilteredRelation(
+            "recommendations", condition=Q(recommendations__user=user)
+        ),
+        recommended_score=Coalesce(
+            F("user_recommendation__score"),
+            GLOBAL_WEIGHT * F("total_weighted_score"),
+        ),
+    ).order_by("-recommended_score", "-total_weighted_score", *order_fields)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Hotel, HotelImage, UserHotelInteraction
 from cities.models import City
 from cities.serializers import CityCreateSerializer, CitySerializer
@@ -37,6 +38,84 @@ class HotelSimpleSerializer(serializers.ModelSerializer):
             return obj.images.first().image
         return None
 
+
+class HotelCardSerializer(serializers.ModelSerializer):
+    """
+    Thẻ hotel gọn cho lưới tìm kiếm (view=card / fields=...): không có TextField dài,
+    không nested owner, chỉ 1 ảnh thumbnail.
+    """
+
+    city_id = serializers.IntegerField(read_only=True)
+    city_name = serializers.CharField(source="city.name", read_only=True, default=None)
+    thumbnail = serializers.SerializerMethodField()
+    min_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
+
+    # Chỉ có khi lọc near= (annotate từ agoda_be.geo.filter_near)
+    distance_km = serializers.FloatField(read_only=True)
+
+    # Prefetch chỉ ảnh đầu tiên của mỗi hotel (xem project_queryset)
+    thumbnail_attr = "card_images"
+
+    class Meta:
+        model = Hotel
+        fields = [
+            "id",
+            "name",
+            "city_id",
+            "city_name",
+            "location",
+            "lat",
+            "lng",
+            "avg_star",
+            "review_count",
+            "min_price",
+            "total_weighted_score",
+            "thumbnail",
+            "distance_km",
+        ]
+
+    def __init__(self, *args, **kwargs):
+        # fields=["name", "min_price"] → chỉ giữ các field này (luôn giữ id)
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields) - {"id"}:
+                self.fields.pop(name)
+
+    @classmethod
+    def project_queryset(cls, queryset, fields=None, extra_columns=()):
+        """Chỉ SELECT các cột cần cho các field được chọn, prefetch 1 ảnh thumbnail."""
+        fields = set(fields or cls.Meta.fields) | {"id"}
+        columns = {"id"} | (
+            (fields | set(extra_columns))
+            & {f.name for f in Hotel._meta.concrete_fields}
+        )
+        if "city_id" in fields:
+            columns.add("city")
+        if "city_name" in fields:
+            queryset = queryset.select_related("city")
+            columns |= {"city", "city__name"}
+        if "thumbnail" in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "images",
+                    queryset=HotelImage.objects.order_by("id").only(
+                        "id", "hotel_id", "image"
+                    )[:1],
+                    to_attr=cls.thumbnail_attr,
+                )
+            )
+        return queryset.only(*columns)
+
+    def get_thumbnail(self, obj):
+        images = getattr(obj, self.thumbnail_attr, None)
+        if images is None:
+            images = obj.images.order_by("id")[:1]
+        return images[0].image if images else None
+
+
 class HotelSerializer(serializers.ModelSerializer):
     images = HotelImageSerializer(many=True, read_only=True)
     city = CityCreateSerializer(read_only=True)
@@ -45,6 +124,8 @@ class HotelSerializer(serializers.ModelSerializer):
     min_price = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
     )
+    # Chỉ có khi lọc near= (annotate từ agoda_be.geo.filter_near)
+    distance_km = serializers.FloatField(read_only=True)
     
     class Meta:
         model = Hotel
@@ -135,7 +216,7 @@ class HotelSearchSerializer(serializers.ModelSerializer):
             "total_positive",
             "total_negative",
             "total_neutral",
-            "weighted_score",
+            "total_weighted_score",
         ]
 
 
@@ -4,147 +4,90 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Hotel, HotelImage, UserHotelInteraction
 from .serializers import (
     HotelSerializer,
+    HotelCardSerializer,
     HotelCreateSerializer,
     HotelImageSerializer,
     UserHotelInteractionSerializer,
     UserHotelInteractionCreateSerializer,
 )
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, OuterRef, Subquery, Value
+from django.db.models import Q
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 import os
 from django.conf import settings
-from django.db.models import F, FloatField, ExpressionWrapper, functions as Func
+from django.db.models import F, ExpressionWrapper, functions as Func
 from rest_framework import status
 from django.db.models import Sum
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed, ValidationError, NotFound
-from django.db.models.functions import Coalesce
-import math
-from django.core.paginator import Paginator
+from agoda_be.geo import filter_near, parse_near
+from agoda_be.authentication import OptionalJWTAuthentication
+from agoda_be.pagination import WindowCountPagination
+from .cache import HotelListCacheMixin
+from .recommendations import order_by_recommendation
+from locations.search import search_q
 
 
 # -------------------- Pagination --------------------
-class HotelPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-        city_id = request.query_params.get("cityId")
-        owner_id = request.query_params.get("ownerId")
-
-        if city_id:
-            self.filters["city_id"] = city_id
-
-        if owner_id:
-            self.filters["owner_id"] = owner_id
-
-        for field, value in request.query_params.items():
-            if field not in [
-                "current",
-                "pageSize",
-                "cityId",
-                "ownerId",
-                "recommended",
-                "avg_star",
-                "min_avg_star",
-                "max_avg_star",
-                "min_avg_price",
-                "max_avg_price",
-                "sort",
-                "stay_type",
-                "adult",
-                "child",
-                "room",
-                "startDate",
-                "endDate",
-            ]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-            if field in ["avg_star"]:
-                try:
-                    int_value = int(value)
-                    self.filters["avg_star__gte"] = int_value
-                    self.filters["avg_star__lt"] = int_value + 1
-                except ValueError:
-                    pass
-
-            if field in ["min_avg_star", "max_avg_star"]:
-                min_avg_star = request.query_params.get("min_avg_star")
-                max_avg_star = request.query_params.get("max_avg_star")
-
-                if min_avg_star:
-                    try:
-                        self.filters["avg_star__gte"] = float(min_avg_star)
-                    except ValueError:
-                        pass
-
-                if max_avg_star:
-                    try:
-                        self.filters["avg_star__lte"] = float(max_avg_star)
-                    except ValueError:
-                        pass
-
-            if field in ["min_avg_price", "max_avg_price"]:
-                min_avg_price = request.query_params.get("min_avg_price")
-                max_avg_price = request.query_params.get("max_avg_price")
-
-                if min_avg_price:
-                    try:
-                        self.filters["min_price__gte"] = float(min_avg_price)
-                    except ValueError:
-                        pass
-
-                if max_avg_price:
-                    try:
-                        self.filters["min_price__lte"] = float(max_avg_price)
-                    except ValueError:
-                        pass
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-
-        total_count = Hotel.objects.filter(**self.filters).count()
-        total_pages = math.ceil(total_count / self.page_size)
-
-        self.filters.clear()
-
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched hotel successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
+class HotelPagination(WindowCountPagination):
+    message = "Fetched hotel successfully!"
+    # cursor= cho infinite scroll: keyset theo (field, id), admin vẫn dùng current/pageSize.
+    # recommended_score là annotation của order_by_recommendation (recommended=1)
+    cursor_ordering_fields = (
+        "recommended_score",
+        "total_weighted_score",
+        "min_price",
+        "avg_star",
+        "distance_km",
+    )
+    cursor_default_ordering = "-total_weighted_score"
+
+
+# -------------------- Card projection --------------------
+class HotelCardProjectionMixin:
+    """
+    `view=card` hoặc `fields=name,min_price,...` → trả HotelCardSerializer, chỉ SELECT
+    các cột cần thiết thay vì HotelSerializer đầy đủ (TextField, owner, mọi ảnh).
+    """
+
+    def get_card_fields(self):
+        params = self.request.query_params
+        fields = [f.strip() for f in params.get("fields", "").split(",") if f.strip()]
+        if fields:
+            return [f for f in fields if f in HotelCardSerializer.Meta.fields]
+        if params.get("view") == "card":
+            return list(HotelCardSerializer.Meta.fields)
+        return None
+
+    def get_serializer_class(self):
+        if self.get_card_fields() is not None:
+            return HotelCardSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_card_fields()
+        if fields is not None:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_card_fields()
+        if fields is None:
+            return queryset
+        # Cột keyset của cursor= cần có sẵn trên bản ghi cuối trang
+        return HotelCardSerializer.project_queryset(
+            queryset,
+            fields,
+            extra_columns=getattr(self.pagination_class, "cursor_ordering_fields", ()),
         )
 
 
 # -------------------- Hotel List --------------------
-class HotelListView(generics.ListAPIView):
+class HotelListView(
+    HotelListCacheMixin, HotelCardProjectionMixin, generics.ListAPIView
+):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
     pagination_class = HotelPagination
@@ -166,17 +109,32 @@ class HotelListView(generics.ListAPIView):
             except ValueError:
                 return Hotel.objects.none()
 
-        # ---- stay_type filter ----
+        # ---- near=lat,lng&radius_km= (xem bản đồ) ----
+        try:
+            near = parse_near(params)
+        except ValueError:
+            return Hotel.objects.none()
+        if near:
+            queryset = filter_near(queryset, *near)
+
+        # ---- stay_type filter (lọc trên HotelSearchSummary, không join rooms) ----
         stay_type = params.get("stay_type")
         if stay_type:
-            queryset = queryset.filter(rooms__stay_type=stay_type).distinct()
+            if stay_type == "overnight":
+                queryset = queryset.filter(search_summary__has_overnight=True)
+            elif stay_type == "dayuse":
+                queryset = queryset.filter(search_summary__has_dayuse=True)
+            else:
+                return Hotel.objects.none()
 
         # ---- capacity filters ----
         adult = params.get("adult")
         if adult:
             try:
                 adult = int(adult)
-                queryset = queryset.filter(rooms__adults_capacity__gte=adult).distinct()
+                queryset = queryset.filter(
+                    search_summary__max_adults_capacity__gte=adult
+                )
             except ValueError:
                 pass
 
@@ -185,8 +143,8 @@ class HotelListView(generics.ListAPIView):
             try:
                 child = int(child)
                 queryset = queryset.filter(
-                    rooms__children_capacity__gte=child
-                ).distinct()
+                    search_summary__max_children_capacity__gte=child
+                )
             except ValueError:
                 pass
 
@@ -194,11 +152,10 @@ class HotelListView(generics.ListAPIView):
         if room:
             try:
                 room = int(room)
-                # Filter hotels có tổng available_rooms >= room (cho tất cả rooms hoặc tổng)
-                # Giả sử tổng available_rooms của hotel >= room
-                queryset = queryset.annotate(
-                    total_available=Sum("rooms__available_rooms")
-                ).filter(total_available__gte=room)
+                # Tổng available_rooms của hotel >= room
+                queryset = queryset.filter(
+                    search_summary__total_available_rooms__gte=room
+                )
             except ValueError:
                 pass
 
@@ -212,10 +169,17 @@ class HotelListView(generics.ListAPIView):
                 sd = datetime.strptime(startDate, "%Y-%m-%d").date()
                 ed = datetime.strptime(endDate, "%Y-%m-%d").date()
                 if sd <= ed:
-                    # Filter hotels có rooms available trong khoảng ngày
+                    from rooms.models import Room, RoomInventory
+
+                    # Khoảng ngày của summary loại nhanh hotel, RoomInventory xác nhận
+                    # còn ít nhất 1 phòng trống mọi đêm trong [sd, ed)
                     queryset = queryset.filter(
-                        rooms__start_date__lte=sd, rooms__end_date__gte=ed
-                    ).distinct()
+                        search_summary__available_start_date__lte=sd,
+                        search_summary__available_end_date__gte=ed,
+                        id__in=Room.objects.filter(
+                            id__in=RoomInventory.free_room_ids(sd, ed)
+                        ).values("hotel_id"),
+                    )
             except ValueError:
                 pass
 
@@ -236,6 +200,10 @@ class HotelListView(generics.ListAPIView):
                 "cityId",
                 "ownerId",
                 "recommended",
+                "view",
+                "fields",
+                "near",
+                "radius_km",
                 "avg_star",
                 "min_avg_star",
                 "max_avg_star",
@@ -249,7 +217,10 @@ class HotelListView(generics.ListAPIView):
                 "startDate",
                 "endDate",
             ]:
-                if field in [f.name for f in Hotel._meta.get_fields()]:
+                if field == "name":
+                    # Tên hotel: tra chỉ mục (tiền tố, không dấu) thay cho LIKE '%q%'
+                    q_filter &= search_q("hotel", value, fields=("name",))
+                elif field in [f.name for f in Hotel._meta.get_fields()]:
                     q_filter &= Q(**{f"{field}__icontains": value})
 
             if field in ["avg_star"]:
@@ -316,39 +287,19 @@ class HotelListView(generics.ListAPIView):
 
         if recommended:
             if user and user.is_authenticated:
-                user_interaction = UserHotelInteraction.objects.filter(
-                    user=user, hotel=OuterRef("pk")
-                ).values("weighted_score")[:1]
-
-                queryset = queryset.annotate(
-                    weighted_score_user=Coalesce(
-                        Subquery(user_interaction, output_field=FloatField()),
-                        Value(0.0),
-                    )
-                )
-
-                # Nếu có order_fields thì thêm sau weighted_score_user
-                queryset = queryset.order_by(
-                    "-weighted_score_user", "-total_weighted_score", *order_fields
-                )
+                # Xếp hạng cá nhân đã tính sẵn (hotels/recommendations.py)
+                queryset = order_by_recommendation(queryset, user, *order_fields)
             else:
                 queryset = queryset.order_by("-total_weighted_score", *order_fields)
         elif order_fields:
             queryset = queryset.order_by(*order_fields)
 
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
-
-        # Áp dụng phân trang
-        paginator = Paginator(queryset, page_size)
-        page = paginator.get_page(current)
+        if near:
+            # Kết quả theo bản đồ luôn sắp gần nhất trước
+            queryset = queryset.order_by("distance_km", *order_fields)
 
-        return page
+        # Phân trang do pagination_class đảm nhận
+        return queryset
 
 
 # -------------------- Hotel Create --------------------
@@ -604,10 +555,13 @@ class HotelImageDeleteView(generics.DestroyAPIView):
 
 
 # -------------------- Hotel List by City --------------------
-class HotelByCityView(generics.ListAPIView):
+class HotelByCityView(
+    HotelListCacheMixin, HotelCardProjectionMixin, generics.ListAPIView
+):
     serializer_class = HotelSerializer
     pagination_class = HotelPagination
-    authentication_classes = []  # không yêu cầu đăng nhập
+    # Xác thực nếu có token để cá nhân hóa recommended, vẫn không bắt buộc đăng nhập
+    authentication_classes = [OptionalJWTAuthentication]
     permission_classes = []  # không giới hạn quyền truy cập
 
     def get_queryset(self):
@@ -627,7 +581,9 @@ class HotelByCityView(generics.ListAPIView):
         if recommended:
             if user and user.is_authenticated:
                 # Người dùng đã đăng nhập → sắp xếp theo điểm cá nhân hóa
-                return Hotel.objects.filter(city_id=city_id).order_by("-weighted_score")
+                return order_by_recommendation(
+                    Hotel.objects.filter(city_id=city_id), user
+                )
             else:
                 # Người dùng chưa đăng nhập → sắp xếp theo tổng điểm chung
                 return Hotel.objects.filter(city_id=city_id).order_by(
@@ -636,12 +592,6 @@ class HotelByCityView(generics.ListAPIView):
 
         return Hotel.objects.filter(city_id=city_id)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response(serializer.data)
-
 
 from rest_framework.generics import ListAPIView
 from .models import Hotel
@@ -663,7 +613,9 @@ class HotelSearchView(ListAPIView):
         hotel_name = self.request.query_params.get("hotel_name")
 
         if hotel_name:
-            queryset = queryset.filter(name__icontains=hotel_name)
+            queryset = queryset.filter(
+                search_q("hotel", hotel_name, fields=("name",))
+            )
 
         return queryset
 
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:43
+
+from django.db import migrations, models
+
+from locations.search import SEARCH_ENTITIES, tokenize
+
+
+def backfill_search_tokens(apps, schema_editor):
+    SearchToken = apps.get_model("locations", "SearchToken")
+
+    for entity_type, (label, columns) in SEARCH_ENTITIES.items():
+        rows = apps.get_model(label).objects.values_list("pk", *columns)
+        SearchToken.objects.bulk_create(
+            [
+                SearchToken(entity_type=entity_type, entity_id=pk, token=token)
+                for pk, *texts in rows.iterator()
+                for token in tokenize(*texts)
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("activities", "0003_activitydate_participants_available"),
+        ("airports", "0002_airport_airport_lat_lng_idx"),
+        ("cities", "0001_initial"),
+        ("hotels", "0007_hotel_hotel_lat_lng_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('hotel', 'Hotel'), ('city', 'City'), ('airport', 'Airport'), ('activity', 'Activity')], max_length=20)),
+                ('entity_id', models.PositiveIntegerField()),
+                ('token', models.CharField(max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entity_type', 'token', 'entity_id'], name='search_token_prefix_idx'), models.Index(fields=['entity_type', 'entity_id'], name='search_token_entity_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
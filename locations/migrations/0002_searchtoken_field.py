@@ -0,0 +1,53 @@
+# Generated by Django 4.2.21 on 2026-10-17 21:36
+
+from django.db import migrations, models
+
+from locations.search import SEARCH_ENTITIES, tokenize
+
+
+def rebuild_search_tokens(apps, schema_editor):
+    """Token cũ gộp mọi cột; dựng lại để mỗi token mang cột nguồn."""
+    SearchToken = apps.get_model("locations", "SearchToken")
+    SearchToken.objects.all().delete()
+
+    for entity_type, (label, columns) in SEARCH_ENTITIES.items():
+        rows = apps.get_model(label).objects.values_list("pk", *columns)
+        SearchToken.objects.bulk_create(
+            [
+                SearchToken(
+                    entity_type=entity_type, entity_id=pk, field=field, token=token
+                )
+                for pk, *texts in rows.iterator()
+                for field, text in zip(columns, texts)
+                for token in tokenize(text)
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0001_initial'),
+        ("activities", "0003_activitydate_participants_available"),
+        ("airports", "0002_airport_airport_lat_lng_idx"),
+        ("cities", "0001_initial"),
+        ("hotels", "0007_hotel_hotel_lat_lng_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='searchtoken',
+            name='search_token_prefix_idx',
+        ),
+        migrations.AddField(
+            model_name='searchtoken',
+            name='field',
+            field=models.CharField(default='name', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['entity_type', 'token', 'field', 'entity_id'], name='search_token_prefix_idx'),
+        ),
+        migrations.RunPython(rebuild_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+# Chỉ mục ngược cho tìm kiếm/autocomplete: 1 dòng / (loại, id, từ đã bỏ dấu)
+class SearchToken(models.Model):
+    ENTITY_TYPE_CHOICES = [
+        ("hotel", "Hotel"),
+        ("city", "City"),
+        ("airport", "Airport"),
+        ("activity", "Activity"),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_TYPE_CHOICES)
+    entity_id = models.PositiveIntegerField()
+    # Cột nguồn của token (vd. "name", "city__name"): lọc theo tên hotel không khớp tên city
+    field = models.CharField(max_length=20, default="name")
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            # Khớp tiền tố `token LIKE 'q%'` trong từng loại, lọc cột và trả
+            # entity_id ngay từ index
+            models.Index(
+                fields=["entity_type", "token", "field", "entity_id"],
+                name="search_token_prefix_idx",
+            ),
+            models.Index(
+                fields=["entity_type", "entity_id"], name="search_token_entity_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.entity_id} {self.token}"
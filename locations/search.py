@@ -0,0 +1,110 @@
+import re
+import unicodedata
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_TOKEN_LENGTH = 64
+
+# loại -> (model, các cột được đưa vào chỉ mục; tên cột được lưu ở SearchToken.field)
+SEARCH_ENTITIES = {
+    "hotel": ("hotels.Hotel", ("name", "city__name")),
+    "city": ("cities.City", ("name",)),
+    "airport": ("airports.Airport", ("name", "code", "city__name")),
+    "activity": ("activities.Activity", ("name", "city__name")),
+}
+
+# Các field mà khi save(update_fields=...) chạm tới thì cần index lại
+INDEXED_FIELDS = {"name", "code", "city"}
+
+
+def normalize(text):
+    """Bỏ dấu tiếng Việt và viết thường: "Đà Nẵng" -> "da nang"."""
+    text = (text or "").replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(*texts):
+    tokens = set()
+    for text in texts:
+        tokens.update(
+            token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(normalize(text))
+        )
+    return tokens
+
+
+def _tokens_of(columns, texts):
+    """(cột, token) của 1 bản ghi: token của mỗi cột được ghi riêng."""
+    return {
+        (column, token)
+        for column, text in zip(columns, texts)
+        for token in tokenize(text)
+    }
+
+
+def search_q(entity_type, query, fields=None):
+    """
+    Q lọc bản ghi khớp mọi từ trong query (khớp tiền tố, không phân biệt dấu),
+    dùng được trong .filter() của model tương ứng với entity_type.
+    `fields` giới hạn các cột được so khớp, vd. ("name",) để không khớp tên city.
+    """
+    from locations.models import SearchToken
+
+    tokens = [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(normalize(query))]
+    if not tokens:
+        return Q(pk__in=[])
+
+    q = Q()
+    for token in tokens:
+        candidates = SearchToken.objects.filter(
+            entity_type=entity_type, token__istartswith=token
+        )
+        if fields:
+            candidates = candidates.filter(field__in=fields)
+        q &= Q(pk__in=candidates.values("entity_id"))
+    return q
+
+
+def reindex(entity_type, ids):
+    """Dựng lại token của các bản ghi; id không còn tồn tại thì chỉ xóa token."""
+    from locations.models import SearchToken
+
+    ids = [pk for pk in ids if pk is not None]
+    if not ids:
+        return
+
+    label, columns = SEARCH_ENTITIES[entity_type]
+    rows = apps.get_model(label).objects.filter(pk__in=ids).values_list("pk", *columns)
+    with transaction.atomic():
+        SearchToken.objects.filter(entity_type=entity_type, entity_id__in=ids).delete()
+        SearchToken.objects.bulk_create(
+            [
+                SearchToken(
+                    entity_type=entity_type, entity_id=pk, field=field, token=token
+                )
+                for pk, *texts in rows
+                for field, token in _tokens_of(columns, texts)
+            ],
+            batch_size=1000,
+        )
+
+
+def reindex_on_save(entity_type, pk, update_fields=None):
+    if update_fields is None or INDEXED_FIELDS & set(update_fields):
+        reindex(entity_type, [pk])
+
+
+def reindex_city(city_id):
+    """Đổi tên city: index lại city và mọi hotel/airport/activity chứa tên city đó."""
+    reindex("city", [city_id])
+    for entity_type in ("hotel", "airport", "activity"):
+        label, _ = SEARCH_ENTITIES[entity_type]
+        reindex(
+            entity_type,
+            apps.get_model(label)
+            .objects.filter(city_id=city_id)
+            .values_list("pk", flat=True),
+        )
@@ -1,10 +1,11 @@
 # locations/views.py
 from rest_framework import generics
 from rest_framework.response import Response
-from django.db.models import Q
 from hotels.models import Hotel
 from cities.models import City
 from airports.models import Airport
+from activities.models import Activity
+from .search import search_q
 
 
 class LocationSuggestionsView(generics.ListAPIView):
@@ -19,11 +20,14 @@ class LocationSuggestionsView(generics.ListAPIView):
 
         if type_param == 'hotel' or type_param == 'homestay':
             # Search hotels/homestays and cities
+            # Chỉ mục tên hotel đã gồm tên city (locations.search)
             hotels = Hotel.objects.filter(
-                Q(name__icontains=q) | Q(city__name__icontains=q)
+                search_q("hotel", q)
             ).select_related('city').prefetch_related('city__airports')[:10]
             for hotel in hotels:
-                city_airport = hotel.city.airports.first() if hotel.city else None
+                city_airport = (
+                    next(iter(hotel.city.airports.all()), None) if hotel.city else None
+                )
                 results.append({
                     "id": hotel.id,
                     "name": hotel.name,
@@ -32,9 +36,9 @@ class LocationSuggestionsView(generics.ListAPIView):
                     "city_id": city_airport.id if city_airport else (hotel.city.id if hotel.city else None),
                 })
 
-            cities = City.objects.filter(name__icontains=q).prefetch_related('airports')[:5]
+            cities = City.objects.filter(search_q("city", q)).prefetch_related('airports')[:5]
             for city in cities:
-                city_airport = city.airports.first()
+                city_airport = next(iter(city.airports.all()), None)
                 results.append({
                     "id": city.id,
                     "name": city.name,
@@ -46,7 +50,7 @@ class LocationSuggestionsView(generics.ListAPIView):
         elif type_param == 'flight':
             # Search airports and cities (cities must have airports)
             airports = Airport.objects.filter(
-                Q(name__icontains=q) | Q(city__name__icontains=q) | Q(code__icontains=q)
+                search_q("airport", q)
             ).select_related('city')[:10]
             for airport in airports:
                 results.append({
@@ -57,11 +61,11 @@ class LocationSuggestionsView(generics.ListAPIView):
                 })
 
             cities = City.objects.filter(
-                name__icontains=q,
+                search_q("city", q),
                 airports__isnull=False
-            ).distinct()[:5]
+            ).distinct().prefetch_related('airports')[:5]
             for city in cities:
-                airport = city.airports.first()
+                airport = next(iter(city.airports.all()), None)
                 if airport:
                     results.append({
                         "id": airport.id,
@@ -70,4 +74,17 @@ class LocationSuggestionsView(generics.ListAPIView):
                         "subtitle": "",
                     })
 
+        elif type_param == 'activity':
+            activities = Activity.objects.filter(
+                search_q("activity", q)
+            ).select_related('city')[:10]
+            for activity in activities:
+                results.append({
+                    "id": activity.id,
+                    "name": activity.name,
+                    "type": "activity",
+                    "subtitle": activity.city.name if activity.city else "",
+                    "city_id": activity.city_id,
+                })
+
         return Response({"results": results})
@@ -0,0 +1,7 @@
+from django.db import models
+
+
+class NotificationDeliveryStatus(models.IntegerChoices):
+    PENDING = 0, "Pending"
+    SENT = 1, "Sent"
+    FAILED = 2, "Failed"
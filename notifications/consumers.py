@@ -1,12 +1,7 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.core.paginator import Paginator
 from channels.db import database_sync_to_async
-from .models import Notification
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-
-PAGE_SIZE = 10  # số thông báo mỗi lần trả về
+from .read_model import get_page, get_unread_count, mark_read
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -34,12 +29,13 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         action = data.get("action")
 
         if action == "load_more":
+            # cursor = next_cursor của trang trước; page chỉ còn cho client cũ
             page = data.get("page", 1)
             try:
                 page = int(page)
             except (ValueError, TypeError):
                 page = 1
-            await self.send_notifications_page(page)
+            await self.send_notifications_page(page, cursor=data.get("cursor"))
 
         # Đánh dấu đã đọc 1 thông báo
         elif action == "mark_as_read":
@@ -47,8 +43,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             if noti_id:
                 await self.mark_as_read(noti_id)
 
-    async def send_notifications_page(self, page_number=1):
-        notifications_page = await self.get_notifications_page(page_number)
+    async def send_notifications_page(self, page_number=1, cursor=None):
+        notifications_page = await self.get_notifications_page(page_number, cursor)
 
         await self.send(
             text_data=json.dumps(
@@ -57,6 +53,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                     "page": page_number,
                     "notifications": notifications_page["items"],
                     "has_next": notifications_page["has_next"],
+                    "next_cursor": notifications_page["next_cursor"],
                     "total_unseen": notifications_page["total_unseen"],
                 }
             )
@@ -64,44 +61,15 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_total_unseen(self):
-        return Notification.objects.filter(user=self.user, is_read=False).count()
+        return get_unread_count(self.user.id)
 
     @database_sync_to_async
-    def get_notifications_page(self, page_number):
-        # Lấy các thông báo user, sắp theo created_at giảm dần
-        qs = Notification.objects.filter(user=self.user).order_by("-created_at")
-        paginator = Paginator(qs, PAGE_SIZE)
-        try:
-            page = paginator.page(page_number)
-        except:
-            # nếu page lớn hơn, trả rỗng
-            return {"items": [], "has_next": False}
-
-        # serialize
-        items = []
-        for n in page.object_list:
-            items.append(
-                {
-                    "id": n.id,
-                    "title": n.title,
-                    "message": n.message,
-                    "link": n.link,
-                    "is_read": n.is_read,
-                    "is_error": n.is_error,
-                    "created_at": n.created_at.isoformat(),
-                }
-            )
-
-        # thêm thống kê thông báo chưa đọc
-        total_unseen = Notification.objects.filter(
-            user=self.user, is_read=False
-        ).count()
-
-        return {
-            "items": items,
-            "has_next": page.has_next(),
-            "total_unseen": total_unseen,
-        }
+    def get_notifications_page(self, page_number, cursor=None):
+        # Trang đầu + số chưa đọc lấy từ cache / counter, không COUNT mỗi lần kết nối
+        return dict(
+            get_page(self.user.id, cursor=cursor, page=page_number),
+            total_unseen=get_unread_count(self.user.id),
+        )
 
     async def new_notification(self, event):
         """Khi có noti mới từ server"""
@@ -128,18 +96,13 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def mark_as_read_db(self, noti_id):
         try:
-            n = Notification.objects.get(id=noti_id, user=self.user)
-            if not n.is_read:
-                n.is_read = True
-                n.save()
-        except Notification.DoesNotExist:
+            noti_id = int(noti_id)
+        except (ValueError, TypeError):
+            return None
+        if not mark_read(self.user.id, noti_id):
             return None
 
-        total_unseen = Notification.objects.filter(
-            user=self.user, is_read=False
-        ).count()
-
-        return {"notification_id": noti_id, "total_unseen": total_unseen}
+        return {"notification_id": noti_id, "total_unseen": get_unread_count(self.user.id)}
 
     async def mark_as_read(self, noti_id):
         result = await self.mark_as_read_db(noti_id)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import BATCH_SIZE, deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Gửi email / websocket cho các Notification đang chờ trong outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục thay vì 1 lượt"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5.0, help="Số giây nghỉ khi outbox trống"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                processed = deliver_pending(options["batch_size"])
+                if not processed:
+                    break
+                total += processed
+            if total:
+                self.stdout.write(f"Delivered {total} notification(s)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
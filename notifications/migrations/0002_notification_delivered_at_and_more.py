@@ -0,0 +1,54 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:46
+
+from django.db import migrations, models
+
+
+def mark_existing_delivered(apps, schema_editor):
+    # Notification cũ đã được gửi đồng bộ lúc tạo, không đưa vào outbox
+    Notification = apps.get_model("notifications", "Notification")
+    Notification.objects.update(delivery_status=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_status',
+            field=models.IntegerField(choices=[(0, 'Pending'), (1, 'Sent'), (2, 'Failed')], default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='send_email',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['delivery_status', 'next_attempt_at'], name='notification_outbox_idx'),
+        ),
+        migrations.RunPython(mark_existing_delivered, migrations.RunPython.noop),
+    ]
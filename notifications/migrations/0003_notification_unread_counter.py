@@ -0,0 +1,28 @@
+# Generated by Django 4.2.21 on 2026-10-17 21:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_rename_chatbot_id_customuser_chat_id'),
+        ('notifications', '0002_notification_delivered_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationUnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notification_user_feed_idx'),
+        ),
+    ]
@@ -1,9 +1,59 @@
-from django.db import models
-from django.conf import settings
-from django.core.mail import send_mail
+from django.db import models, transaction
+from django.utils import timezone
 from accounts.models import CustomUser
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from notifications.constants.delivery_status import NotificationDeliveryStatus
+
+
+class NotificationManager(models.Manager):
+    # Các field được lấy từ template khi fan_out
+    TEMPLATE_FIELDS = ("title", "message", "message_email", "link")
+
+    def fan_out(self, recipients, template, context=None):
+        """
+        Tạo cùng 1 thông báo cho nhiều người nhận (admin, nhân viên...) bằng 1 câu
+        INSERT, rồi đánh thức outbox 1 lần để gửi email / websocket theo lô.
+
+        template: dict title/message/message_email/link (+ send_mail_flag),
+        các chuỗi được format với context nếu có.
+        recipients: CustomUser hoặc notifications.recipients.Recipient.
+        """
+        fields = {
+            name: (
+                template[name].format_map(context)
+                if context and template.get(name)
+                else template.get(name)
+            )
+            for name in self.TEMPLATE_FIELDS
+            if name in template
+        }
+        now = timezone.now()
+
+        notifications = []
+        seen = set()
+        for recipient in recipients:
+            if recipient is None or recipient.id in seen:
+                continue
+            seen.add(recipient.id)
+            notifications.append(
+                self.model(
+                    user_id=recipient.id,
+                    email=recipient.email,
+                    send_email=template.get("send_mail_flag", True),
+                    delivery_status=NotificationDeliveryStatus.PENDING,
+                    next_attempt_at=now,
+                    **fields,
+                )
+            )
+        if not notifications:
+            return []
+
+        created = self.bulk_create(notifications)
+        from notifications.outbox import schedule_delivery
+        from notifications.read_model import adjust_unread
+
+        adjust_unread([n.user_id for n in created], 1)
+        schedule_delivery()
+        return created
 
 
 class Notification(models.Model):
@@ -19,57 +69,100 @@ class Notification(models.Model):
     link = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Outbox: email + websocket được gửi ở background (notifications/outbox.py)
+    send_email = models.BooleanField(default=True)
+    delivery_status = models.IntegerField(
+        choices=NotificationDeliveryStatus.choices,
+        default=NotificationDeliveryStatus.PENDING,
+    )
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    objects = NotificationManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["delivery_status", "next_attempt_at"],
+                name="notification_outbox_idx",
+            ),
+            # Keyset paging theo (created_at, id) của từng user
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="notification_user_feed_idx",
+            ),
+        ]
+
     def __init__(self, *args, **kwargs):
         # Lấy tham số đặc biệt, không phải field model
         self._send_mail_flag = kwargs.pop("send_mail_flag", True)  # mặc định gửi mail
         super().__init__(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "is_read" in field_names:
+            instance._was_read = instance.is_read
+        return instance
+
+    def _unread_delta(self):
+        """Thay đổi số chưa đọc của user khi lưu bản ghi này (+1 / -1 / 0)."""
+        if not self.user_id:
+            return 0
+        if self._state.adding:
+            return 0 if self.is_read else 1
+        was_read = getattr(self, "_was_read", self.is_read)
+        return int(was_read) - int(self.is_read)
+
     def save(self, *args, **kwargs):
+        from notifications.read_model import adjust_unread
+
         creating = self._state.adding
-        super().save(*args, **kwargs)
-
-        recipient = self.email or (self.user.email if self.user else None)
-        if creating and recipient and self._send_mail_flag:
-            try:
-                # gửi email (nếu cần)
-                send_mail(
-                    subject=self.title,
-                    message=self.message,
-                    from_email=None,
-                    recipient_list=[recipient],
-                    html_message=self.message_email,
-                    fail_silently=False,
-                )
-            except Exception as e:
-                # Log lỗi (dùng logging hoặc print cho dev)
-                import logging
-
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send email to {recipient}: {str(e)}")
-                # Có thể set flag lỗi nếu cần: self.is_error = True; self.save(update_fields=['is_error'])
-
-        # Gửi realtime đến user (nếu có)
-        if creating and self.user:
-            channel_layer = get_channel_layer()
-            payload = {
-                "type": "new_notification",  # maps to NotificationConsumer.new_notification
-                "title": self.title,
-                "message": self.message,
-                "link": self.link,
-                "created_at": self.created_at.isoformat(),
-                "payload": {
-                    "notification_id": self.id,
-                    # thêm các dữ liệu khác nếu cần
-                },
-            }
-            try:
-                # async_to_sync để gọi từ sync context (save)
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{self.user.id}_notifications", payload
-                )
-            except Exception as e:
-                # Log lỗi (dùng logging hoặc print cho dev)
-                import logging
+        if creating:
+            # Chỉ ghi vào outbox, không gửi SMTP / websocket trong request
+            self.send_email = self._send_mail_flag
+            self.delivery_status = NotificationDeliveryStatus.PENDING
+            self.next_attempt_at = timezone.now()
+        delta = self._unread_delta()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if delta:
+                adjust_unread([self.user_id], delta)
+        self._was_read = self.is_read
+        if creating:
+            from notifications.outbox import schedule_delivery
+
+            schedule_delivery()
 
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send group to user: {str(e)}")
+    def delete(self, *args, **kwargs):
+        from notifications.read_model import adjust_unread
+
+        user_id, was_unread = self.user_id, not getattr(self, "_was_read", self.is_read)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if user_id and was_unread:
+                adjust_unread([user_id], -1)
+        return result
+
+    @property
+    def recipient_email(self):
+        return self.email or (self.user.email if self.user else None)
+
+
+class NotificationUnreadCounter(models.Model):
+    """
+    Số thông báo chưa đọc của 1 user, cập nhật khi tạo / đánh dấu đã đọc / xóa
+    (notifications/read_model.py) thay vì COUNT mỗi lần websocket kết nối.
+    Chưa có dòng thì được khởi tạo bằng COUNT ở lần cập nhật / đọc đầu tiên.
+    """
+
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_unread_counter",
+    )
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
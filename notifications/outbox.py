@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from notifications.constants.delivery_status import NotificationDeliveryStatus
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# Lần thử thứ n thất bại → chờ RETRY_BASE_SECONDS * 2^(n-1)
+RETRY_BASE_SECONDS = 30
+# Lô đã nhận được "giữ" trong khoảng này; worker chết giữa chừng thì lô được nhận lại
+LEASE_SECONDS = 300
+
+_executor = None
+_wakeup_pending = False
+# Hẹn giờ đánh thức worker khi tới lượt retry / lease hết hạn (mode "thread")
+_timer = None
+_timer_at = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.NOTIFICATION_OUTBOX_WORKERS,
+            thread_name_prefix="notification-outbox",
+        )
+    return _executor
+
+
+def schedule_delivery():
+    """
+    Gọi khi tạo Notification: sau khi transaction commit thì đánh thức worker
+    trong process; sau mỗi lượt drain worker tự hẹn giờ cho lần retry kế tiếp.
+    Ở mode "command" việc gửi do `manage.py drain_notifications` đảm nhận.
+    """
+    if settings.NOTIFICATION_OUTBOX_MODE != "thread":
+        return
+    transaction.on_commit(_wake_up)
+
+
+def _wake_up():
+    # Nhiều notification trong 1 request chỉ cần 1 lượt drain
+    global _wakeup_pending
+    with _lock:
+        if _wakeup_pending:
+            return
+        _wakeup_pending = True
+        _get_executor().submit(_drain_in_thread)
+
+
+def _drain_in_thread():
+    global _wakeup_pending
+    with _lock:
+        _wakeup_pending = False
+    close_old_connections()
+    try:
+        while deliver_pending():
+            pass
+    except Exception:
+        logger.exception("Notification outbox drain failed")
+    finally:
+        try:
+            _schedule_next_drain()
+        except Exception:
+            logger.exception("Failed to schedule next notification outbox drain")
+        close_old_connections()
+
+
+def _schedule_next_drain():
+    """
+    Hẹn lượt drain kế tiếp tại next_attempt_at sớm nhất còn PENDING: bản ghi chờ
+    retry hoặc lô có lease bị bỏ dở được gửi lại mà không cần chờ notification mới.
+    """
+    from notifications.models import Notification
+
+    global _timer, _timer_at
+    next_at = Notification.objects.filter(
+        delivery_status=NotificationDeliveryStatus.PENDING,
+        next_attempt_at__isnull=False,
+    ).aggregate(next_at=Min("next_attempt_at"))["next_at"]
+    if next_at is None:
+        return
+    with _lock:
+        if _timer is not None and _timer_at <= next_at:
+            return  # Đã hẹn sớm hơn
+        if _timer is not None:
+            _timer.cancel()
+        # Ít nhất 1 giây: bản ghi đến hạn nhưng đang bị worker khác khóa thì chờ lượt sau
+        delay = max((next_at - timezone.now()).total_seconds(), 1.0)
+        _timer = threading.Timer(delay, _on_timer)
+        _timer.daemon = True
+        _timer_at = next_at
+        _timer.start()
+
+
+def _on_timer():
+    global _timer, _timer_at
+    with _lock:
+        _timer = None
+        _timer_at = None
+    _wake_up()
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Nhận 1 lô notification đến hạn gửi, đẩy next_attempt_at ra sau để giữ chỗ."""
+    from notifications.models import Notification
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(
+                delivery_status=NotificationDeliveryStatus.PENDING,
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if ids:
+            Notification.objects.filter(id__in=ids).update(
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return list(Notification.objects.filter(id__in=ids).select_related("user"))
+
+
+def deliver_pending(batch_size=BATCH_SIZE):
+    """Gửi 1 lô: email qua 1 kết nối SMTP, websocket cho user. Trả về số bản ghi đã xử lý."""
+    notifications = claim_batch(batch_size)
+    if not notifications:
+        return 0
+
+    errors = {}
+    _send_emails(notifications, errors)
+    _push_websocket(notifications)
+
+    now = timezone.now()
+    for notification in notifications:
+        error = errors.get(notification.id)
+        notification.delivery_attempts += 1
+        if error is None:
+            notification.delivery_status = NotificationDeliveryStatus.SENT
+            notification.delivered_at = now
+            notification.next_attempt_at = None
+            notification.last_error = None
+        else:
+            notification.last_error = error[:1000]
+            if notification.delivery_attempts >= MAX_ATTEMPTS:
+                notification.delivery_status = NotificationDeliveryStatus.FAILED
+                notification.next_attempt_at = None
+            else:
+                notification.next_attempt_at = now + timedelta(
+                    seconds=RETRY_BASE_SECONDS
+                    * 2 ** (notification.delivery_attempts - 1)
+                )
+        notification.save(
+            update_fields=[
+                "delivery_status",
+                "delivery_attempts",
+                "next_attempt_at",
+                "delivered_at",
+                "last_error",
+            ]
+        )
+    return len(notifications)
+
+
+def _send_emails(notifications, errors):
+    to_send = [
+        n for n in notifications if n.send_email and n.recipient_email
+    ]
+    if not to_send:
+        return
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Failed to open mail connection: {str(e)}")
+        for notification in to_send:
+            errors[notification.id] = str(e)
+        return
+
+    try:
+        for notification in to_send:
+            message = EmailMultiAlternatives(
+                subject=notification.title,
+                body=notification.message or "",
+                to=[notification.recipient_email],
+                connection=connection,
+            )
+            if notification.message_email:
+                message.attach_alternative(notification.message_email, "text/html")
+            try:
+                message.send()
+            except Exception as e:
+                logger.error(
+                    f"Failed to send email to {notification.recipient_email}: {str(e)}"
+                )
+                errors[notification.id] = str(e)
+                # Kết nối có thể đã hỏng, lần gửi sau sẽ tự mở lại
+                connection.close()
+    finally:
+        connection.close()
+
+
+def _push_websocket(notifications):
+    # Realtime chỉ đẩy ở lần gửi đầu, các lần retry chỉ dành cho email
+    targets = [n for n in notifications if n.user_id and n.delivery_attempts == 0]
+    if not targets:
+        return
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    messages = []
+    for notification in targets:
+        payload = {
+            "type": "new_notification",  # maps to NotificationConsumer.new_notification
+            "title": notification.title,
+            "message": notification.message,
+            "link": notification.link,
+            "created_at": notification.created_at.isoformat(),
+            "payload": {
+                "notification_id": notification.id,
+            },
+        }
+        messages.append((f"user_{notification.user_id}_notifications", payload))
+
+    # Gửi cả lô trong 1 event loop thay vì 1 async_to_sync cho mỗi user
+    results = async_to_sync(_group_send_all)(channel_layer, messages)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Failed to send group to user: {str(result)}")
+
+
+async def _group_send_all(channel_layer, messages):
+    return await asyncio.gather(
+        *(channel_layer.group_send(group, payload) for group, payload in messages),
+        return_exceptions=True,
+    )
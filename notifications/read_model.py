@@ -0,0 +1,193 @@
+import base64
+import json
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 10  # số thông báo mỗi lần trả về
+CACHE_ALIAS = "notifications"
+FEED_FIELDS = ("id", "title", "message", "link", "is_read", "is_error", "created_at")
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def _head_key(user_id):
+    return f"notifications:head:{user_id}"
+
+
+def invalidate(user_ids):
+    """Xóa cache trang đầu + số chưa đọc của các user sau khi transaction commit."""
+    keys = [key for user_id in user_ids for key in (_unread_key(user_id), _head_key(user_id))]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+# =========================
+# SỐ CHƯA ĐỌC
+# =========================
+def _init_counters(user_ids):
+    """Tạo counter còn thiếu bằng COUNT (đã gồm thay đổi vừa ghi trong transaction)."""
+    from notifications.models import Notification, NotificationUnreadCounter
+
+    counts = dict.fromkeys(user_ids, 0)
+    counts.update(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .values("user_id")
+        .annotate(total=Count("id"))
+        .values_list("user_id", "total")
+    )
+    NotificationUnreadCounter.objects.bulk_create(
+        [
+            NotificationUnreadCounter(user_id=user_id, unread_count=total)
+            for user_id, total in counts.items()
+        ],
+        ignore_conflicts=True,
+    )
+    return counts
+
+
+def adjust_unread(user_ids, delta):
+    """Cộng delta vào số chưa đọc của mỗi user trong user_ids (1 câu UPDATE)."""
+    from notifications.models import NotificationUnreadCounter
+
+    user_ids = list({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+
+    updated = NotificationUnreadCounter.objects.filter(user_id__in=user_ids).update(
+        unread_count=F("unread_count") + delta
+    )
+    if updated < len(user_ids):
+        existing = set(
+            NotificationUnreadCounter.objects.filter(user_id__in=user_ids).values_list(
+                "user_id", flat=True
+            )
+        )
+        _init_counters([user_id for user_id in user_ids if user_id not in existing])
+    invalidate(user_ids)
+
+
+def get_unread_count(user_id):
+    cache = get_cache()
+    key = _unread_key(user_id)
+    unread = cache.get(key)
+    if unread is None:
+        from notifications.models import NotificationUnreadCounter
+
+        unread = (
+            NotificationUnreadCounter.objects.filter(user_id=user_id)
+            .values_list("unread_count", flat=True)
+            .first()
+        )
+        if unread is None:
+            unread = _init_counters([user_id])[user_id]
+        unread = max(unread, 0)
+        cache.set(key, unread)
+    return unread
+
+
+def mark_read(user_id, notification_id):
+    """
+    Đánh dấu đã đọc. Trả về False nếu thông báo không thuộc user; chỉ lần đầu
+    chuyển sang đã đọc mới trừ counter.
+    """
+    from notifications.models import Notification
+
+    with transaction.atomic():
+        changed = Notification.objects.filter(
+            id=notification_id, user_id=user_id, is_read=False
+        ).update(is_read=True)
+        if changed:
+            adjust_unread([user_id], -1)
+            return True
+    return Notification.objects.filter(id=notification_id, user_id=user_id).exists()
+
+
+# =========================
+# DANH SÁCH (KEYSET)
+# =========================
+def encode_cursor(notification):
+    raw = json.dumps(
+        {"c": notification["created_at"], "id": notification["id"]},
+        separators=(",", ":"),
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        created_at = parse_datetime(position["c"])
+        if created_at is None:
+            raise ValueError
+        return created_at, int(position["id"])
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+def _serialize(notification):
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "message": notification.message,
+        "link": notification.link,
+        "is_read": notification.is_read,
+        "is_error": notification.is_error,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def _load_page(user_id, position=None, offset=0):
+    from notifications.models import Notification
+
+    queryset = (
+        Notification.objects.filter(user_id=user_id)
+        .only(*FEED_FIELDS)
+        .order_by("-created_at", "-id")
+    )
+    if position is not None:
+        created_at, last_id = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id)
+        )
+    # Lấy dư 1 bản ghi để biết còn trang sau, không COUNT
+    rows = [_serialize(n) for n in queryset[offset : offset + PAGE_SIZE + 1]]
+    has_next = len(rows) > PAGE_SIZE
+    items = rows[:PAGE_SIZE]
+    return {
+        "items": items,
+        "has_next": has_next,
+        "next_cursor": encode_cursor(items[-1]) if has_next else None,
+    }
+
+
+def get_page(user_id, cursor=None, page=1):
+    """
+    Trang thông báo theo (created_at, id) giảm dần. Trang đầu được cache (mỗi lần
+    kết nối lại đều đọc trang này); `cursor` lấy từ next_cursor của trang trước.
+    `page` > 1 không kèm cursor vẫn được hỗ trợ cho client cũ (OFFSET, không COUNT).
+    """
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return {"items": [], "has_next": False, "next_cursor": None}
+        return _load_page(user_id, position)
+    if page > 1:
+        return _load_page(user_id, offset=(page - 1) * PAGE_SIZE)
+
+    cache = get_cache()
+    key = _head_key(user_id)
+    head = cache.get(key)
+    if head is None:
+        head = _load_page(user_id)
+        cache.set(key, head)
+    return head
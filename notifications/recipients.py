@@ -0,0 +1,52 @@
+import uuid
+from collections import namedtuple
+
+from notifications.read_model import get_cache
+
+# Người nhận tối giản cho Notification.objects.fan_out (cùng thuộc tính với CustomUser)
+Recipient = namedtuple("Recipient", ["id", "email"])
+
+RECIPIENT_CACHE_TTL = 300
+VERSION_KEY = "notification_recipients:version"
+# CustomUser.save(update_fields=...) chạm các field này thì danh sách người nhận đổi
+RECIPIENT_FIELDS = {"role", "manager", "email"}
+
+
+# Dùng chung alias "notifications" (Redis) với feed: CustomUser đổi ở 1 process
+# thì mọi worker khác cũng thấy version mới; không có Redis thì không cache
+def _versioned_key(name):
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        cache.set(VERSION_KEY, version, timeout=None)
+    return f"notification_recipients:{version}:{name}"
+
+
+def _cached_recipients(name, queryset):
+    cache = get_cache()
+    key = _versioned_key(name)
+    recipients = cache.get(key)
+    if recipients is None:
+        recipients = [Recipient(*row) for row in queryset.values_list("id", "email")]
+        cache.set(key, recipients, RECIPIENT_CACHE_TTL)
+    return recipients
+
+
+def get_admin_recipients():
+    from accounts.models import CustomUser
+
+    return _cached_recipients("admins", CustomUser.objects.filter(role="admin"))
+
+
+def get_hotel_staff_recipients(manager):
+    if manager is None:
+        return []
+    return _cached_recipients(
+        f"hotel_staffs:{manager.pk}", manager.hotel_staffs.all()
+    )
+
+
+def invalidate_recipients(update_fields=None):
+    if update_fields is None or RECIPIENT_FIELDS & set(update_fields):
+        get_cache().set(VERSION_KEY, uuid.uuid4().hex[:12], timeout=None)
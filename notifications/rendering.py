@@ -0,0 +1,230 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.template.loader import get_template
+
+from bookings.constants.service_type import ServiceType
+
+DEFAULT_AVATAR = "/media/user_images/default-avatar.png"
+
+# Sự kiện / người nhận / kênh -> tên file template
+EVENT_SUCCESS = "success"
+EVENT_FAILED = "failed"
+AUDIENCE_CUSTOMER = "customer"
+AUDIENCE_STAFF = "staff"  # chủ khách sạn, nhân viên, tài xế, người tổ chức, admin
+CHANNEL_WEB = "web"
+CHANNEL_EMAIL = "email"
+
+SERVICE_KEYS = {
+    ServiceType.HOTEL: "hotel",
+    ServiceType.CAR: "car",
+    ServiceType.ACTIVITY: "activity",
+    ServiceType.FLIGHT: "flight",
+}
+
+
+@lru_cache(maxsize=None)
+def get_notification_template(service_type, event, audience, channel):
+    """
+    Template đã biên dịch cho (dịch vụ, sự kiện, người nhận, kênh), mỗi process
+    chỉ parse 1 lần.
+    """
+    return get_template(
+        f"notifications/payment/{SERVICE_KEYS[service_type]}/"
+        f"{event}_{audience}_{channel}.html"
+    )
+
+
+def render_notification(service_type, event, audience, channel, context):
+    template = get_notification_template(service_type, event, audience, channel)
+    return template.render(context).strip()
+
+
+def _related_for(service_type):
+    """select_related / prefetch_related cần cho từng loại dịch vụ."""
+    from flights.models import FlightBookingDetail, FlightLeg
+    from hotels.models import HotelImage
+
+    if service_type == ServiceType.HOTEL:
+        return (
+            ["hotel_detail__room__hotel", "hotel_detail__owner_hotel"],
+            [
+                Prefetch(
+                    "hotel_detail__room__hotel__images",
+                    queryset=HotelImage.objects.only("id", "hotel_id", "image")
+                    .order_by("id")[:1],
+                    to_attr="notification_images",
+                )
+            ],
+        )
+    if service_type == ServiceType.CAR:
+        return (["car_detail__car", "car_detail__driver"], [])
+    if service_type == ServiceType.ACTIVITY:
+        return (
+            [
+                "activity_date_detail__activity_date__activity_package__activity",
+                "activity_date_detail__event_organizer_activity",
+            ],
+            [],
+        )
+    if service_type == ServiceType.FLIGHT:
+        return (
+            [],
+            [
+                Prefetch(
+                    "flight_details",
+                    queryset=FlightBookingDetail.objects.select_related(
+                        "flight__airline__flight_operations_staff"
+                    ).order_by("id"),
+                ),
+                Prefetch(
+                    "flight_details__flight__legs",
+                    queryset=FlightLeg.objects.select_related(
+                        "departure_airport", "arrival_airport"
+                    ).order_by("departure_time"),
+                ),
+            ],
+        )
+    return ([], [])
+
+
+class FlightSegment:
+    """1 flight trong booking: hãng bay + leg cất cánh đầu / hạ cánh cuối."""
+
+    def __init__(self, detail):
+        self.detail = detail
+        self.airline = detail.flight.airline if detail.flight else None
+        legs = list(detail.flight.legs.all()) if detail.flight else []
+        self.first_leg = legs[0] if legs else None
+        self.last_leg = max(legs, key=lambda leg: leg.arrival_time) if legs else None
+
+    @property
+    def complete(self):
+        return self.first_leg is not None and self.last_leg is not None
+
+
+class BookingNotificationContext:
+    """
+    Nạp booking cùng toàn bộ quan hệ cần để render thông báo trong số câu
+    query cố định theo loại dịch vụ, rồi cung cấp context cho mọi template.
+    """
+
+    def __init__(self, booking, base_url):
+        self.booking = booking
+        self.base_url = base_url
+        self.service_type = booking.service_type
+        # Tổng thời gian render template, để đo mỗi lần xác nhận thanh toán
+        self.render_seconds = 0.0
+
+    @classmethod
+    def load(cls, booking_id, service_type, base_url):
+        from bookings.models import Booking
+
+        select, prefetch = _related_for(service_type)
+        booking = (
+            Booking.objects.select_related("user", "guest_info", *select)
+            .prefetch_related(*prefetch)
+            .get(pk=booking_id)
+        )
+        return cls(booking, base_url)
+
+    @property
+    def guest_info(self):
+        return getattr(self.booking, "guest_info", None)
+
+    @property
+    def customer_name(self):
+        if self.guest_info:
+            return self.guest_info.full_name
+        return self.booking.user.username if self.booking.user else "Khách"
+
+    @property
+    def username(self):
+        return self.booking.user.username if self.booking.user else "Khách"
+
+    @property
+    def avatar_url(self):
+        user = self.booking.user
+        avatar = user.avatar if user and user.avatar else DEFAULT_AVATAR
+        return f"{self.base_url}{avatar}"
+
+    @property
+    def detail(self):
+        if self.service_type == ServiceType.HOTEL:
+            return getattr(self.booking, "hotel_detail", None)
+        if self.service_type == ServiceType.CAR:
+            return getattr(self.booking, "car_detail", None)
+        if self.service_type == ServiceType.ACTIVITY:
+            return getattr(self.booking, "activity_date_detail", None)
+        return None
+
+    @property
+    def image_url(self):
+        detail = self.detail
+        if self.service_type == ServiceType.HOTEL:
+            images = detail.room.hotel.notification_images
+            image = images[0].image if images else ""
+        elif self.service_type == ServiceType.CAR:
+            image = detail.car.image
+        elif self.service_type == ServiceType.ACTIVITY:
+            image = detail.activity_image
+        else:
+            return ""
+        return f"{self.base_url}{image or ''}"
+
+    @property
+    def has_details(self):
+        """Booking đã có chi tiết dịch vụ (phòng / xe / hoạt động / chuyến bay)."""
+        if self.service_type == ServiceType.FLIGHT:
+            return bool(self.flight_segments)
+        return self.detail is not None
+
+    @property
+    def flight_segments(self):
+        if not hasattr(self, "_flight_segments"):
+            self._flight_segments = [
+                FlightSegment(detail) for detail in self.booking.flight_details.all()
+            ]
+        return self._flight_segments
+
+    def as_dict(self, **extra):
+        context = {
+            "booking": self.booking,
+            "base_url": self.base_url,
+            "front_url": settings.FRONT_END_URL,
+            "customer_name": self.customer_name,
+            "username": self.username,
+            "avatar_url": self.avatar_url,
+        }
+        if self.service_type == ServiceType.FLIGHT:
+            context["segments"] = self.flight_segments
+        else:
+            context["detail"] = self.detail
+            context["image_url"] = self.image_url
+        context.update(extra)
+        return context
+
+    def flight_context(self, segments):
+        """Context cho 1 hành trình (1 chiều = 1 segment, khứ hồi = 2 segment)."""
+        return self.as_dict(
+            segments=segments,
+            round_trip=len(segments) > 1,
+            complete=all(segment.complete for segment in segments),
+        )
+
+    def render(self, event, audience, channel, context=None):
+        if context is None:
+            context = (
+                self.flight_context(self.flight_segments)
+                if self.service_type == ServiceType.FLIGHT
+                else self.as_dict()
+            )
+        started = time.perf_counter()
+        try:
+            return render_notification(
+                self.service_type, event, audience, channel, context
+            )
+        finally:
+            self.render_seconds += time.perf_counter() - started
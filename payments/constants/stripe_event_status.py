@@ -0,0 +1,8 @@
+from django.db import models
+
+
+class StripeEventStatus(models.IntegerChoices):
+    PENDING = 0, "Pending"
+    PROCESSED = 1, "Processed"
+    FAILED = 2, "Failed"
+    IGNORED = 3, "Ignored"
@@ -0,0 +1,155 @@
+from agoda_be.filters import (
+    FilterSpec,
+    Param,
+    ToMany,
+    range_params,
+    to_date,
+    to_datetime,
+    to_str,
+)
+from bookings.constants.service_type import ServiceType
+
+HOTEL = {"booking__service_type": ServiceType.HOTEL}
+CAR = {"booking__service_type": ServiceType.CAR}
+ACTIVITY = {"booking__service_type": ServiceType.ACTIVITY}
+FLIGHT = {"booking__service_type": ServiceType.FLIGHT}
+
+# booking -> flight_details là quan hệ 1-nhiều (khứ hồi / nhiều chặng)
+FLIGHT_DETAILS = ToMany(
+    "flights.FlightBookingDetail", inner="booking_id", outer="booking_id"
+)
+
+
+def to_ref_ids(value):
+    return [int(value)]
+
+
+PAYMENT_FILTERS = FilterSpec(
+    [
+        # Booking / payment
+        Param("booking__service_type", "booking__service_type"),
+        Param(
+            "booking__service_ref_id", "booking__service_ref_ids__contains", to_ref_ids
+        ),
+        Param("booking__booking_code", "booking__booking_code", to_str),
+        Param("transaction_id", "transaction_id", to_str),
+        Param("booking__user_id", "booking__user_id"),
+        Param("method", "method"),
+        Param("status", "status"),
+        *range_params("min_total_price", "max_total_price", "booking__total_price"),
+        *range_params(
+            "min_discount_amount", "max_discount_amount", "booking__discount_amount"
+        ),
+        *range_params("min_final_price", "max_final_price", "booking__final_price"),
+        *range_params("min_created_at", "max_created_at", "created_at", to_datetime),
+        # Khách sạn
+        Param("owner_hotel_id", "booking__hotel_detail__owner_hotel_id", scope=HOTEL),
+        Param("hotel_id", "booking__hotel_detail__room__hotel_id", scope=HOTEL),
+        Param("room_id", "booking__hotel_detail__room_id", scope=HOTEL),
+        *range_params(
+            "min_time_checkin_room",
+            "max_time_checkin_room",
+            "booking__hotel_detail__check_in",
+            to_datetime,
+        ),
+        *range_params(
+            "min_time_checkout_room",
+            "max_time_checkout_room",
+            "booking__hotel_detail__check_out",
+            to_datetime,
+        ),
+        # Xe
+        Param("driver_id", "booking__car_detail__driver_id", scope=CAR),
+        Param("car_id", "booking__car_detail__car_id", scope=CAR),
+        Param("car_booking_status", "booking__car_detail__status", to_str, scope=CAR),
+        *range_params(
+            "min_pickup_datetime_car",
+            "max_pickup_datetime_car",
+            "booking__car_detail__pickup_datetime",
+            to_datetime,
+        ),
+        *range_params(
+            "min_dropoff_datetime_car",
+            "max_dropoff_datetime_car",
+            "booking__car_detail__dropoff_datetime",
+            to_datetime,
+        ),
+        # Hoạt động
+        Param(
+            "event_organizer_activity_id",
+            "booking__activity_date_detail__event_organizer_activity_id",
+            scope=ACTIVITY,
+        ),
+        Param(
+            "activity_id",
+            "booking__activity_date_detail__activity_date__activity_package__activity_id",
+            scope=ACTIVITY,
+        ),
+        Param(
+            "activity_package_id",
+            "booking__activity_date_detail__activity_date__activity_package_id",
+            scope=ACTIVITY,
+        ),
+        Param(
+            "activity_date_id",
+            "booking__activity_date_detail__activity_date_id",
+            scope=ACTIVITY,
+        ),
+        *range_params(
+            "min_date_launch_activity",
+            "max_date_launch_activity",
+            "booking__activity_date_detail__date_launch",
+            to_datetime,
+        ),
+        Param(
+            "date_launch_activity",
+            "booking__activity_date_detail__date_launch__date",
+            to_date,
+        ),
+        # Máy bay: cùng 1 chuyến trong booking phải thỏa mọi điều kiện
+        Param(
+            "flight_operations_staff_id",
+            "flight__airline__flight_operations_staff_id",
+            relation=FLIGHT_DETAILS,
+            scope=FLIGHT,
+        ),
+        Param(
+            "airline_id", "flight__airline_id", relation=FLIGHT_DETAILS, scope=FLIGHT
+        ),
+        Param(
+            "aircraft_id", "flight__aircraft_id", relation=FLIGHT_DETAILS, scope=FLIGHT
+        ),
+        Param("flight_id", "flight_id", relation=FLIGHT_DETAILS, scope=FLIGHT),
+        # Mọi leg của mọi chuyến phải nằm trong khoảng: loại booking có leg ngoài khoảng
+        Param(
+            "min_flight_leg_departure",
+            "flight__legs__departure_time__lt",
+            to_datetime,
+            relation=FLIGHT_DETAILS,
+            exclude=True,
+        ),
+        Param(
+            "max_flight_leg_departure",
+            "flight__legs__departure_time__gt",
+            to_datetime,
+            relation=FLIGHT_DETAILS,
+            exclude=True,
+        ),
+        Param(
+            "min_flight_leg_arrival",
+            "flight__legs__arrival_time__lt",
+            to_datetime,
+            relation=FLIGHT_DETAILS,
+            exclude=True,
+        ),
+        Param(
+            "max_flight_leg_arrival",
+            "flight__legs__arrival_time__gt",
+            to_datetime,
+            relation=FLIGHT_DETAILS,
+            exclude=True,
+        ),
+    ],
+    # Param khác trùng tên field của Payment -> tìm gần đúng
+    search_fields=("id", "amount", "payment_intent", "created_at"),
+)
@@ -0,0 +1,149 @@
+import functools
+import hashlib
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Request đầu tiên chết giữa chừng: sau khoảng này key được nhận lại
+IN_PROGRESS_TIMEOUT_SECONDS = 60
+# Mỗi process xóa record hết hạn nhiều nhất 1 lần trong khoảng này
+PURGE_INTERVAL_SECONDS = 60
+
+_last_purge = 0.0
+
+
+def purge_expired():
+    """Xóa record đã hết hạn (TTL = settings.IDEMPOTENCY_KEY_TTL). Trả về số record đã xóa."""
+    from payments.models import IdempotencyRecord
+
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
+
+
+def _maybe_purge():
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    purge_expired()
+
+
+def _fingerprint(request):
+    return hashlib.sha256(request.body or b"").hexdigest()
+
+
+def _claim(key, scope, fingerprint):
+    """
+    Giữ key cho request hiện tại. Trả về (record, claimed); claimed = False nghĩa
+    là key đã có chủ (đang xử lý hoặc đã có response).
+    """
+    from payments.models import IdempotencyRecord
+
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                key=key, scope=scope, fingerprint=fingerprint, expires_at=expires_at
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    with transaction.atomic():
+        record = (
+            IdempotencyRecord.objects.select_for_update()
+            .filter(key=key, scope=scope)
+            .first()
+        )
+        if record is None:
+            # Vừa bị purge, client gửi lại sau
+            return None, False
+        abandoned = record.status_code is None and record.created_at < now - timedelta(
+            seconds=IN_PROGRESS_TIMEOUT_SECONDS
+        )
+        if record.expires_at < now or abandoned:
+            # Hết hạn / request trước không hoàn tất: coi như key mới
+            record.fingerprint = fingerprint
+            record.status_code = None
+            record.response = None
+            record.created_at = now
+            record.expires_at = expires_at
+            record.save()
+            return record, True
+    return record, False
+
+
+def _replay(record, fingerprint):
+    if record is None or record.status_code is None:
+        return Response(
+            {"detail": "A request with this Idempotency-Key is still being processed"},
+            status=status.HTTP_409_CONFLICT,
+        )
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": "Idempotency-Key was already used with a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(record.response, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(action):
+    """
+    Decorator cho action của ViewSet: request có header Idempotency-Key được xử lý
+    đúng 1 lần cho mỗi (key, action, pk); gửi lại cùng key trả về response đã lưu
+    mà không chạy lại action (không gọi Stripe, không ghi DB, không gửi thông báo).
+    Response lỗi 5xx và 202 (đang xử lý, chưa có kết quả cuối) không được lưu để
+    client có thể thử lại / hỏi lại với cùng key.
+    """
+
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return action(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} is too long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        _maybe_purge()
+        scope = f"{self.basename}.{action.__name__}:{kwargs.get('pk', '')}"
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(key, scope, fingerprint)
+        if not claimed:
+            return _replay(record, fingerprint)
+
+        try:
+            response = action(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if (
+            response.status_code >= 500
+            or response.status_code == status.HTTP_202_ACCEPTED
+            or not hasattr(response, "data")
+        ):
+            record.delete()
+            return response
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
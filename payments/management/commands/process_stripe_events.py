@@ -0,0 +1,56 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import BATCH_SIZE, ingest_event, process_pending
+
+
+class Command(BaseCommand):
+    help = "Xử lý các Stripe event (webhook) đang chờ trong bảng StripeEvent"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục thay vì 1 lượt"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5.0, help="Số giây nghỉ khi hàng đợi trống"
+        )
+        parser.add_argument(
+            "--file",
+            help="Nạp event từ file JSON lines (mỗi dòng 1 event, '-' = stdin) "
+            "trước khi xử lý, không verify chữ ký. Dùng để chạy luồng event giả lập ở local.",
+        )
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            self.load_events(options["file"])
+
+        while True:
+            total = 0
+            while True:
+                processed = process_pending(options["batch_size"])
+                if not processed:
+                    break
+                total += processed
+            if total:
+                self.stdout.write(f"Processed {total} Stripe event(s)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def load_events(self, path):
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        created = duplicated = 0
+        with stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                _, is_new = ingest_event(json.loads(line))
+                if is_new:
+                    created += 1
+                else:
+                    duplicated += 1
+        self.stdout.write(f"Loaded {created} event(s), {duplicated} duplicate(s)")
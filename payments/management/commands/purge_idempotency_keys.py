@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payments.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Xóa các Idempotency-Key đã hết hạn (IDEMPOTENCY_KEY_TTL)"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f"Purged {deleted} idempotency record(s)")
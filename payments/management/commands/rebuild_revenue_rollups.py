@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payments.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Tính lại bảng PaymentRevenueRollup từ bảng Payment (backfill / sửa lệch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Chỉ tính lại từ ngày này (YYYY-MM-DD), mặc định toàn bộ lịch sử",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError("--since phải có dạng YYYY-MM-DD")
+
+        count = rebuild(since)
+        self.stdout.write(f"Rebuilt {count} revenue rollup row(s)")
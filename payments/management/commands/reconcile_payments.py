@@ -0,0 +1,73 @@
+import asyncio
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import (
+    CHUNK_SIZE,
+    CONCURRENCY,
+    RATE_PER_SECOND,
+    STALE_AFTER_MINUTES,
+    StripeSessionFetcher,
+    StubSessionFetcher,
+    reconcile,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Đối soát các payment PENDING quá hạn với checkout session trên Stripe: "
+        "session hết hạn -> FAILED, đã thanh toán -> xử lý như webhook"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=STALE_AFTER_MINUTES,
+            help="Chỉ xét payment PENDING tạo trước số phút này",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--concurrency", type=int, default=CONCURRENCY, help="Số request Stripe đồng thời"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=RATE_PER_SECOND, help="Số request Stripe tối đa / giây"
+        )
+        parser.add_argument("--limit", type=int, help="Số payment tối đa trong lượt chạy")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Chỉ báo cáo, không ghi DB"
+        )
+        parser.add_argument(
+            "--api-base", help="URL Stripe API thay thế, vd stripe-mock http://localhost:12111"
+        )
+        parser.add_argument(
+            "--stub",
+            help="File JSON {session_id: {status, payment_status, payment_intent}} "
+            "thay cho Stripe (chạy local / đo throughput)",
+        )
+        parser.add_argument(
+            "--stub-latency", type=float, default=0.0, help="Độ trễ giả lập (giây) cho --stub"
+        )
+
+    def handle(self, *args, **options):
+        stats = asyncio.run(self.run(options))
+        self.stdout.write(f"Reconciled: {stats.summary()}")
+
+    async def run(self, options):
+        if options["stub"]:
+            fetch = StubSessionFetcher(options["stub"], options["stub_latency"])
+        else:
+            fetch = StripeSessionFetcher(api_base=options["api_base"])
+        try:
+            return await reconcile(
+                fetch,
+                stale_after=timedelta(minutes=options["stale_minutes"]),
+                chunk_size=options["chunk_size"],
+                concurrency=options["concurrency"],
+                rate=options["rate"],
+                limit=options["limit"],
+                dry_run=options["dry_run"],
+            )
+        finally:
+            await fetch.close()
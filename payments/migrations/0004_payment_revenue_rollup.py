@@ -0,0 +1,68 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+from payments.rollups import (
+    REBUILD_CHUNK_SIZE,
+    build_rollups,
+    payment_queryset,
+    revenue_payments,
+)
+
+
+def backfill_revenue_rollups(apps, schema_editor):
+    PaymentRevenueRollup = apps.get_model("payments", "PaymentRevenueRollup")
+    payments = payment_queryset(
+        apps.get_model("payments", "Payment"),
+        apps.get_model("flights", "FlightBookingDetail"),
+    )
+    PaymentRevenueRollup.objects.bulk_create(
+        build_rollups(revenue_payments(payments), PaymentRevenueRollup),
+        batch_size=REBUILD_CHUNK_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_stripe_event'),
+        ("bookings", "0002_alter_booking_payment_status_alter_booking_status"),
+        ("rooms", "0007_roominventory"),
+        ("cars", "0007_alter_car_avg_star"),
+        ("activities", "0003_activitydate_participants_available"),
+        ("flights", "0003_flight_created_at_flight_updated_at_and_more"),
+        ("airlines", "0003_alter_airline_code"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=255, unique=True)),
+                ('date', models.DateField()),
+                ('service_type', models.IntegerField()),
+                ('customer_id', models.BigIntegerField(blank=True, null=True)),
+                ('hotel_id', models.BigIntegerField(blank=True, null=True)),
+                ('room_id', models.BigIntegerField(blank=True, null=True)),
+                ('owner_hotel_id', models.BigIntegerField(blank=True, null=True)),
+                ('activity_id', models.BigIntegerField(blank=True, null=True)),
+                ('activity_package_id', models.BigIntegerField(blank=True, null=True)),
+                ('activity_date_id', models.BigIntegerField(blank=True, null=True)),
+                ('event_organizer_activity_id', models.BigIntegerField(blank=True, null=True)),
+                ('car_id', models.BigIntegerField(blank=True, null=True)),
+                ('driver_id', models.BigIntegerField(blank=True, null=True)),
+                ('airline_id', models.BigIntegerField(blank=True, null=True)),
+                ('aircraft_id', models.BigIntegerField(blank=True, null=True)),
+                ('flight_id', models.BigIntegerField(blank=True, null=True)),
+                ('flight_operations_staff_id', models.BigIntegerField(blank=True, null=True)),
+                ('revenue', models.FloatField(default=0.0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('payment_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'service_type'], name='revenue_rollup_date_idx'), models.Index(fields=['owner_hotel_id', 'date'], name='revenue_rollup_owner_idx'), models.Index(fields=['event_organizer_activity_id', 'date'], name='revenue_rollup_organizer_idx'), models.Index(fields=['driver_id', 'date'], name='revenue_rollup_driver_idx'), models.Index(fields=['flight_operations_staff_id', 'date'], name='revenue_rollup_flight_ops_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_revenue_rollups, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 # payments/models.py
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from .constants.payment_status import PaymentStatus
 from .constants.payment_method import PaymentMethod
+from .constants.stripe_event_status import StripeEventStatus
 from bookings.models import Booking
 
 
@@ -14,5 +16,150 @@ class Payment(models.Model):
     status = models.CharField(
         max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.PENDING
     )
-    transaction_id = models.CharField(max_length=100, null=True, blank=True)
+    transaction_id = models.CharField(
+        max_length=100, null=True, blank=True, db_index=True
+    )  # Stripe checkout session id
+    payment_intent = models.CharField(
+        max_length=100, null=True, blank=True, db_index=True
+    )  # Stripe payment intent, lưu khi nhận checkout.session.completed
     created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "status" in field_names and "amount" in field_names:
+            instance._rollup_state = instance._revenue_state()
+        return instance
+
+    def _revenue_state(self):
+        from payments.rollups import counts_as_revenue
+
+        return (counts_as_revenue(self.status), float(self.amount or 0))
+
+    def _previous_revenue_state(self):
+        """Trạng thái doanh thu đã ghi vào rollup, None nếu payment chưa được lưu."""
+        if self._state.adding:
+            return None
+        state = getattr(self, "_rollup_state", None)
+        if state is None:
+            old = Payment.objects.filter(pk=self.pk).only("status", "amount").first()
+            state = old._rollup_state if old else None
+        return state
+
+    def save(self, *args, **kwargs):
+        # Rollup doanh thu (PaymentRevenueRollup) được cập nhật cùng transaction
+        from payments.rollups import update_payment_rollup
+
+        with transaction.atomic():
+            previous = self._previous_revenue_state()
+            super().save(*args, **kwargs)
+            self._rollup_state = update_payment_rollup(self, previous)
+
+    def delete(self, *args, **kwargs):
+        from payments.rollups import remove_payment_rollup
+
+        with transaction.atomic():
+            remove_payment_rollup(self, self._previous_revenue_state())
+            return super().delete(*args, **kwargs)
+
+
+class PaymentRevenueRollup(models.Model):
+    """
+    Doanh thu theo ngày, gộp theo loại dịch vụ, khách hàng và các chiều lọc của
+    PaymentListOverviewView (payments/rollups.py). Được cập nhật mỗi khi payment
+    đổi trạng thái / số tiền; tính lại bằng `manage.py rebuild_revenue_rollups`.
+
+    Các cột chiều là id thuần (không FK) để không phải join và không bị xóa dây chuyền.
+    Khách hàng nằm trong khóa vì số khách phân biệt không cộng dồn được giữa các ngày.
+    """
+
+    bucket = models.CharField(max_length=255, unique=True)  # khóa ghép của các cột bên dưới
+    date = models.DateField()
+    service_type = models.IntegerField()
+    customer_id = models.BigIntegerField(null=True, blank=True)
+
+    hotel_id = models.BigIntegerField(null=True, blank=True)
+    room_id = models.BigIntegerField(null=True, blank=True)
+    owner_hotel_id = models.BigIntegerField(null=True, blank=True)
+    activity_id = models.BigIntegerField(null=True, blank=True)
+    activity_package_id = models.BigIntegerField(null=True, blank=True)
+    activity_date_id = models.BigIntegerField(null=True, blank=True)
+    event_organizer_activity_id = models.BigIntegerField(null=True, blank=True)
+    car_id = models.BigIntegerField(null=True, blank=True)
+    driver_id = models.BigIntegerField(null=True, blank=True)
+    airline_id = models.BigIntegerField(null=True, blank=True)
+    aircraft_id = models.BigIntegerField(null=True, blank=True)
+    flight_id = models.BigIntegerField(null=True, blank=True)
+    flight_operations_staff_id = models.BigIntegerField(null=True, blank=True)
+
+    revenue = models.FloatField(default=0.0)
+    order_count = models.IntegerField(default=0)
+    # Số payment góp vào dòng; về 0 thì dòng bị xóa
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "service_type"], name="revenue_rollup_date_idx"),
+            models.Index(fields=["owner_hotel_id", "date"], name="revenue_rollup_owner_idx"),
+            models.Index(
+                fields=["event_organizer_activity_id", "date"],
+                name="revenue_rollup_organizer_idx",
+            ),
+            models.Index(fields=["driver_id", "date"], name="revenue_rollup_driver_idx"),
+            models.Index(
+                fields=["flight_operations_staff_id", "date"],
+                name="revenue_rollup_flight_ops_idx",
+            ),
+        ]
+
+
+class StripeEvent(models.Model):
+    """
+    Event Stripe nhận qua webhook, lưu nguyên payload. event_id unique nên
+    Stripe gửi lại cùng 1 event cũng chỉ được xử lý 1 lần (payments/webhooks.py).
+    """
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.IntegerField(
+        choices=StripeEventStatus.choices, default=StripeEventStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="stripe_event_queue_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Response đã trả cho 1 Idempotency-Key (payments/idempotency.py). Request gửi
+    lại cùng key nhận lại response này thay vì chạy lại action. status_code null
+    nghĩa là request đầu tiên vẫn đang xử lý.
+    """
+
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=100)  # vd "payment.capture:12"
+    fingerprint = models.CharField(max_length=64)  # sha256 của body request
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "scope"], name="unique_idempotency_key_scope"
+            )
+        ]
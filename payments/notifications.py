@@ -0,0 +1,150 @@
+import logging
+import time
+
+from django.db import connection, transaction
+
+from bookings.constants.service_type import ServiceType
+from notifications.models import Notification
+from notifications.recipients import get_admin_recipients, get_hotel_staff_recipients
+from notifications.rendering import (
+    AUDIENCE_CUSTOMER,
+    AUDIENCE_STAFF,
+    CHANNEL_EMAIL,
+    CHANNEL_WEB,
+    EVENT_FAILED,
+    EVENT_SUCCESS,
+    SERVICE_KEYS,
+    BookingNotificationContext,
+)
+
+logger = logging.getLogger(__name__)
+
+TITLES = {
+    EVENT_SUCCESS: "Thanh toán thành công",
+    EVENT_FAILED: "Thanh toán thất bại",
+}
+
+CUSTOMER_LINKS = {
+    ServiceType.HOTEL: "/profile/hotel",
+    ServiceType.CAR: "",
+    ServiceType.ACTIVITY: "/profile/activity",
+    ServiceType.FLIGHT: "/profile/flight",
+}
+
+STAFF_LINKS = {
+    ServiceType.HOTEL: "/room-payment",
+    ServiceType.CAR: "/car-payment",
+    ServiceType.ACTIVITY: "/activity-payment",
+    ServiceType.FLIGHT: "/flight-payment",
+}
+
+
+def booking_email(booking):
+    if booking.user and booking.user.email:
+        return booking.user.email
+    elif hasattr(booking, "guest_info") and booking.guest_info.email:
+        return booking.guest_info.email
+    return None
+
+
+class QueryCounter:
+    """execute_wrapper đếm số câu SQL chạy trong 1 khối."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def notify_payment(booking, event, base_url, email_to, notify_staff=True):
+    """
+    Tạo thông báo thanh toán cho khách (web + email) và, khi thành công, cho
+    đối tác / nhân viên / admin (chỉ web). Booking được nạp 1 lần kèm quan hệ,
+    template đã biên dịch sẵn nên số query và thời gian render không phụ thuộc
+    vào số người nhận.
+    """
+    if booking.service_type not in SERVICE_KEYS:
+        return
+
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        context = BookingNotificationContext.load(
+            booking.pk, booking.service_type, base_url
+        )
+        if not context.has_details:
+            return
+
+        title = TITLES[event]
+        with transaction.atomic():
+            Notification.objects.create(
+                user=context.booking.user,  # user có thể null
+                email=email_to,
+                title=title,
+                message=context.render(event, AUDIENCE_CUSTOMER, CHANNEL_WEB),
+                message_email=context.render(event, AUDIENCE_CUSTOMER, CHANNEL_EMAIL),
+                link=CUSTOMER_LINKS[booking.service_type],
+                send_mail_flag=True,
+                is_error=event == EVENT_FAILED,
+            )
+            if notify_staff and event == EVENT_SUCCESS:
+                _notify_staff(context, title)
+
+    logger.info(
+        "Payment notifications (%s) for booking %s: render %.1f ms, total %.1f ms, %d queries",
+        event,
+        booking.booking_code,
+        context.render_seconds * 1000,
+        (time.perf_counter() - started) * 1000,
+        counter.count,
+    )
+
+
+def _notify_staff(context, title):
+    """Đối tác của dịch vụ + admin nhận cùng nội dung, tạo bằng fan_out (không gửi email)."""
+    booking = context.booking
+    service_type = booking.service_type
+    template = dict(
+        title=title,
+        message_email="",
+        link=STAFF_LINKS[service_type],
+        send_mail_flag=False,
+    )
+
+    if service_type == ServiceType.FLIGHT:
+        # người vận hành của từng chuyến bay nhận thông tin chuyến của mình
+        for segment in context.flight_segments:
+            staff = segment.airline.flight_operations_staff if segment.airline else None
+            Notification.objects.fan_out(
+                [staff],
+                dict(
+                    template,
+                    message=context.render(
+                        EVENT_SUCCESS,
+                        AUDIENCE_STAFF,
+                        CHANNEL_WEB,
+                        context.flight_context([segment]),
+                    ),
+                ),
+            )
+        recipients = list(get_admin_recipients())
+    else:
+        detail = context.detail
+        if service_type == ServiceType.HOTEL:
+            owner = detail.owner_hotel
+            recipients = [owner, *get_hotel_staff_recipients(owner)]
+        elif service_type == ServiceType.CAR:
+            recipients = [detail.driver]
+        else:
+            recipients = [detail.event_organizer_activity]
+        recipients += get_admin_recipients()
+
+    Notification.objects.fan_out(
+        recipients,
+        dict(
+            template,
+            message=context.render(EVENT_SUCCESS, AUDIENCE_STAFF, CHANNEL_WEB),
+        ),
+    )
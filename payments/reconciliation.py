@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from payments.constants.payment_status import PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER_MINUTES = 60
+CHUNK_SIZE = 100
+CONCURRENCY = 8
+# Giới hạn đọc của Stripe: 100 req/s (live), 25 req/s (test)
+RATE_PER_SECOND = 20
+
+# Kết quả đối soát 1 session
+PAID = "paid"
+EXPIRED = "expired"
+OPEN = "open"
+MISSING = "missing"
+ERROR = "error"
+
+
+class RateLimiter:
+    """Giãn đều các request: không quá `rate` request bắt đầu trong 1 giây."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class StripeSessionFetcher:
+    """
+    Đọc checkout session qua HTTPX async client của Stripe SDK, dùng chung
+    connection pool cho cả lượt chạy. api_base trỏ tới stripe-mock khi chạy local.
+    """
+
+    def __init__(self, api_key=None, api_base=None):
+        self.http_client = stripe.HTTPXClient()
+        options = {"http_client": self.http_client, "max_network_retries": 2}
+        if api_base:
+            options["base_addresses"] = {"api": api_base}
+        self.client = stripe.StripeClient(api_key or settings.STRIPE_SECRET_KEY, **options)
+
+    async def __call__(self, session_id):
+        try:
+            session = await self.client.v1.checkout.sessions.retrieve_async(session_id)
+        except stripe.InvalidRequestError as e:
+            if e.code == "resource_missing":
+                return None
+            raise
+        payment_intent = session.payment_intent
+        return {
+            "id": session.id,
+            "status": session.status,
+            "payment_status": session.payment_status,
+            "payment_intent": getattr(payment_intent, "id", payment_intent),
+        }
+
+    async def close(self):
+        await self.http_client.close_async()
+
+
+class StubSessionFetcher:
+    """
+    Stripe giả lập từ file JSON {session_id: {"status", "payment_status",
+    "payment_intent"}}; session không có trong file = không tồn tại.
+    latency (giây) mô phỏng thời gian gọi mạng để đo throughput.
+    """
+
+    def __init__(self, path, latency=0.0):
+        with open(path, encoding="utf-8") as f:
+            self.sessions = json.load(f)
+        self.latency = latency
+
+    async def __call__(self, session_id):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        session = self.sessions.get(session_id)
+        return dict(session, id=session_id) if session is not None else None
+
+    async def close(self):
+        pass
+
+
+class ReconcileStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.chunks = 0
+        self.scanned = 0
+        self.outcomes = {PAID: 0, EXPIRED: 0, OPEN: 0, MISSING: 0, ERROR: 0}
+        self.updated = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def per_second(self):
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"scanned {self.scanned} payment(s) in {self.chunks} chunk(s), "
+            f"{self.elapsed:.2f}s ({self.per_second:.1f}/s, max {self.max_in_flight} "
+            f"concurrent): paid {self.outcomes[PAID]}, expired {self.outcomes[EXPIRED]}, "
+            f"open {self.outcomes[OPEN]}, missing {self.outcomes[MISSING]}, "
+            f"errors {self.outcomes[ERROR]}, updated {self.updated}"
+        )
+
+
+def classify(session):
+    if session is None:
+        return MISSING
+    if session.get("status") == "complete" and session.get("payment_status") in (
+        "paid",
+        "no_payment_required",
+    ):
+        return PAID
+    if session.get("status") == "expired":
+        return EXPIRED
+    return OPEN
+
+
+def next_chunk(stale_before, after_id, chunk_size):
+    """Lô payment PENDING có session Stripe, tạo trước stale_before, theo id tăng dần."""
+    from payments.models import Payment
+
+    queryset = Payment.objects.filter(
+        status=PaymentStatus.PENDING,
+        transaction_id__isnull=False,
+        created_at__lt=stale_before,
+    ).exclude(transaction_id="")
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    return list(queryset.order_by("id").values_list("id", "transaction_id")[:chunk_size])
+
+
+def apply_results(results, dry_run=False):
+    """
+    Ghi kết quả 1 lô, trả về số payment được cập nhật:
+    - session hết hạn -> 1 câu UPDATE chuyển các payment sang FAILED;
+    - session đã thanh toán -> 1 câu INSERT event checkout.session.completed giả
+      lập vào StripeEvent, worker webhook cập nhật payment / booking / rollup và
+      gửi thông báo như khi webhook đến bình thường.
+    """
+    from payments.models import Payment, StripeEvent
+    from payments.webhooks import schedule_processing
+
+    expired = [payment_id for payment_id, outcome, _ in results if outcome == EXPIRED]
+    paid = [session for _, outcome, session in results if outcome == PAID]
+    if dry_run:
+        return 0
+
+    updated = 0
+    if expired:
+        updated += Payment.objects.filter(
+            id__in=expired, status=PaymentStatus.PENDING
+        ).update(status=PaymentStatus.FAILED)
+    if paid:
+        now = timezone.now()
+        event_ids = {f"reconcile_{session['id']}": session for session in paid}
+        # Lượt chạy trước đã xếp hàng nhưng worker chưa xử lý
+        queued = set(
+            StripeEvent.objects.filter(event_id__in=event_ids).values_list(
+                "event_id", flat=True
+            )
+        )
+        events = [
+            StripeEvent(
+                event_id=event_id,
+                type="checkout.session.completed",
+                payload={
+                    "id": event_id,
+                    "type": "checkout.session.completed",
+                    "created": int(now.timestamp()),
+                    "data": {"object": session},
+                },
+                next_attempt_at=now,
+            )
+            for event_id, session in event_ids.items()
+            if event_id not in queued
+        ]
+        if events:
+            StripeEvent.objects.bulk_create(events, ignore_conflicts=True)
+            updated += len(events)
+            schedule_processing()
+    return updated
+
+
+async def reconcile(
+    fetch,
+    stale_after=timedelta(minutes=STALE_AFTER_MINUTES),
+    chunk_size=CHUNK_SIZE,
+    concurrency=CONCURRENCY,
+    rate=RATE_PER_SECOND,
+    limit=None,
+    dry_run=False,
+):
+    """
+    Đối soát payment PENDING quá `stale_after` với Stripe. fetch: coroutine
+    session_id -> dict session (None nếu không tồn tại), vd. StripeSessionFetcher.
+    Mỗi lô được đọc đồng thời (tối đa `concurrency` request, `rate` req/s) rồi ghi
+    bằng vài câu SQL gộp.
+    """
+    stats = ReconcileStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    stale_before = timezone.now() - stale_after
+
+    async def check(payment_id, session_id):
+        async with semaphore:
+            await limiter.wait()
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            try:
+                session = await fetch(session_id)
+            except Exception as e:
+                logger.warning(f"Failed to retrieve Stripe session {session_id}: {e}")
+                return payment_id, ERROR, None
+            finally:
+                stats.in_flight -= 1
+        return payment_id, classify(session), session
+
+    after_id = None
+    while limit is None or stats.scanned < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - stats.scanned)
+        chunk = await sync_to_async(next_chunk)(stale_before, after_id, size)
+        if not chunk:
+            break
+        after_id = chunk[-1][0]
+
+        results = await asyncio.gather(*(check(*row) for row in chunk))
+        for _, outcome, _ in results:
+            stats.outcomes[outcome] += 1
+        stats.updated += await sync_to_async(apply_results)(results, dry_run)
+        stats.scanned += len(chunk)
+        stats.chunks += 1
+
+    logger.info("Stripe reconciliation: %s", stats.summary())
+    return stats
@@ -0,0 +1,244 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from bookings.constants.service_type import ServiceType
+from payments.constants.payment_status import PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái payment được tính vào doanh thu (đã thanh toán / đã xác nhận tiền mặt)
+REVENUE_STATUSES = {PaymentStatus.SUCCESS, PaymentStatus.PAID, PaymentStatus.UNPAID}
+
+# Cột chiều của bảng rollup -> loại dịch vụ tương ứng (cũng là tên query param của overview)
+DIMENSIONS = {
+    "hotel_id": ServiceType.HOTEL,
+    "room_id": ServiceType.HOTEL,
+    "owner_hotel_id": ServiceType.HOTEL,
+    "activity_id": ServiceType.ACTIVITY,
+    "activity_package_id": ServiceType.ACTIVITY,
+    "activity_date_id": ServiceType.ACTIVITY,
+    "event_organizer_activity_id": ServiceType.ACTIVITY,
+    "car_id": ServiceType.CAR,
+    "driver_id": ServiceType.CAR,
+    "airline_id": ServiceType.FLIGHT,
+    "aircraft_id": ServiceType.FLIGHT,
+    "flight_id": ServiceType.FLIGHT,
+    "flight_operations_staff_id": ServiceType.FLIGHT,
+}
+
+REBUILD_CHUNK_SIZE = 2000
+
+
+def counts_as_revenue(status):
+    return status is not None and int(status) in REVENUE_STATUSES
+
+
+def payment_queryset(payment_model=None, flight_detail_model=None):
+    """
+    Payment kèm booking + chi tiết dịch vụ, đủ để tính các chiều mà không query thêm.
+    Migration truyền vào model lịch sử (apps.get_model).
+    """
+    if payment_model is None:
+        from flights.models import FlightBookingDetail as flight_detail_model
+        from payments.models import Payment as payment_model
+
+    return payment_model.objects.select_related(
+        "booking",
+        "booking__hotel_detail__room",
+        "booking__car_detail",
+        "booking__activity_date_detail__activity_date__activity_package",
+    ).prefetch_related(
+        Prefetch(
+            "booking__flight_details",
+            queryset=flight_detail_model.objects.select_related(
+                "flight__airline"
+            ).order_by("id"),
+        )
+    )
+
+
+def _booking_dimensions(booking):
+    """
+    Danh sách (chiều, tỉ lệ doanh thu, số đơn) của 1 booking. Booking máy bay
+    nhiều chuyến được chia doanh thu theo final_price của từng chuyến, đơn hàng
+    chỉ tính ở chuyến đầu để tổng số đơn không bị nhân đôi.
+    """
+    service_type = booking.service_type
+    if service_type == ServiceType.HOTEL:
+        detail = getattr(booking, "hotel_detail", None)
+        if detail is None:
+            return [({}, 1.0, 1)]
+        return [
+            (
+                {
+                    "hotel_id": detail.room.hotel_id if detail.room else None,
+                    "room_id": detail.room_id,
+                    "owner_hotel_id": detail.owner_hotel_id,
+                },
+                1.0,
+                1,
+            )
+        ]
+    if service_type == ServiceType.CAR:
+        detail = getattr(booking, "car_detail", None)
+        if detail is None:
+            return [({}, 1.0, 1)]
+        return [({"car_id": detail.car_id, "driver_id": detail.driver_id}, 1.0, 1)]
+    if service_type == ServiceType.ACTIVITY:
+        detail = getattr(booking, "activity_date_detail", None)
+        if detail is None:
+            return [({}, 1.0, 1)]
+        package = detail.activity_date.activity_package
+        return [
+            (
+                {
+                    "activity_id": package.activity_id if package else None,
+                    "activity_package_id": detail.activity_date.activity_package_id,
+                    "activity_date_id": detail.activity_date_id,
+                    "event_organizer_activity_id": detail.event_organizer_activity_id,
+                },
+                1.0,
+                1,
+            )
+        ]
+    if service_type == ServiceType.FLIGHT:
+        details = list(booking.flight_details.all())
+        if not details:
+            return [({}, 1.0, 1)]
+        total = sum(detail.final_price or 0 for detail in details)
+        rows = []
+        for index, detail in enumerate(details):
+            flight = detail.flight
+            airline = flight.airline if flight else None
+            share = (
+                (detail.final_price or 0) / total if total else 1.0 / len(details)
+            )
+            rows.append(
+                (
+                    {
+                        "airline_id": flight.airline_id if flight else None,
+                        "aircraft_id": flight.aircraft_id if flight else None,
+                        "flight_id": detail.flight_id,
+                        "flight_operations_staff_id": (
+                            airline.flight_operations_staff_id if airline else None
+                        ),
+                    },
+                    share,
+                    1 if index == 0 else 0,
+                )
+            )
+        return rows
+    return [({}, 1.0, 1)]
+
+
+def payment_rows(payment, amount=None):
+    """
+    Các dòng rollup mà payment đóng góp: list (key_fields, revenue, order_count).
+    key_fields gồm bucket (khóa duy nhất), ngày, loại dịch vụ, khách hàng và các chiều.
+    """
+    booking = payment.booking
+    amount = float(payment.amount if amount is None else amount)
+    date = timezone.localtime(payment.created_at).date()
+
+    rows = []
+    for dimensions, share, orders in _booking_dimensions(booking):
+        fields = {
+            "date": date,
+            "service_type": booking.service_type,
+            "customer_id": booking.user_id,
+        }
+        fields.update({name: dimensions.get(name) for name in DIMENSIONS})
+        fields["bucket"] = "|".join(
+            "" if value is None else str(value) for value in fields.values()
+        )
+        rows.append((fields, amount * share, orders))
+    return rows
+
+
+def _apply(rows, sign):
+    from payments.models import PaymentRevenueRollup
+
+    for fields, revenue, orders in rows:
+        try:
+            with transaction.atomic():
+                rollup, _ = PaymentRevenueRollup.objects.get_or_create(
+                    bucket=fields["bucket"], defaults=fields
+                )
+        except IntegrityError:
+            # Payment khác vừa tạo cùng bucket
+            rollup = PaymentRevenueRollup.objects.get(bucket=fields["bucket"])
+
+        PaymentRevenueRollup.objects.filter(pk=rollup.pk).update(
+            revenue=F("revenue") + sign * revenue,
+            order_count=F("order_count") + sign * orders,
+            payment_count=F("payment_count") + sign,
+        )
+        if sign < 0:
+            PaymentRevenueRollup.objects.filter(
+                pk=rollup.pk, payment_count__lte=0
+            ).delete()
+
+
+def update_payment_rollup(payment, previous):
+    """
+    Cập nhật rollup khi payment được lưu. previous là (tính doanh thu?, amount)
+    trước khi lưu, None nếu payment mới. Trả về trạng thái hiện tại.
+    """
+    current = (counts_as_revenue(payment.status), float(payment.amount or 0))
+    if previous == current or (previous is None and not current[0]):
+        return current
+
+    if previous is not None and previous[0]:
+        _apply(payment_rows(payment, previous[1]), -1)
+    if current[0]:
+        _apply(payment_rows(payment), 1)
+    return current
+
+
+def remove_payment_rollup(payment, previous):
+    if previous is not None and previous[0]:
+        _apply(payment_rows(payment, previous[1]), -1)
+
+
+def build_rollups(payments, rollup_model):
+    """Gộp các payment (từ payment_queryset) thành các dòng rollup chưa lưu."""
+    buckets = {}
+    for payment in payments.order_by("id").iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        for fields, revenue, orders in payment_rows(payment):
+            rollup = buckets.get(fields["bucket"])
+            if rollup is None:
+                rollup = buckets[fields["bucket"]] = rollup_model(
+                    revenue=0, order_count=0, payment_count=0, **fields
+                )
+            rollup.revenue += revenue
+            rollup.order_count += orders
+            rollup.payment_count += 1
+    return list(buckets.values())
+
+
+def revenue_payments(queryset):
+    return queryset.filter(status__in=[str(status) for status in REVENUE_STATUSES])
+
+
+def rebuild(since=None):
+    """
+    Tính lại toàn bộ rollup (hoặc từ ngày `since`) từ bảng Payment.
+    Trả về số dòng rollup đã ghi.
+    """
+    from payments.models import PaymentRevenueRollup
+
+    payments = revenue_payments(payment_queryset())
+    rollups = PaymentRevenueRollup.objects.all()
+    if since:
+        payments = payments.filter(created_at__date__gte=since)
+        rollups = rollups.filter(date__gte=since)
+
+    rows = build_rollups(payments, PaymentRevenueRollup)
+    with transaction.atomic():
+        rollups.delete()
+        PaymentRevenueRollup.objects.bulk_create(rows, batch_size=REBUILD_CHUNK_SIZE)
+    logger.info("Rebuilt %d payment revenue rollup rows", len(rows))
+    return len(rows)
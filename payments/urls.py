@@ -9,6 +9,8 @@ from .views import (
     PaymentUpdateView,
     PaymentDeleteView,
     PaymentListOverviewView,
+    PaymentExportView,
+    StripeWebhookView,
 )
 
 router = DefaultRouter()
@@ -23,6 +25,9 @@ urlpatterns = [
         PaymentListOverviewView.as_view(),
         name="payment-overview-list",
     ),
+    path(
+        "payments/export/", PaymentExportView.as_view(), name="payment-export"
+    ),  # GET xuất CSV / NDJSON (?export_format=csv|ndjson)
     path(
         "payments/create/", PaymentCreateView.as_view(), name="payment-create"
     ),  # POST tạo payments
@@ -39,5 +44,8 @@ urlpatterns = [
         PaymentDeleteView.as_view(),
         name="payment-delete",
     ),  # DELETE xóa payments
+    path(
+        "stripe/webhook/", StripeWebhookView.as_view(), name="stripe-webhook"
+    ),  # POST event từ Stripe
     path("", include(router.urls)),
 ]
@@ -1,9 +1,15 @@
+import json
+
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from django.conf import settings
-from notifications.models import Notification
+from notifications.rendering import EVENT_SUCCESS
+from payments.notifications import booking_email, notify_payment
+from payments.idempotency import HEADER as IDEMPOTENCY_HEADER, idempotent
+from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.core.mail import send_mail
 
 # from paypalcheckoutsdk.core import PayPalHttpClient, SandboxEnvironment
@@ -17,10 +23,10 @@ from payments.constants.payment_status import PaymentStatus
 from payments.constants.payment_method import PaymentMethod
 from bookings.constants.service_type import ServiceType
 from bookings.constants.booking_status import BookingStatus
+from flights.inventory import SeatsUnavailable, checkout_holds, confirm_holds
 from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncYear
-from django.db.models import Q, Count, Sum, Min, Max, F
+from django.db.models import Count, Sum, Min, Max, F
 from datetime import timedelta
-from accounts.models import CustomUser
 from django.core.files.storage import default_storage
 import os
 
@@ -35,11 +41,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
     def get_booking_email(self, booking):
-        if booking.user and booking.user.email:
-            return booking.user.email
-        elif hasattr(booking, "guest_info") and booking.guest_info.email:
-            return booking.guest_info.email
-        return None
+        return booking_email(booking)
+
+    def get_base_url(self, request):
+        return f"{request.scheme}://{request.get_host()}"  # http://127.0.0.1:8000
 
     def get_queryset(self):
         queryset = Payment.objects.all()
@@ -80,21 +85,21 @@ class PaymentViewSet(viewsets.ModelViewSet):
 
         return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
 
-    # 🪙 Bắt đầu thanh toán PayPal
+    def get_locked_object(self):
+        """Payment (kèm booking) đã khóa dòng, gọi trong transaction.atomic."""
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .select_related("booking")
+            .select_for_update()
+        )
+        payment = get_object_or_404(queryset, pk=self.kwargs["pk"])
+        self.check_object_permissions(self.request, payment)
+        return payment
+
+    # 🪙 Bắt đầu thanh toán Stripe
     @action(detail=True, methods=["post"])
+    @idempotent
     def pay(self, request, pk=None):
-        payment = self.get_object()
-
-        if payment.status in [
-            PaymentStatus.SUCCESS,
-            PaymentStatus.PAID,
-            PaymentStatus.UNPAID,
-        ]:
-            return Response(
-                {"detail": "Payment already processed"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
         success_url = request.data.get("success_url")
         cancel_url = request.data.get("cancel_url")
 
@@ -104,1772 +109,135 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Tạo Stripe section
-        # Stripe amount phải là số nguyên nhỏ nhất, VND không có decimal
-        amount = int(payment.amount)  # nếu VND: 100_000 -> 100000
-        currency = "vnd"  # hoặc usd, eur
-        try:
-            session = stripe.checkout.Session.create(
-                payment_method_types=["card"],
-                line_items=[
-                    {
-                        "price_data": {
-                            "currency": currency,
-                            "product_data": {
-                                "name": f"Booking {payment.booking.booking_code}",
+        with transaction.atomic():
+            # Khóa payment: 2 request pay đồng thời không cùng tạo session
+            payment = self.get_locked_object()
+
+            if int(payment.status) in [
+                PaymentStatus.SUCCESS,
+                PaymentStatus.PAID,
+                PaymentStatus.UNPAID,
+            ]:
+                return Response(
+                    {"detail": "Payment already processed"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Tạo Stripe section
+            # Stripe amount phải là số nguyên nhỏ nhất, VND không có decimal
+            amount = int(payment.amount)  # nếu VND: 100_000 -> 100000
+            currency = "vnd"  # hoặc usd, eur
+            options = {}
+            if payment.booking.service_type == ServiceType.FLIGHT:
+                # Session hết hạn cùng lúc với ghế đang giữ: không thể trả tiền cho
+                # ghế đã bị expire_seat_holds trả lại
+                try:
+                    hold_until = checkout_holds(payment.booking_id)
+                except SeatsUnavailable as e:
+                    return Response(
+                        {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                if hold_until is not None:
+                    options["expires_at"] = int(hold_until.timestamp())
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key:
+                # Stripe cũng trả lại đúng session cũ nếu request bị gửi lại
+                options["idempotency_key"] = f"checkout-session-{payment.pk}-{key}"
+            try:
+                session = stripe.checkout.Session.create(
+                    payment_method_types=["card"],
+                    line_items=[
+                        {
+                            "price_data": {
+                                "currency": currency,
+                                "product_data": {
+                                    "name": f"Booking {payment.booking.booking_code}",
+                                },
+                                "unit_amount": amount,  # Stripe tính theo smallest currency unit
                             },
-                            "unit_amount": amount,  # Stripe tính theo smallest currency unit
-                        },
-                        "quantity": 1,
-                    }
-                ],
-                mode="payment",
-                success_url=success_url,
-                cancel_url=cancel_url,
-            )
+                            "quantity": 1,
+                        }
+                    ],
+                    mode="payment",
+                    success_url=success_url,
+                    cancel_url=cancel_url,
+                    **options,
+                )
+            except stripe.InvalidRequestError as e:
+                return Response({"detail": str(e)}, status=400)
+            except stripe.StripeError as e:
+                # Lỗi mạng / rate limit / lỗi phía Stripe: trả 502 để response không
+                # được lưu theo Idempotency-Key, client gửi lại cùng key vẫn thử lại được
+                return Response(
+                    {"detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY
+                )
+
             # Lưu session id vào transaction_id để theo dõi
             payment.transaction_id = session.id
-            payment.save()
+            payment.save(update_fields=["transaction_id"])
 
-            return Response(
-                {"checkout_session_id": session.id, "checkout_url": session.url}
-            )
-        except Exception as e:
-            return Response({"detail": str(e)}, status=400)
+        return Response({"checkout_session_id": session.id, "checkout_url": session.url})
 
-    # 💳 Capture sau khi thanh toán thành công
+    # 💳 Trạng thái thanh toán sau khi Stripe redirect về success_url.
+    # Payment được cập nhật bởi webhook (payments/webhooks.py), không gọi Stripe ở đây.
     @action(detail=True, methods=["post"])
+    @idempotent
     def capture(self, request, pk=None):
         payment = self.get_object()
-        session = stripe.checkout.Session.retrieve(payment.transaction_id)
-        email_to = self.get_booking_email(payment.booking)
-        if session.payment_status == "paid":
-            payment.status = PaymentStatus.SUCCESS
-            payment.save()
-
-            booking = payment.booking
-            booking.payment_status = PaymentStatus.PAID
-            booking.status = BookingStatus.CONFIRMED
-            booking.save()
-
-            # ✅ Gửi thông báo cho user
-            if email_to:
-                scheme = request.scheme  # http hoặc https
-                host = request.get_host()  # 127.0.0.1:8000
-                baseUrl = f"{scheme}://{host}"
-
-                user_obj = booking.user
-                username = user_obj.username if user_obj else "Khách"
-                avatar = (
-                    f"{user_obj.avatar}"
-                    if user_obj and user_obj.avatar
-                    else f"/media/user_images/default-avatar.png"
-                )
-
-                if booking.service_type == ServiceType.HOTEL:
-                    images = booking.hotel_detail.room.hotel.images.all()
-                    image_url = images[0].image if images.exists() else ""
-
-                    # gửi thông báo cho user
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Nhận phòng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                            <div style="padding:20px;font-family:sans-serif;background:#f8f8f8">
-                                <div style="max-width:600px;margin:auto;background:white;padding:20px;border-radius:10px">
-                                    <h2 style="color:#4CAF50">Thanh toán thành công 🎉</h2>
-                                    <p>Xin chào <b>{booking.guest_info.full_name if booking.user else "Khách"}</b>,</p>
-                                    <p>Bạn đã thanh toán thành công mã đặt phòng <b>{booking.booking_code}</b>.</p>
-
-                                    <img src='{baseUrl}{image_url}' 
-                                        style="width:100%;height:250px;object-fit:cover;border-radius:10px" />
-
-                                    <h3 style="margin-top:20px">Thông tin đặt phòng</h3>
-                                    <ul>
-                                        <li>Khách sạn: <b>{booking.hotel_detail.room.hotel.name}</b></li>
-                                        <li>Loại phòng: <b>{booking.hotel_detail.room.room_type}</b></li>
-                                        <li>Nhận phòng: {booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</li>
-                                        <li>Trả phòng: {booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</li>
-                                    </ul>
-
-                                    <p style="margin-top:20px">
-                                        Cảm ơn bạn đã đặt phòng tại hệ thống của chúng tôi ❤️
-                                    </p>
-                                </div>
-                            </div>
-                        """,
-                        link=f"/profile/hotel",
-                        send_mail_flag=True,
-                    )
-
-                    # gửi thông báo cho chủ khách sạn (không gửi email)
-                    Notification.objects.create(
-                        user=(
-                            booking.hotel_detail.owner_hotel
-                            if booking.hotel_detail.owner_hotel
-                            else None
-                        ),  # user có thể null
-                        email=(
-                            booking.hotel_detail.owner_hotel.email
-                            if booking.hotel_detail.owner_hotel
-                            else None
-                        ),
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div class="flex items-center gap-[4px]">
-                                        <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                        <div>
-                                            <p class="text-gray-600 text-[12px]">Nhận phòng</p>
-                                            <p class="font-semibold text-[12px] text-gray-900">{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email="",
-                        link=f"/room-payment",
-                        send_mail_flag=False,
-                    )
-
-                    # gửi thông báo cho nhân viên của khách sạn đó (không gửi email)
-                    hotel_staffs = booking.hotel_detail.owner_hotel.hotel_staffs.all()
-                    for hotel_staff in hotel_staffs:
-                        Notification.objects.create(
-                            user=hotel_staff,
-                            email=hotel_staff.email,
-                            title="Thanh toán thành công",
-                            message=f"""
-                            <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                                <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                                <div class='flex-grow'>
-                                    <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                        <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                        <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                                    </h3>
-                                    <div class='flex gap-[20px]'>
-                                        <div class="flex items-center gap-[4px]">
-                                            <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                            <div>
-                                                <p class="text-gray-600 text-[12px]">Nhận phòng</p>
-                                                <p class="font-semibold text-[12px] text-gray-900">{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                            </div>
-                                        </div>
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>""",
-                            message_email="",
-                            link=f"/room-payment",  # hoặc link phù hợp cho admin
-                            send_mail_flag=False,
-                        )
-
-                    # gửi thông báo cho tất cả admin (không gửi email)
-                    admins = CustomUser.objects.filter(
-                        role="admin"
-                    )  # sửa 'role' + 'admin' theo model của bạn
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            email=admin.email,
-                            title="Thanh toán thành công",
-                            message=f"""
-                            <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                                <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                                <div class='flex-grow'>
-                                    <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                        <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                        <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                                    </h3>
-                                    <div class='flex gap-[20px]'>
-                                        <div class="flex items-center gap-[4px]">
-                                            <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                            <div>
-                                                <p class="text-gray-600 text-[12px]">Nhận phòng</p>
-                                                <p class="font-semibold text-[12px] text-gray-900">{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                            </div>
-                                        </div>
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>""",
-                            message_email="",
-                            link=f"/room-payment",  # hoặc link phù hợp cho admin
-                            send_mail_flag=False,
-                        )
-
-                elif booking.service_type == ServiceType.CAR:
-                    # gửi thông báo cho user
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.car_detail.car.image}' alt={booking.car_detail.car.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.car_detail.car.name}</span> <span>({booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location})</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời điểm bắt đầu</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian ước lượng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{round(booking.car_detail.total_time_estimate, 1)} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                            <tr>
-                                <td align="center">
-                                <table width="600" cellpadding="0" cellspacing="0" 
-                                        style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                    <!-- Header -->
-                                    <tr>
-                                    <td style="background:#0ea5e9; padding:20px; text-align:center; color:white;">
-                                        <h2 style="margin:0; font-size:22px;">🎉 Thanh toán thành công!</h2>
-                                        <p style="margin:0; font-size:14px;">Cảm ơn bạn đã đặt chuyến xe tại hệ thống</p>
-                                    </td>
-                                    </tr>
-
-                                    <!-- Body -->
-                                    <tr>
-                                        <td style="padding:25px;">
-
-                                            <h3 style="margin-top:0;">Thông tin chuyến đi</h3>
-
-                                            <table width="100%" cellpadding="0" cellspacing="0">
-                                                <tr>
-                                                    <!-- Car image -->
-                                                    <td width="120">
-                                                    <img src='{baseUrl}{booking.car_detail.car.image}' 
-                                                        alt="{booking.car_detail.car.name}"
-                                                        style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                                    </td>
-
-                                                    <!-- Trip details -->
-                                                    <td style="padding-left:15px;">
-                                                    <p style="margin:0; font-size:15px;">
-                                                        <strong>Mã đặt chỗ:</strong>
-                                                        <span style="color:#0284c7; font-weight:bold;">{booking.booking_code}</span>
-                                                    </p>
-
-                                                    <p style="margin:6px 0 0;">
-                                                        <strong>Xe:</strong> {booking.car_detail.car.name}
-                                                    </p>
-
-                                                    <p style="margin:4px 0 0;">
-                                                        <strong>Hành trình:</strong>
-                                                        {booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location}
-                                                    </p>
-                                                    </td>
-                                                </tr>
-                                            </table>
-
-                                            <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                            <!-- Dates -->
-                                            <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                            <p style="margin:0;">
-                                                <strong>Thời điểm bắt đầu:</strong><br>
-                                                {booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}
-                                            </p>
-
-                                            <p style="margin:10px 0 0;">
-                                                <strong>Thời gian ước lượng:</strong><br>
-                                                {round(booking.car_detail.total_time_estimate, 1)} tiếng
-                                            </p>
-
-                                            <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                            <p style="margin-bottom:0; font-size:14px; color:#475569;">
-                                            Nếu bạn có bất kỳ câu hỏi nào, đừng ngần ngại liên hệ với chúng tôi.
-                                            </p>
-
-                                        </td>
-                                    </tr>
-
-                                    <!-- Footer -->
-                                    <tr>
-                                        <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                            © 2024 Booking System. All rights reserved.
-                                        </td>
-                                    </tr>
-
-                                </table>
-                                </td>
-                            </tr>
-                        </table>
-                        """,
-                        link=f"",
-                        send_mail_flag=True,
-                    )
-
-                    # gửi thông báo cho tài xế taxi (không gửi email)
-                    Notification.objects.create(
-                        user=(
-                            booking.car_detail.driver
-                            if booking.car_detail.driver
-                            else None
-                        ),  # user có thể null
-                        email=(
-                            booking.car_detail.driver.email
-                            if booking.car_detail.driver
-                            else None
-                        ),
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.car_detail.car.image}' alt={booking.car_detail.car.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.car_detail.car.name}</span> <span>({booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location})</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div class="flex items-center gap-[4px]">
-                                        <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Thời điểm bắt đầu</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian ước lượng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{round(booking.car_detail.total_time_estimate, 1)} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email="",
-                        link=f"/car-payment",
-                        send_mail_flag=False,
-                    )
-
-                    # gửi thông báo cho tất cả admin (không gửi email)
-                    admins = CustomUser.objects.filter(
-                        role="admin"
-                    )  # sửa 'role' + 'admin' theo model của bạn
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            email=admin.email,
-                            title="Thanh toán thành công",
-                            message=f"""
-                            <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                                <div class='flex-shrink-0'><img src='{baseUrl}{booking.car_detail.car.image}' alt={booking.car_detail.car.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                                <div class='flex-grow'>
-                                    <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                        <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                        <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.car_detail.car.name}</span> <span>({booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location})</span>
-                                    </h3>
-                                    <div class='flex gap-[20px]'>
-                                        <div class="flex items-center gap-[4px]">
-                                            <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                            <div>
-                                                <p class='text-gray-600 text-[12px]'>Thời điểm bắt đầu</p>
-                                                <p class='font-semibold text-[12px] text-gray-900'>{booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                            </div>
-                                        </div>
-
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Thời gian ước lượng</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{round(booking.car_detail.total_time_estimate, 1)} tiếng</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>""",
-                            message_email="",
-                            link=f"/car-payment",  # hoặc link phù hợp cho admin
-                            send_mail_flag=False,
-                        )
-
-                elif booking.service_type == ServiceType.ACTIVITY:
-
-                    # gửi thông báo cho user
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.activity_date_detail.activity_image}' alt={booking.activity_date_detail.activity_name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.activity_date_detail.activity_name}</span> - <span>{booking.activity_date_detail.activity_package_name}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời điểm hoạt động</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}</p>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                        <tr>
-                            <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" 
-                                    style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                <!-- Header -->
-                                <tr>
-                                <td style="background:#10b981; padding:20px; text-align:center; color:white;">
-                                    <h2 style="margin:0; font-size:22px;">🎉 Thanh toán thành công!</h2>
-                                    <p style="margin:0; font-size:14px;">Bạn đã đặt thành công hoạt động trải nghiệm</p>
-                                </td>
-                                </tr>
-
-                                <!-- Body -->
-                                <tr>
-                                <td style="padding:25px;">
-
-                                    <h3 style="margin-top:0;">Thông tin hoạt động</h3>
-
-                                    <table width="100%" cellpadding="0" cellspacing="0">
-                                    <tr>
-                                        <!-- Activity image -->
-                                        <td width="120">
-                                        <img src='{baseUrl}{booking.activity_date_detail.activity_image}' 
-                                            alt="{booking.activity_date_detail.activity_name}"
-                                            style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                        </td>
-
-                                        <!-- Description -->
-                                        <td style="padding-left:15px;">
-                                        <p style="margin:0; font-size:15px;">
-                                            <strong>Mã đặt chỗ:</strong>
-                                            <span style="color:#059669; font-weight:bold;">{booking.booking_code}</span>
-                                        </p>
-
-                                        <p style="margin:6px 0 0;">
-                                            <strong>Hoạt động:</strong> {booking.activity_date_detail.activity_name}
-                                        </p>
-
-                                        <p style="margin:4px 0 0;">
-                                            <strong>Gói trải nghiệm:</strong> {booking.activity_date_detail.activity_package_name}
-                                        </p>
-                                        </td>
-                                    </tr>
-                                    </table>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Schedule -->
-                                    <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                    <p style="margin:0;">
-                                    <strong>Ngày diễn ra:</strong><br>
-                                    {booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}
-                                    </p>
-
-                                    <p style="margin:10px 0 0;">
-                                    <strong>Thời lượng:</strong><br>
-                                    {booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng
-                                    </p>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <p style="margin-bottom:0; font-size:14px; color:#475569;">
-                                    Chúc bạn có một trải nghiệm tuyệt vời!  
-                                    Nếu cần hỗ trợ, đừng ngần ngại liên hệ với chúng tôi.
-                                    </p>
-
-                                </td>
-                                </tr>
-
-                                <!-- Footer -->
-                                <tr>
-                                <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                    © 2024 Booking System. All rights reserved.
-                                </td>
-                                </tr>
-
-                            </table>
-                            </td>
-                        </tr>
-                        </table>
-                        """,
-                        link=f"/profile/activity",
-                        send_mail_flag=True,
-                    )
-
-                    # gửi thông báo cho người tổ chức hoạt động (không gửi email)
-                    Notification.objects.create(
-                        user=(
-                            booking.activity_date_detail.event_organizer_activity
-                            if booking.activity_date_detail.event_organizer_activity
-                            else None
-                        ),  # user có thể null
-                        email=(
-                            booking.activity_date_detail.event_organizer_activity.email
-                            if booking.activity_date_detail.event_organizer_activity
-                            else None
-                        ),
-                        title="Thanh toán thành công",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.activity_date_detail.activity_image}' alt={booking.activity_date_detail.activity_name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.activity_date_detail.activity_name}</span> - <span>{booking.activity_date_detail.activity_package_name}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div class="flex items-center gap-[4px]">
-                                        <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Thời điểm hoạt động</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}</p>
-                                        </div>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email="",
-                        link=f"/activity-payment",
-                        send_mail_flag=False,
-                    )
-
-                    # gửi thông báo cho tất cả admin (không gửi email)
-                    admins = CustomUser.objects.filter(
-                        role="admin"
-                    )  # sửa 'role' + 'admin' theo model của bạn
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            email=admin.email,
-                            title="Thanh toán thành công",
-                            message=f"""
-                            <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                                <div class='flex-shrink-0'><img src='{baseUrl}{booking.activity_date_detail.activity_image}' alt={booking.activity_date_detail.activity_name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                                <div class='flex-grow'>
-                                    <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                        <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                        <span>Khách hàng </span><span class="font-bold text-blue-700">{booking.guest_info.full_name} </span><span>đã đặt: </span><span class='font-bold'>{booking.activity_date_detail.activity_name}</span> - <span>{booking.activity_date_detail.activity_package_name}</span>
-                                    </h3>
-                                    <div class='flex gap-[20px]'>
-                                        <div class="flex items-center gap-[4px]">
-                                            <img alt={username} class="w-[24px] h-[24px] object-cover rounded-[50%]" src='{baseUrl}{avatar}'>
-                                            <div>
-                                                <p class='text-gray-600 text-[12px]'>Thời điểm hoạt động</p>
-                                                <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}</p>
-                                            </div>
-                                        </div>
-                                        <div>
-                                            <p class='text-gray-600 text-[12px]'>Thời gian</p>
-                                            <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>""",
-                            message_email="",
-                            link=f"/activity-payment",  # hoặc link phù hợp cho admin
-                            send_mail_flag=False,
-                        )
-
-                elif booking.service_type == ServiceType.FLIGHT:
-                    flight_details = booking.flight_details.all()
-
-                    if not flight_details.exists():
-                        return
-
-                    # Hàm lấy leg đầu và cuối
-                    def get_flight_info(fd):
-                        flight = fd.flight
-                        first_leg = flight.legs.order_by("departure_time").first()
-                        last_leg = flight.legs.order_by("arrival_time").last()
-                        return first_leg, last_leg
-
-                    # Hàm render 1 chiều
-                    def render_one_way(fd):
-                        first_leg, last_leg = get_flight_info(fd)
-
-                        # Nếu không có legs → thông báo lỗi an toàn
-                        if first_leg is None or last_leg is None:
-                            return "<div>Chuyến bay chưa cập nhật lộ trình</div>"
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                        <div class="flex-shrink-0">
-                            <img src="{baseUrl}{fd.flight.airline.logo}" alt="{fd.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                        </div>
-
-                        <div class="flex-grow">
-                            <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                <div>Mã:
-                                    <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                </div>
-                                <span>Chuyến bay </span>
-                                <span class="font-bold text-yellow-600">một chiều</span>:
-                                <span class="font-bold">{first_leg.departure_airport.name}</span> →
-                                <span class="font-bold">{last_leg.arrival_airport.name}</span>
-                            </h3>
-
-                            <div class="flex gap-[20px]">
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                            </div>
-                        </div>
-                        </div>
-                        """
-
-                    # Hàm render khứ hồi
-                    def render_round_trip(go, ret):
-                        go_first, go_last = get_flight_info(go)
-                        ret_first, ret_last = get_flight_info(ret)
-
-                        if None in (go_first, go_last, ret_first, ret_last):
-                            return "<div>Chuyến bay chưa cập nhật đủ lộ trình</div>"
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                            <div class="flex-shrink-0">
-                                <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                            </div>
-
-                            <div class="flex-grow">
-                                <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                    <div>Mã:
-                                        <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                    </div>
-                                    <span>Chuyến bay </span>
-                                    <span class="font-bold text-green-600">khứ hồi</span>:
-                                    <span class="font-bold">{go_first.departure_airport.name}</span> →
-                                    <span class="font-bold">{go_last.arrival_airport.name}</span>
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <div>
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-blue-600">Chiều đi:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{go.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-
-                                <!-- CHIỀU VỀ -->
-                                <div class="mt-[14px]">
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-red-600">Chiều về:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{ret.flight.airline.logo}" alt="{ret.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{ret.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-
-                    def render_one_way_admin(fd, booking, baseUrl):
-                        first_leg, last_leg = get_flight_info(fd)
-
-                        # Nếu không có legs → thông báo lỗi an toàn
-                        if first_leg is None or last_leg is None:
-                            return "<div>Chuyến bay chưa cập nhật lộ trình</div>"
-
-                        customer_name = (
-                            booking.guest_info.full_name
-                            if booking.guest_info
-                            else "Khách lẻ"
-                        )
-                        customer_avatar = baseUrl + (
-                            booking.user.avatar
-                            if booking.user and booking.user.avatar
-                            else "/media/user_images/default-avatar.png"
-                        )
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                            <div class="flex-shrink-0">
-                                <img src="{baseUrl}{fd.flight.airline.logo}" alt="{fd.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                            </div>
-
-                            <div class="flex-grow">
-                                <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                    <div>Mã:
-                                        <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                    </div>
-
-                                    <span>Khách hàng </span>
-                                    <span class="font-bold text-blue-700">{customer_name} </span>
-                                    <span>đã đặt chuyến bay </span>
-                                    <span class="font-bold text-yellow-600">một chiều</span>:
-                                    <span class="font-bold">{first_leg.departure_airport.name}</span> →
-                                    <span class="font-bold">{last_leg.arrival_airport.name}</span>
-                                </h3>
-
-                                <div class="flex gap-[20px]">
-                                    <div class="flex items-center gap-[4px]">
-                                        <img src="{customer_avatar}" class="w-[24px] h-[24px] object-cover rounded-[50%]" alt="{customer_name}">
-                                        <div>
-                                            <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                            <p class="font-semibold text-[12px] text-gray-900">{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-
-                                    <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-
-                    def render_round_trip_admin(go, ret, booking, baseUrl):
-                        go_first, go_last = get_flight_info(go)
-                        ret_first, ret_last = get_flight_info(ret)
-
-                        customer_name = (
-                            booking.guest_info.full_name
-                            if booking.guest_info
-                            else "Khách lẻ"
-                        )
-                        customer_avatar = baseUrl + (
-                            booking.user.avatar
-                            if booking.user and booking.user.avatar
-                            else "/media/user_images/default-avatar.png"
-                        )
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                            <div class="flex-shrink-0">
-                                <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                            </div>
-
-                            <div class="flex-grow">
-                                <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                    <div>Mã:
-                                        <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                    </div>
-
-                                    <span>Khách hàng </span>
-                                    <span class="font-bold text-blue-700">{customer_name} </span>
-                                    <span>đã đặt chuyến bay </span>
-                                    <span class="font-bold text-green-600">khứ hồi</span>:
-                                    <span class="font-bold">{go_first.departure_airport.name}</span> →
-                                    <span class="font-bold">{go_last.arrival_airport.name}</span>
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <div>
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-blue-600">Chiều đi:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                            <img src="{baseUrl}{go.flight.airline.logo}" class="w-[24px]" alt="{go.flight.airline.name}">
-                                            <p class="text-[12px] text-gray-500">{go.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div class="flex items-center gap-[4px]">
-                                            <img src="{customer_avatar}" class="w-[24px] h-[24px] object-cover rounded-[50%]" alt="{customer_name}">
-                                            <div>
-                                                <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                                <p class="font-semibold text-[12px] text-gray-900">{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                            </div>
-                                        </div>
-                                        <div>
-                                            <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                            <p class="font-semibold text-[12px] text-gray-900">{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-
-                                <!-- CHIỀU VỀ -->
-                                <div class="mt-[14px]">
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-red-600">Chiều về:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                            <img src="{baseUrl}{ret.flight.airline.logo}" class="w-[24px]" alt="{ret.flight.airline.name}">
-                                            <p class="text-[12px] text-gray-500">{ret.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div class="flex items-center gap-[4px]">
-                                            <img src="{customer_avatar}" class="w-[24px] h-[24px] object-cover rounded-[50%]" alt="{customer_name}">
-                                            <div>
-                                                <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                                <p class="font-semibold text-[12px] text-gray-900">{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                            </div>
-                                        </div>
-
-                                        <div>
-                                            <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                            <p class="font-semibold text-[12px] text-gray-900">{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-
-                    def render_one_way_email(fd, booking, baseUrl, fe_url):
-                        first_leg, last_leg = get_flight_info(fd)
-
-                        if first_leg is None or last_leg is None:
-                            return (
-                                "<p>Chuyến bay của bạn chưa được cập nhật lộ trình.</p>"
-                            )
-
-                        return f"""
-                        <div style="font-family: Arial, sans-serif; color:#333; line-height:1.4; padding:20px;">
-                            <h2 style="color:#1a73e8;">Thanh toán thành công</h2>
-
-                            <p>Xin chào <strong>{booking.guest_info.full_name if booking.guest_info else booking.user.full_name}</strong>,</p>
-
-                            <p>Bạn đã thanh toán thành công cho <strong>chuyến bay một chiều</strong> của mình.</p>
-
-                            <div style="margin-top:20px; padding:15px; border:1px solid #e0e0e0; border-radius:8px;">
-                                <div style="display:flex; align-items:center; gap:12px;">
-                                    <img src="{baseUrl}{fd.flight.airline.logo}"
-                                        alt="{fd.flight.airline.name}"
-                                        style="width:60px; height:60px; border-radius:8px; object-fit:cover;">
-                                    
-                                    <div>
-                                        <p style="margin:0; font-size:14px; color:#555;">Mã đặt chỗ</p>
-                                        <p style="margin:0; font-weight:bold; color:#1a73e8;">{booking.booking_code}</p>
-                                    </div>
-                                </div>
-
-                                <h3 style="margin-top:15px; font-size:16px;">
-                                    {first_leg.departure_airport.name} → {last_leg.arrival_airport.name}
-                                </h3>
-
-                                <table style="margin-top:10px; width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-                            </div>
-
-                            <p style="margin-top:20px;">Bạn có thể xem chi tiết tại trang hồ sơ của mình.</p>
-
-                            <a href="{fe_url}/profile/flight"
-                                style="display:inline-block; margin-top:10px; padding:10px 18px; background:#1a73e8; color:white; border-radius:6px; text-decoration:none;">
-                                Xem chi tiết chuyến bay
-                            </a>
-                        </div>
-                        """
-
-                    def render_round_trip_email(go, ret, booking, baseUrl, fe_url):
-                        go_first, go_last = get_flight_info(go)
-                        ret_first, ret_last = get_flight_info(ret)
-
-                        if None in (go_first, go_last, ret_first, ret_last):
-                            return "<p>Chuyến bay của bạn chưa được cập nhật đủ lộ trình.</p>"
-
-                        return f"""
-                        <div style="font-family: Arial, sans-serif; color:#333; line-height:1.4; padding:20px;">
-                            <h2 style="color:#1a73e8;">Thanh toán thành công</h2>
-
-                            <p>Xin chào <strong>{booking.guest_info.full_name if booking.guest_info else booking.user.full_name}</strong>,</p>
-
-                            <p>Bạn đã thanh toán thành công cho <strong>chuyến bay khứ hồi</strong> của mình.</p>
-
-                            <div style="margin-top:20px; padding:15px; border:1px solid #e0e0e0; border-radius:8px;">
-
-                                <!-- HEADER -->
-                                <div style="display:flex; align-items:center; gap:12px;">
-                                    <img src="{baseUrl}{go.flight.airline.logo}"
-                                        alt="{go.flight.airline.name}"
-                                        style="width:60px; height:60px; border-radius:8px; object-fit:cover;">
-                                    
-                                    <div>
-                                        <p style="margin:0; font-size:14px; color:#555;">Mã đặt chỗ</p>
-                                        <p style="margin:0; font-weight:bold; color:#1a73e8;">{booking.booking_code}</p>
-                                    </div>
-                                </div>
-
-                                <h3 style="margin-top:15px; font-size:16px;">
-                                    {go_first.departure_airport.name} ↔ {go_last.arrival_airport.name}
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <h4 style="margin-top:12px; color:#1a73e8;">Chiều đi</h4>
-                                <table style="width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-
-                                <!-- CHIỀU VỀ -->
-                                <h4 style="margin-top:20px; color:#d93025;">Chiều về</h4>
-                                <table style="width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-
-                            </div>
-
-                            <p style="margin-top:20px;">Bạn có thể xem chi tiết tại trang hồ sơ của mình.</p>
-
-                            <a href="{fe_url}/profile/flight"
-                                style="display:inline-block; margin-top:10px; padding:10px 18px; background:#1a73e8; color:white; border-radius:6px; text-decoration:none;">
-                                Xem chi tiết chuyến bay
-                            </a>
-                        </div>
-                        """
-
-                    # Tạo message
-                    if len(flight_details) == 1:
-                        message = render_one_way(flight_details[0])
-                        message_admin = render_one_way_admin(
-                            flight_details[0], booking, baseUrl
-                        )
-                    else:
-                        message = render_round_trip(
-                            flight_details[0], flight_details[1]
-                        )
-                        message_admin = render_round_trip_admin(
-                            flight_details[0], flight_details[1], booking, baseUrl
-                        )
-
-                    # Tạo Notification và gửi email cho người dùng
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,
-                        email=email_to,
-                        title="Thanh toán thành công",
-                        message=message,
-                        message_email=(
-                            render_one_way_email(
-                                flight_details[0], booking, baseUrl, front_url
-                            )
-                            if len(flight_details) == 1
-                            else render_round_trip_email(
-                                flight_details[0],
-                                flight_details[1],
-                                booking,
-                                baseUrl,
-                                front_url,
-                            )
-                        ),
-                        link="/profile/flight",
-                        send_mail_flag=True,
-                    )
-
-                    for flight_detail in flight_details:
-                        # gửi thông báo cho người vận hành chuyến bay (không gửi email)
-                        Notification.objects.create(
-                            user=(
-                                flight_detail.flight.airline.flight_operations_staff
-                            ),  # user có thể null
-                            email=(
-                                flight_detail.flight.airline.flight_operations_staff.email
-                            ),
-                            title="Thanh toán thành công",
-                            message=render_one_way_admin(
-                                flight_detail, booking, baseUrl
-                            ),
-                            message_email="",
-                            link=f"/flight-payment",
-                            send_mail_flag=False,
-                        )
-
-                    # gửi thông báo cho tất cả admin (không gửi email)
-                    admins = CustomUser.objects.filter(
-                        role="admin"
-                    )  # sửa 'role' + 'admin' theo model của bạn
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            email=admin.email,
-                            title="Thanh toán thành công",
-                            message=message_admin,
-                            message_email="",
-                            link=f"/flight-payment",  # hoặc link phù hợp cho admin
-                            send_mail_flag=False,
-                        )
+        payment_status = int(payment.status)
 
+        if payment_status in [PaymentStatus.SUCCESS, PaymentStatus.PAID]:
             return Response({"detail": "Payment completed successfully"})
-        else:
-            payment.status = PaymentStatus.FAILED
-            payment.save()
-
-            # ❌ Gửi thông báo khi thất bại
-            if email_to:
-                scheme = request.scheme  # http hoặc https
-                host = request.get_host()  # 127.0.0.1:8000
-                baseUrl = f"{scheme}://{host}"
-
-                user_obj = booking.user
-                username = user_obj.username if user_obj else "Khách"
-                avatar = (
-                    f"{user_obj.avatar}"
-                    if user_obj and user_obj.avatar
-                    else f"/media/user_images/default-avatar.png"
-                )
-
-                if booking.service_type == ServiceType.HOTEL:
-                    images = booking.hotel_detail.room.hotel.images.all()
-                    image_url = images[0].image if images.exists() else ""
-
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thất bại",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <div class="flex items-center gap-[6px] text-red-500 font-bold">
-                                    <svg stroke="currentColor" fill="currentColor" stroke-width="0" viewBox="0 0 384 512" class="text-[20px]" height="1em" width="1em" xmlns="http://www.w3.org/2000/svg">
-                                        <path d="M342.6 150.6c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L192 210.7 86.6 105.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3L146.7 256 41.4 361.4c-12.5 12.5-12.5 32.8 0 45.3s32.8 12.5 45.3 0L192 301.3 297.4 406.6c12.5 12.5 32.8 12.5 45.3 0s12.5-32.8 0-45.3L237.3 256 342.6 150.6z"></path>
-                                    </svg>
-                                    Thanh toán thất bại
-                                </div>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Nhận phòng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                        <tr>
-                            <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" 
-                                    style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                <!-- Header -->
-                                <tr>
-                                <td style="background:#dc2626; padding:20px; text-align:center; color:white;">
-                                    <h2 style="margin:0; font-size:22px;">⚠️ Thanh toán thất bại</h2>
-                                    <p style="margin:0; font-size:14px;">Đơn đặt phòng của bạn chưa thể hoàn tất</p>
-                                </td>
-                                </tr>
-
-                                <!-- Body -->
-                                <tr>
-                                <td style="padding:25px;">
-
-                                    <h3 style="margin-top:0;">Thông tin đặt phòng</h3>
-
-                                    <table width="100%" cellpadding="0" cellspacing="0">
-                                    <tr>
-                                        <!-- Hotel image -->
-                                        <td width="120">
-                                        <img src='{baseUrl}{image_url}'
-                                            alt="{booking.hotel_detail.room.hotel.name}"
-                                            style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                        </td>
-
-                                        <!-- Description -->
-                                        <td style="padding-left:15px;">
-                                        <p style="margin:0; font-size:15px;">
-                                            <strong>Mã đặt chỗ:</strong>
-                                            <span style="color:#dc2626; font-weight:bold;">{booking.booking_code}</span>
-                                        </p>
-
-                                        <p style="margin:6px 0 0;">
-                                            <strong>Khách sạn:</strong> {booking.hotel_detail.room.hotel.name}
-                                        </p>
-
-                                        <p style="margin:4px 0 0;">
-                                            <strong>Loại phòng:</strong> {booking.hotel_detail.room.room_type}
-                                        </p>
-                                        </td>
-                                    </tr>
-                                    </table>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Schedule -->
-                                    <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                    <p style="margin:0;">
-                                    <strong>Nhận phòng:</strong><br>
-                                    {booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}
-                                    </p>
-
-                                    <p style="margin:10px 0 0;">
-                                    <strong>Trả phòng:</strong><br>
-                                    {booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}
-                                    </p>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Error Message -->
-                                    <p style="margin:0; font-size:15px; color:#dc2626; font-weight:bold;">
-                                    ❌ Thanh toán không thành công.
-                                    </p>
-
-                                    <p style="margin:8px 0 0; font-size:14px; color:#475569;">
-                                    Vui lòng kiểm tra lại phương thức thanh toán hoặc thử lại sau vài phút.
-                                    Nếu bạn cần hỗ trợ, đội ngũ chăm sóc khách hàng luôn sẵn sàng!
-                                    </p>
-
-                                </td>
-                                </tr>
-
-                                <!-- Footer -->
-                                <tr>
-                                <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                    © 2024 Booking System. All rights reserved.
-                                </td>
-                                </tr>
-
-                            </table>
-                            </td>
-                        </tr>
-                        </table>
-                        """,
-                        link=f"/profile/hotel",
-                        send_mail_flag=True,
-                        is_error=True,
-                    )
-
-                elif booking.service_type == ServiceType.CAR:
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thất bại",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.car_detail.car.image}' alt={booking.car_detail.car.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <div class="flex items-center gap-[6px] text-red-500 font-bold">
-                                    <svg stroke="currentColor" fill="currentColor" stroke-width="0" viewBox="0 0 384 512" class="text-[20px]" height="1em" width="1em" xmlns="http://www.w3.org/2000/svg">
-                                        <path d="M342.6 150.6c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L192 210.7 86.6 105.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3L146.7 256 41.4 361.4c-12.5 12.5-12.5 32.8 0 45.3s32.8 12.5 45.3 0L192 301.3 297.4 406.6c12.5 12.5 32.8 12.5 45.3 0s12.5-32.8 0-45.3L237.3 256 342.6 150.6z"></path>
-                                    </svg>
-                                    Thanh toán thất bại
-                                </div>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.car_detail.car.name}</span> <span>({booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location})</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời điểm bắt đầu</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian ước lượng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{round(booking.car_detail.total_time_estimate, 1)} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                        <tr>
-                            <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" 
-                                    style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                <!-- Header -->
-                                <tr>
-                                <td style="background:#dc2626; padding:20px; text-align:center; color:white;">
-                                    <h2 style="margin:0; font-size:22px;">⚠️ Thanh toán thất bại</h2>
-                                    <p style="margin:0; font-size:14px;">Đặt xe của bạn chưa thể hoàn tất</p>
-                                </td>
-                                </tr>
-
-                                <!-- Body -->
-                                <tr>
-                                <td style="padding:25px;">
-
-                                    <h3 style="margin-top:0;">Thông tin chuyến xe</h3>
-
-                                    <table width="100%" cellpadding="0" cellspacing="0">
-                                    <tr>
-                                        <!-- Car image -->
-                                        <td width="120">
-                                        <img src='{baseUrl}{booking.car_detail.car.image}' 
-                                            alt="{booking.car_detail.car.name}"
-                                            style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                        </td>
-
-                                        <!-- Description -->
-                                        <td style="padding-left:15px;">
-                                        <p style="margin:0; font-size:15px;">
-                                            <strong>Mã đặt chỗ:</strong>
-                                            <span style="color:#dc2626; font-weight:bold;">{booking.booking_code}</span>
-                                        </p>
-
-                                        <p style="margin:6px 0 0;">
-                                            <strong>Xe:</strong> {booking.car_detail.car.name}
-                                        </p>
-
-                                        <p style="margin:4px 0 0;">
-                                            <strong>Lộ trình:</strong> {booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location}
-                                        </p>
-                                        </td>
-                                    </tr>
-                                    </table>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Schedule -->
-                                    <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                    <p style="margin:0;">
-                                    <strong>Bắt đầu:</strong><br>
-                                    {booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}
-                                    </p>
-
-                                    <p style="margin:10px 0 0;">
-                                    <strong>Thời gian ước lượng:</strong><br>
-                                    {round(booking.car_detail.total_time_estimate, 1)} tiếng
-                                    </p>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Error Message -->
-                                    <p style="margin:0; font-size:15px; color:#dc2626; font-weight:bold;">
-                                    ❌ Thanh toán không thành công.
-                                    </p>
-
-                                    <p style="margin:8px 0 0; font-size:14px; color:#475569;">
-                                    Vui lòng kiểm tra lại phương thức thanh toán hoặc thử lại sau ít phút.
-                                    Nếu bạn cần hỗ trợ, đội ngũ chăm sóc khách hàng luôn sẵn sàng đồng hành cùng bạn.
-                                    </p>
-
-                                </td>
-                                </tr>
-
-                                <!-- Footer -->
-                                <tr>
-                                <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                    © 2024 Booking System. All rights reserved.
-                                </td>
-                                </tr>
-
-                            </table>
-                            </td>
-                        </tr>
-                        </table>
-                        """,
-                        link=f"",
-                        send_mail_flag=True,
-                        is_error=True,
-                    )
-
-                elif booking.service_type == ServiceType.ACTIVITY:
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,  # user có thể null
-                        email=email_to,
-                        title="Thanh toán thất bại",
-                        message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.activity_date_detail.activity_image}' alt={booking.activity_date_detail.activity_name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <div class="flex items-center gap-[6px] text-red-500 font-bold">
-                                    <svg stroke="currentColor" fill="currentColor" stroke-width="0" viewBox="0 0 384 512" class="text-[20px]" height="1em" width="1em" xmlns="http://www.w3.org/2000/svg">
-                                        <path d="M342.6 150.6c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L192 210.7 86.6 105.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3L146.7 256 41.4 361.4c-12.5 12.5-12.5 32.8 0 45.3s32.8 12.5 45.3 0L192 301.3 297.4 406.6c12.5 12.5 32.8 12.5 45.3 0s12.5-32.8 0-45.3L237.3 256 342.6 150.6z"></path>
-                                    </svg>
-                                    Thanh toán thất bại
-                                </div>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.activity_date_detail.activity_name}</span> - <span>{booking.activity_date_detail.activity_package_name}</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời điểm hoạt động</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}</p>
-                                    </div>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                        message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                        <tr>
-                            <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" 
-                                    style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                <!-- Header -->
-                                <tr>
-                                <td style="background:#dc2626; padding:20px; text-align:center; color:white;">
-                                    <h2 style="margin:0; font-size:22px;">⚠️ Thanh toán thất bại</h2>
-                                    <p style="margin:0; font-size:14px;">Hoạt động của bạn chưa được xác nhận</p>
-                                </td>
-                                </tr>
-
-                                <!-- Body -->
-                                <tr>
-                                <td style="padding:25px;">
-
-                                    <h3 style="margin-top:0;">Thông tin hoạt động</h3>
-
-                                    <table width="100%" cellpadding="0" cellspacing="0">
-                                    <tr>
-                                        <!-- Activity image -->
-                                        <td width="120">
-                                        <img src='{baseUrl}{booking.activity_date_detail.activity_image}' 
-                                            alt="{booking.activity_date_detail.activity_name}"
-                                            style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                        </td>
-
-                                        <!-- Description -->
-                                        <td style="padding-left:15px;">
-                                        <p style="margin:0; font-size:15px;">
-                                            <strong>Mã đặt chỗ:</strong>
-                                            <span style="color:#dc2626; font-weight:bold;">{booking.booking_code}</span>
-                                        </p>
-
-                                        <p style="margin:6px 0 0;">
-                                            <strong>Hoạt động:</strong> {booking.activity_date_detail.activity_name}
-                                        </p>
-
-                                        <p style="margin:4px 0 0;">
-                                            <strong>Gói dịch vụ:</strong> {booking.activity_date_detail.activity_package_name}
-                                        </p>
-                                        </td>
-                                    </tr>
-                                    </table>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Schedule -->
-                                    <h3 style="margin-bottom:10px;">Thời gian hoạt động</h3>
-
-                                    <p style="margin:0;">
-                                    <strong>Ngày diễn ra:</strong><br>
-                                    {booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}
-                                    </p>
-
-                                    <p style="margin:10px 0 0;">
-                                    <strong>Thời lượng:</strong><br>
-                                    {booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng
-                                    </p>
-
-                                    <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                    <!-- Error Message -->
-                                    <p style="margin:0; font-size:15px; color:#dc2626; font-weight:bold;">
-                                    ❌ Thanh toán không thành công.
-                                    </p>
-
-                                    <p style="margin:8px 0 0; font-size:14px; color:#475569;">
-                                    Vui lòng kiểm tra lại phương thức thanh toán hoặc thử lại sau.
-                                    Nếu cần hỗ trợ, chúng tôi luôn sẵn sàng hỗ trợ bạn.
-                                    </p>
-
-                                </td>
-                                </tr>
-
-                                <!-- Footer -->
-                                <tr>
-                                <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                    © 2024 Booking System. All rights reserved.
-                                </td>
-                                </tr>
-
-                            </table>
-                            </td>
-                        </tr>
-                        </table>
-                        """,
-                        link=f"/profile/activity",
-                        send_mail_flag=True,
-                        is_error=True,
-                    )
-
-                elif booking.service_type == ServiceType.FLIGHT:
-                    flight_details = booking.flight_details.all()
-
-                    if not flight_details.exists():
-                        return
-
-                    # Hàm lấy leg đầu và cuối
-                    def get_flight_info(fd):
-                        flight = fd.flight
-                        first_leg = flight.legs.order_by("departure_time").first()
-                        last_leg = flight.legs.order_by("arrival_time").last()
-                        return first_leg, last_leg
-
-                    # Hàm render 1 chiều
-                    def render_one_way(fd):
-                        first_leg, last_leg = get_flight_info(fd)
-
-                        # Nếu không có legs → thông báo lỗi an toàn
-                        if first_leg is None or last_leg is None:
-                            return "<div>Chuyến bay chưa cập nhật lộ trình</div>"
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                        <div class="flex-shrink-0">
-                            <img src="{baseUrl}{fd.flight.airline.logo}" alt="{fd.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                        </div>
-
-                        <div class="flex-grow">
-                            <div class="flex items-center gap-[6px] text-red-500 font-bold">
-                                <svg stroke="currentColor" fill="currentColor" stroke-width="0" viewBox="0 0 384 512" class="text-[20px]" height="1em" width="1em" xmlns="http://www.w3.org/2000/svg">
-                                    <path d="M342.6 150.6c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L192 210.7 86.6 105.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3L146.7 256 41.4 361.4c-12.5 12.5-12.5 32.8 0 45.3s32.8 12.5 45.3 0L192 301.3 297.4 406.6c12.5 12.5 32.8 12.5 45.3 0s12.5-32.8 0-45.3L237.3 256 342.6 150.6z"></path>
-                                </svg>
-                                Thanh toán thất bại
-                            </div>
-                            <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                <div>Mã:
-                                    <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                </div>
-                                <span>Chuyến bay </span>
-                                <span class="font-bold text-yellow-600">một chiều</span>:
-                                <span class="font-bold">{first_leg.departure_airport.name}</span> →
-                                <span class="font-bold">{last_leg.arrival_airport.name}</span>
-                            </h3>
-
-                            <div class="flex gap-[20px]">
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                            </div>
-                        </div>
-                        </div>
-                        """
-
-                    # Hàm render khứ hồi
-                    def render_round_trip(go, ret):
-                        go_first, go_last = get_flight_info(go)
-                        ret_first, ret_last = get_flight_info(ret)
-
-                        if None in (go_first, go_last, ret_first, ret_last):
-                            return "<div>Chuyến bay chưa cập nhật đủ lộ trình</div>"
-
-                        return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                            <div class="flex-shrink-0">
-                                <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                            </div>
-
-                            <div class="flex-grow">
-                                <div class="flex items-center gap-[6px] text-red-500 font-bold">
-                                    <svg stroke="currentColor" fill="currentColor" stroke-width="0" viewBox="0 0 384 512" class="text-[20px]" height="1em" width="1em" xmlns="http://www.w3.org/2000/svg">
-                                        <path d="M342.6 150.6c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L192 210.7 86.6 105.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3L146.7 256 41.4 361.4c-12.5 12.5-12.5 32.8 0 45.3s32.8 12.5 45.3 0L192 301.3 297.4 406.6c12.5 12.5 32.8 12.5 45.3 0s12.5-32.8 0-45.3L237.3 256 342.6 150.6z"></path>
-                                    </svg>
-                                    Thanh toán thất bại
-                                </div>
-                                <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                    <div>Mã:
-                                        <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                    </div>
-                                    <span>Chuyến bay </span>
-                                    <span class="font-bold text-green-600">khứ hồi</span>:
-                                    <span class="font-bold">{go_first.departure_airport.name}</span> →
-                                    <span class="font-bold">{go_last.arrival_airport.name}</span>
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <div>
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-blue-600">Chiều đi:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{go.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-
-                                <!-- CHIỀU VỀ -->
-                                <div class="mt-[14px]">
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-red-600">Chiều về:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{ret.flight.airline.logo}" alt="{ret.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{ret.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-
-                    def render_one_way_email(fd, booking, baseUrl):
-                        first_leg, last_leg = get_flight_info(fd)
-
-                        if first_leg is None or last_leg is None:
-                            return """
-                            <div style="font-family: Arial; font-size:14px;">
-                                Chuyến bay chưa cập nhật lộ trình.
-                            </div>
-                            """
-
-                        customer_name = (
-                            booking.guest_info.full_name
-                            if booking.guest_info
-                            else "Khách lẻ"
-                        )
-
-                        return f"""
-                        <div style="font-family: Arial; padding: 20px;">
-                            <h2 style="color:#d9534f;">Thanh toán thất bại</h2>
-                            <p>Xin chào <b>{customer_name}</b>,</p>
-                            <p>Rất tiếc! Giao dịch thanh toán cho chuyến bay của bạn đã <b style="color:#d9534f;">không thành công</b>.</p>
-
-                            <div style="border:1px solid #eee; padding:15px; border-radius:6px; margin-top:15px;">
-                                <h3 style="margin-top:0;">Thông tin chuyến bay (một chiều)</h3>
-
-                                <p><b>Mã đặt chỗ:</b> {booking.booking_code}</p>
-
-                                <p><b>Hãng bay:</b> {fd.flight.airline.name}</p>
-
-                                <p><b>Lộ trình:</b> {first_leg.departure_airport.name} → {last_leg.arrival_airport.name}</p>
-
-                                <p><b>Thời điểm cất cánh:</b> {first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                <p><b>Thời điểm hạ cánh:</b> {last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                            </div>
-
-                            <p style="margin-top:20px;">
-                                Vui lòng thử thanh toán lại hoặc chọn phương thức khác.
-                            </p>
-
-                            <p style="color:#777; font-size:12px;">Cảm ơn bạn đã sử dụng dịch vụ!</p>
-                        </div>
-                        """
-
-                    def render_round_trip_email(go, ret, booking, baseUrl):
-                        go_first, go_last = get_flight_info(go)
-                        ret_first, ret_last = get_flight_info(ret)
-
-                        customer_name = (
-                            booking.guest_info.full_name
-                            if booking.guest_info
-                            else "Khách lẻ"
-                        )
-
-                        if None in (go_first, go_last, ret_first, ret_last):
-                            return "<p>Chuyến bay của bạn chưa được cập nhật đủ lộ trình.</p>"
-
-                        return f"""
-                        <div style="font-family: Arial; padding: 20px;">
-                            <h2 style="color:#d9534f;">Thanh toán thất bại</h2>
-                            <p>Xin chào <b>{customer_name}</b>,</p>
-                            <p>Giao dịch thanh toán cho chuyến bay khứ hồi của bạn đã <b style="color:#d9534f;">không thành công</b>.</p>
-
-                            <div style="border:1px solid #eee; padding:15px; border-radius:6px; margin-top:15px;">
-                                <h3 style="margin-top:0;">Thông tin chuyến bay khứ hồi</h3>
-
-                                <p><b>Mã đặt chỗ:</b> {booking.booking_code}</p>
-
-                                <hr/>
-
-                                <h4>Chiều đi</h4>
-                                <p><b>Hãng bay:</b> {go.flight.airline.name}</p>
-                                <p><b>Lộ trình:</b> {go_first.departure_airport.name} → {go_last.arrival_airport.name}</p>
-                                <p><b>Cất cánh:</b> {go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                <p><b>Hạ cánh:</b> {go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-
-                                <hr/>
-
-                                <h4>Chiều về</h4>
-                                <p><b>Hãng bay:</b> {ret.flight.airline.name}</p>
-                                <p><b>Lộ trình:</b> {ret_first.departure_airport.name} → {ret_last.arrival_airport.name}</p>
-                                <p><b>Cất cánh:</b> {ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                <p><b>Hạ cánh:</b> {ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                            </div>
-
-                            <p style="margin-top:20px;">
-                                Bạn có thể thử thanh toán lại hoặc liên hệ hỗ trợ nếu cần.
-                            </p>
-
-                            <p style="color:#777; font-size:12px;">Cảm ơn bạn đã sử dụng dịch vụ!</p>
-                        </div>
-                        """
-
-                    # Tạo message
-                    if len(flight_details) == 1:
-                        message = render_one_way(flight_details[0])
-                    else:
-                        message = render_round_trip(
-                            flight_details[0], flight_details[1]
-                        )
-
-                    # Tạo Notification và gửi email cho người dùng
-                    Notification.objects.create(
-                        user=booking.user if booking.user else None,
-                        email=email_to,
-                        title="Thanh toán thất bại",
-                        message=message,
-                        message_email=(
-                            render_one_way_email(flight_details[0], booking, baseUrl)
-                            if len(flight_details) == 1
-                            else render_round_trip_email(
-                                flight_details[0], flight_details[1], booking, baseUrl
-                            )
-                        ),
-                        link="/profile/flight",
-                        send_mail_flag=True,
-                        is_error=True,
-                    )
-
-            return Response({"detail": "Payment not completed"}, status=400)
+        if payment_status == PaymentStatus.PENDING:
+            # Webhook chưa tới, frontend gọi lại sau
+            return Response(
+                {"detail": "Payment is being processed"},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        return Response({"detail": "Payment not completed"}, status=400)
 
     @action(detail=True, methods=["post"])
+    @idempotent
     def confirm_cash(self, request, pk=None):
-        payment = self.get_object()
-        email_to = self.get_booking_email(payment.booking)
+        with transaction.atomic():
+            # Khóa payment + booking: xác nhận đồng thời chỉ 1 request ghi và gửi thông báo
+            payment = self.get_locked_object()
+
+            # ❌ Kiểm tra phương thức
+            if payment.method != PaymentMethod.CASH:
+                return Response(
+                    {"detail": "This payment is not a cash payment."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-        # ❌ Kiểm tra phương thức
-        if payment.method != PaymentMethod.CASH:
-            return Response(
-                {"detail": "This payment is not a cash payment."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            if int(payment.status) in [
+                PaymentStatus.UNPAID,
+                PaymentStatus.PAID,
+                PaymentStatus.SUCCESS,
+            ]:
+                return Response(
+                    {"success": True, "detail": "Payment already confirmed"},
+                    status=status.HTTP_200_OK,
+                )
 
-        booking = payment.booking
+            booking = payment.booking
+            if booking.service_type == ServiceType.FLIGHT:
+                try:
+                    confirm_holds(booking.id)
+                except SeatsUnavailable as e:
+                    return Response(
+                        {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            # ✅ Cập nhật trạng thái
+            payment.status = PaymentStatus.UNPAID
+            booking.status = BookingStatus.CONFIRMED
+            booking.payment_status = PaymentStatus.UNPAID
 
-        # ✅ Cập nhật trạng thái
-        payment.status = PaymentStatus.UNPAID
-        booking.status = BookingStatus.CONFIRMED
-        booking.payment_status = PaymentStatus.UNPAID
+            payment.save(update_fields=["status"])
+            booking.save(update_fields=["status", "payment_status"])
 
-        payment.save(update_fields=["status"])
-        booking.save(update_fields=["status", "payment_status"])
+        email_to = self.get_booking_email(booking)
 
         # ✅ Chuẩn bị thông báo linh hoạt theo loại dịch vụ
         service_label = dict(ServiceType.choices).get(booking.service_type, "Booking")
@@ -1904,580 +272,15 @@ class PaymentViewSet(viewsets.ModelViewSet):
             title = "Đặt dịch vụ thành công"
             message = f"Đơn đặt {booking.booking_code} của bạn đã được xác nhận."
 
-        # ✅ Gửi thông báo
+        # ✅ Gửi thông báo cho user (đối tác / admin chỉ nhận khi thanh toán online)
         if email_to:
-            # Notification.objects.create(
-            #     user=booking.user if booking.user else None,
-            #     email=email_to,
-            #     title=title,
-            #     message=message,
-            # )
-            scheme = request.scheme  # http hoặc https
-            host = request.get_host()  # 127.0.0.1:8000
-            baseUrl = f"{scheme}://{host}"
-
-            if booking.service_type == ServiceType.HOTEL:
-                images = booking.hotel_detail.room.hotel.images.all()
-                image_url = images[0].image if images.exists() else ""
-
-                Notification.objects.create(
-                    user=booking.user if booking.user else None,  # user có thể null
-                    email=email_to,
-                    title="Thanh toán thành công",
-                    message=f"""
-                    <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                        <div class='flex-shrink-0'><img src='{baseUrl}{image_url}' alt={booking.hotel_detail.room.hotel.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                        <div class='flex-grow'>
-                            <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                <span class='font-bold'>{booking.hotel_detail.room.hotel.name}</span> - <span>{booking.hotel_detail.room.room_type}</span>
-                            </h3>
-                            <div class='flex gap-[20px]'>
-                                <div>
-                                    <p class='text-gray-600 text-[12px]'>Nhận phòng</p>
-                                    <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                                <div>
-                                    <p class='text-gray-600 text-[12px]'>Trả phòng</p>
-                                    <p class='font-semibold text-[12px] text-gray-900'>{booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                            </div>
-                        </div>
-                    </div>""",
-                    message_email=f"""
-                        <div style="padding:20px;font-family:sans-serif;background:#f8f8f8">
-                            <div style="max-width:600px;margin:auto;background:white;padding:20px;border-radius:10px">
-                                <h2 style="color:#4CAF50">Thanh toán thành công 🎉</h2>
-                                <p>Xin chào <b>{booking.guest_info.full_name if booking.user else "Khách"}</b>,</p>
-                                <p>Bạn đã thanh toán thành công mã đặt phòng <b>{booking.booking_code}</b>.</p>
-
-                                <img src='{baseUrl}{image_url}' 
-                                    style="width:100%;height:250px;object-fit:cover;border-radius:10px" />
-
-                                <h3 style="margin-top:20px">Thông tin đặt phòng</h3>
-                                <ul>
-                                    <li>Khách sạn: <b>{booking.hotel_detail.room.hotel.name}</b></li>
-                                    <li>Loại phòng: <b>{booking.hotel_detail.room.room_type}</b></li>
-                                    <li>Nhận phòng: {booking.hotel_detail.check_in.strftime("%Y-%m-%d %H:%M:%S")}</li>
-                                    <li>Trả phòng: {booking.hotel_detail.check_out.strftime("%Y-%m-%d %H:%M:%S")}</li>
-                                </ul>
-
-                                <p style="margin-top:20px">
-                                    Cảm ơn bạn đã đặt phòng tại hệ thống của chúng tôi ❤️
-                                </p>
-                            </div>
-                        </div>
-                    """,
-                    link=f"/profile/hotel",
-                    send_mail_flag=True,
-                )
-
-            elif booking.service_type == ServiceType.CAR:
-                Notification.objects.create(
-                    user=booking.user if booking.user else None,  # user có thể null
-                    email=email_to,
-                    title="Thanh toán thành công",
-                    message=f"""
-                        <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                            <div class='flex-shrink-0'><img src='{baseUrl}{booking.car_detail.car.image}' alt={booking.car_detail.car.name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                            <div class='flex-grow'>
-                                <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                    <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                    <span class='font-bold'>{booking.car_detail.car.name}</span> <span>({booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location})</span>
-                                </h3>
-                                <div class='flex gap-[20px]'>
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời điểm bắt đầu</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                    </div>
-
-                                    <div>
-                                        <p class='text-gray-600 text-[12px]'>Thời gian ước lượng</p>
-                                        <p class='font-semibold text-[12px] text-gray-900'>{round(booking.car_detail.total_time_estimate, 1)} tiếng</p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>""",
-                    message_email=f"""
-                        <table width="100%" cellpadding="0" cellspacing="0" 
-                            style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                            <tr>
-                                <td align="center">
-                                <table width="600" cellpadding="0" cellspacing="0" 
-                                        style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                                    <!-- Header -->
-                                    <tr>
-                                    <td style="background:#0ea5e9; padding:20px; text-align:center; color:white;">
-                                        <h2 style="margin:0; font-size:22px;">🎉 Thanh toán thành công!</h2>
-                                        <p style="margin:0; font-size:14px;">Cảm ơn bạn đã đặt chuyến xe tại hệ thống</p>
-                                    </td>
-                                    </tr>
-
-                                    <!-- Body -->
-                                    <tr>
-                                        <td style="padding:25px;">
-
-                                            <h3 style="margin-top:0;">Thông tin chuyến đi</h3>
-
-                                            <table width="100%" cellpadding="0" cellspacing="0">
-                                                <tr>
-                                                    <!-- Car image -->
-                                                    <td width="120">
-                                                    <img src='{baseUrl}{booking.car_detail.car.image}' 
-                                                        alt="{booking.car_detail.car.name}"
-                                                        style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                                    </td>
-
-                                                    <!-- Trip details -->
-                                                    <td style="padding-left:15px;">
-                                                    <p style="margin:0; font-size:15px;">
-                                                        <strong>Mã đặt chỗ:</strong>
-                                                        <span style="color:#0284c7; font-weight:bold;">{booking.booking_code}</span>
-                                                    </p>
-
-                                                    <p style="margin:6px 0 0;">
-                                                        <strong>Xe:</strong> {booking.car_detail.car.name}
-                                                    </p>
-
-                                                    <p style="margin:4px 0 0;">
-                                                        <strong>Hành trình:</strong>
-                                                        {booking.car_detail.pickup_location} → {booking.car_detail.dropoff_location}
-                                                    </p>
-                                                    </td>
-                                                </tr>
-                                            </table>
-
-                                            <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                            <!-- Dates -->
-                                            <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                            <p style="margin:0;">
-                                                <strong>Thời điểm bắt đầu:</strong><br>
-                                                {booking.car_detail.pickup_datetime.strftime("%Y-%m-%d %H:%M:%S")}
-                                            </p>
-
-                                            <p style="margin:10px 0 0;">
-                                                <strong>Thời gian ước lượng:</strong><br>
-                                                {round(booking.car_detail.total_time_estimate, 1)} tiếng
-                                            </p>
-
-                                            <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                            <p style="margin-bottom:0; font-size:14px; color:#475569;">
-                                            Nếu bạn có bất kỳ câu hỏi nào, đừng ngần ngại liên hệ với chúng tôi.
-                                            </p>
-
-                                        </td>
-                                    </tr>
-
-                                    <!-- Footer -->
-                                    <tr>
-                                        <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                            © 2024 Booking System. All rights reserved.
-                                        </td>
-                                    </tr>
-
-                                </table>
-                                </td>
-                            </tr>
-                        </table>
-                        """,
-                    link=f"",
-                    send_mail_flag=True,
-                )
-
-            elif booking.service_type == ServiceType.ACTIVITY:
-                Notification.objects.create(
-                    user=booking.user if booking.user else None,  # user có thể null
-                    email=email_to,
-                    title="Thanh toán thành công",
-                    message=f"""
-                    <div class='border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]'>
-                        <div class='flex-shrink-0'><img src='{baseUrl}{booking.activity_date_detail.activity_image}' alt={booking.activity_date_detail.activity_name} class='w-[50px] h-[50px] object-cover rounded-lg'></div>
-                        <div class='flex-grow'>
-                            <h3 class='text-gray-900 mb-[6px] leading-[18px]'>
-                                <div>Mã:<span class='text-blue-500 font-semibold'> {booking.booking_code}</span></div>
-                                <span class='font-bold'>{booking.activity_date_detail.activity_name}</span> - <span>{booking.activity_date_detail.activity_package_name}</span>
-                            </h3>
-                            <div class='flex gap-[20px]'>
-                                <div>
-                                    <p class='text-gray-600 text-[12px]'>Thời điểm hoạt động</p>
-                                    <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}</p>
-                                </div>
-                                <div>
-                                    <p class='text-gray-600 text-[12px]'>Thời gian</p>
-                                    <p class='font-semibold text-[12px] text-gray-900'>{booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng</p>
-                                </div>
-                            </div>
-                        </div>
-                    </div>""",
-                    message_email=f"""
-                    <table width="100%" cellpadding="0" cellspacing="0" 
-                        style="font-family: Arial, sans-serif; background-color:#f7f7f7; padding:30px 0;">
-                    <tr>
-                        <td align="center">
-                        <table width="600" cellpadding="0" cellspacing="0" 
-                                style="background:white; border-radius:12px; overflow:hidden; box-shadow:0 4px 20px rgba(0,0,0,0.08);">
-
-                            <!-- Header -->
-                            <tr>
-                            <td style="background:#10b981; padding:20px; text-align:center; color:white;">
-                                <h2 style="margin:0; font-size:22px;">🎉 Thanh toán thành công!</h2>
-                                <p style="margin:0; font-size:14px;">Bạn đã đặt thành công hoạt động trải nghiệm</p>
-                            </td>
-                            </tr>
-
-                            <!-- Body -->
-                            <tr>
-                            <td style="padding:25px;">
-
-                                <h3 style="margin-top:0;">Thông tin hoạt động</h3>
-
-                                <table width="100%" cellpadding="0" cellspacing="0">
-                                <tr>
-                                    <!-- Activity image -->
-                                    <td width="120">
-                                    <img src='{baseUrl}{booking.activity_date_detail.activity_image}' 
-                                        alt="{booking.activity_date_detail.activity_name}"
-                                        style="width:120px; height:80px; object-fit:cover; border-radius:8px;">
-                                    </td>
-
-                                    <!-- Description -->
-                                    <td style="padding-left:15px;">
-                                    <p style="margin:0; font-size:15px;">
-                                        <strong>Mã đặt chỗ:</strong>
-                                        <span style="color:#059669; font-weight:bold;">{booking.booking_code}</span>
-                                    </p>
-
-                                    <p style="margin:6px 0 0;">
-                                        <strong>Hoạt động:</strong> {booking.activity_date_detail.activity_name}
-                                    </p>
-
-                                    <p style="margin:4px 0 0;">
-                                        <strong>Gói trải nghiệm:</strong> {booking.activity_date_detail.activity_package_name}
-                                    </p>
-                                    </td>
-                                </tr>
-                                </table>
-
-                                <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                <!-- Schedule -->
-                                <h3 style="margin-bottom:10px;">Thời gian</h3>
-
-                                <p style="margin:0;">
-                                <strong>Ngày diễn ra:</strong><br>
-                                {booking.activity_date_detail.date_launch.strftime("%Y-%m-%d")}
-                                </p>
-
-                                <p style="margin:10px 0 0;">
-                                <strong>Thời lượng:</strong><br>
-                                {booking.activity_date_detail.activity_date.activity_package.activity.total_time} tiếng
-                                </p>
-
-                                <hr style="margin:20px 0; border:none; border-top:1px solid #e5e7eb;">
-
-                                <p style="margin-bottom:0; font-size:14px; color:#475569;">
-                                Chúc bạn có một trải nghiệm tuyệt vời!  
-                                Nếu cần hỗ trợ, đừng ngần ngại liên hệ với chúng tôi.
-                                </p>
-
-                            </td>
-                            </tr>
-
-                            <!-- Footer -->
-                            <tr>
-                            <td style="background:#f1f5f9; padding:15px; text-align:center; font-size:12px; color:#64748b;">
-                                © 2024 Booking System. All rights reserved.
-                            </td>
-                            </tr>
-
-                        </table>
-                        </td>
-                    </tr>
-                    </table>
-                    """,
-                    link=f"/profile/activity",
-                    send_mail_flag=True,
-                )
-
-            elif booking.service_type == ServiceType.FLIGHT:
-                flight_details = booking.flight_details.all()
-
-                if not flight_details.exists():
-                    return
-
-                # Hàm lấy leg đầu và cuối
-                def get_flight_info(fd):
-                    flight = fd.flight
-                    first_leg = flight.legs.order_by("departure_time").first()
-                    last_leg = flight.legs.order_by("arrival_time").last()
-                    return first_leg, last_leg
-
-                # Hàm render 1 chiều
-                def render_one_way(fd):
-                    first_leg, last_leg = get_flight_info(fd)
-
-                    # Nếu không có legs → thông báo lỗi an toàn
-                    if first_leg is None or last_leg is None:
-                        return "<div>Chuyến bay chưa cập nhật lộ trình</div>"
-
-                    return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                        <div class="flex-shrink-0">
-                            <img src="{baseUrl}{fd.flight.airline.logo}" alt="{fd.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                        </div>
-
-                        <div class="flex-grow">
-                            <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                <div>Mã:
-                                    <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                </div>
-                                <span>Chuyến bay </span>
-                                <span class="font-bold text-yellow-600">một chiều</span>:
-                                <span class="font-bold">{first_leg.departure_airport.name}</span> →
-                                <span class="font-bold">{last_leg.arrival_airport.name}</span>
-                            </h3>
-
-                            <div class="flex gap-[20px]">
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                                <div>
-                                    <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                    <p class="font-semibold text-[12px] text-gray-900">{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                </div>
-                            </div>
-                        </div>
-                        </div>
-                        """
-
-                # Hàm render khứ hồi
-                def render_round_trip(go, ret):
-                    go_first, go_last = get_flight_info(go)
-                    ret_first, ret_last = get_flight_info(ret)
-
-                    if None in (go_first, go_last, ret_first, ret_last):
-                        return "<div>Chuyến bay chưa cập nhật đủ lộ trình</div>"
-
-                    return f"""
-                        <div class="border-t-[1px] border-[#f0f0f0] px-[10px] py-[10px] flex gap-[10px]">
-                            <div class="flex-shrink-0">
-                                <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[50px] h-[50px] object-cover rounded-lg">
-                            </div>
-
-                            <div class="flex-grow">
-                                <h3 class="text-gray-900 mb-[6px] leading-[18px]">
-                                    <div>Mã:
-                                        <span class="text-blue-500 font-semibold"> {booking.booking_code}</span>
-                                    </div>
-                                    <span>Chuyến bay </span>
-                                    <span class="font-bold text-green-600">khứ hồi</span>:
-                                    <span class="font-bold">{go_first.departure_airport.name}</span> →
-                                    <span class="font-bold">{go_last.arrival_airport.name}</span>
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <div>
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-blue-600">Chiều đi:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{go.flight.airline.logo}" alt="{go.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{go.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-
-                                <!-- CHIỀU VỀ -->
-                                <div class="mt-[14px]">
-                                    <div class="flex items-center gap-[10px]">
-                                        <p class="font-semibold text-[14px] text-red-600">Chiều về:</p>
-                                        <div class="flex items-center gap-[2px]">
-                                        <img src="{baseUrl}{ret.flight.airline.logo}" alt="{ret.flight.airline.name}" class="w-[24px]">
-                                        <p class="text-[12px] text-gray-500">{ret.flight.airline.name}</p>
-                                        </div>
-                                    </div>
-
-                                    <div class="flex gap-[20px]">
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời điểm cất cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                        <div>
-                                        <p class="text-gray-600 text-[12px]">Thời gian hạ cánh</p>
-                                        <p class="font-semibold text-[12px] text-gray-900">{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</p>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        """
-
-                def render_one_way_email(fd, booking, baseUrl, fe_url):
-                    first_leg, last_leg = get_flight_info(fd)
-
-                    if first_leg is None or last_leg is None:
-                        return "<p>Chuyến bay của bạn chưa được cập nhật lộ trình.</p>"
-
-                    return f"""
-                        <div style="font-family: Arial, sans-serif; color:#333; line-height:1.4; padding:20px;">
-                            <h2 style="color:#1a73e8;">Thanh toán thành công</h2>
-
-                            <p>Xin chào <strong>{booking.guest_info.full_name if booking.guest_info else booking.user.full_name}</strong>,</p>
-
-                            <p>Bạn đã thanh toán thành công cho <strong>chuyến bay một chiều</strong> của mình.</p>
-
-                            <div style="margin-top:20px; padding:15px; border:1px solid #e0e0e0; border-radius:8px;">
-                                <div style="display:flex; align-items:center; gap:12px;">
-                                    <img src="{baseUrl}{fd.flight.airline.logo}"
-                                        alt="{fd.flight.airline.name}"
-                                        style="width:60px; height:60px; border-radius:8px; object-fit:cover;">
-                                    
-                                    <div>
-                                        <p style="margin:0; font-size:14px; color:#555;">Mã đặt chỗ</p>
-                                        <p style="margin:0; font-weight:bold; color:#1a73e8;">{booking.booking_code}</p>
-                                    </div>
-                                </div>
-
-                                <h3 style="margin-top:15px; font-size:16px;">
-                                    {first_leg.departure_airport.name} → {last_leg.arrival_airport.name}
-                                </h3>
-
-                                <table style="margin-top:10px; width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{first_leg.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{last_leg.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-                            </div>
-
-                            <p style="margin-top:20px;">Bạn có thể xem chi tiết tại trang hồ sơ của mình.</p>
-
-                            <a href="{fe_url}/profile/flight"
-                                style="display:inline-block; margin-top:10px; padding:10px 18px; background:#1a73e8; color:white; border-radius:6px; text-decoration:none;">
-                                Xem chi tiết chuyến bay
-                            </a>
-                        </div>
-                        """
-
-                def render_round_trip_email(go, ret, booking, baseUrl, fe_url):
-                    go_first, go_last = get_flight_info(go)
-                    ret_first, ret_last = get_flight_info(ret)
-
-                    if None in (go_first, go_last, ret_first, ret_last):
-                        return (
-                            "<p>Chuyến bay của bạn chưa được cập nhật đủ lộ trình.</p>"
-                        )
-
-                    return f"""
-                        <div style="font-family: Arial, sans-serif; color:#333; line-height:1.4; padding:20px;">
-                            <h2 style="color:#1a73e8;">Thanh toán thành công</h2>
-
-                            <p>Xin chào <strong>{booking.guest_info.full_name if booking.guest_info else booking.user.full_name}</strong>,</p>
-
-                            <p>Bạn đã thanh toán thành công cho <strong>chuyến bay khứ hồi</strong> của mình.</p>
-
-                            <div style="margin-top:20px; padding:15px; border:1px solid #e0e0e0; border-radius:8px;">
-
-                                <!-- HEADER -->
-                                <div style="display:flex; align-items:center; gap:12px;">
-                                    <img src="{baseUrl}{go.flight.airline.logo}"
-                                        alt="{go.flight.airline.name}"
-                                        style="width:60px; height:60px; border-radius:8px; object-fit:cover;">
-                                    
-                                    <div>
-                                        <p style="margin:0; font-size:14px; color:#555;">Mã đặt chỗ</p>
-                                        <p style="margin:0; font-weight:bold; color:#1a73e8;">{booking.booking_code}</p>
-                                    </div>
-                                </div>
-
-                                <h3 style="margin-top:15px; font-size:16px;">
-                                    {go_first.departure_airport.name} ↔ {go_last.arrival_airport.name}
-                                </h3>
-
-                                <!-- CHIỀU ĐI -->
-                                <h4 style="margin-top:12px; color:#1a73e8;">Chiều đi</h4>
-                                <table style="width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{go_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{go_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-
-                                <!-- CHIỀU VỀ -->
-                                <h4 style="margin-top:20px; color:#d93025;">Chiều về</h4>
-                                <table style="width:100%; font-size:14px;">
-                                    <tr>
-                                        <td><strong>Cất cánh:</strong></td>
-                                        <td>{ret_first.departure_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                    <tr>
-                                        <td><strong>Hạ cánh:</strong></td>
-                                        <td>{ret_last.arrival_time.strftime("%Y-%m-%d %H:%M:%S")}</td>
-                                    </tr>
-                                </table>
-
-                            </div>
-
-                            <p style="margin-top:20px;">Bạn có thể xem chi tiết tại trang hồ sơ của mình.</p>
-
-                            <a href="{fe_url}/profile/flight"
-                                style="display:inline-block; margin-top:10px; padding:10px 18px; background:#1a73e8; color:white; border-radius:6px; text-decoration:none;">
-                                Xem chi tiết chuyến bay
-                            </a>
-                        </div>
-                        """
-
-                # Tạo message
-                if len(flight_details) == 1:
-                    message = render_one_way(flight_details[0])
-                else:
-                    message = render_round_trip(flight_details[0], flight_details[1])
-
-                # Tạo Notification và gửi email cho người dùng
-                Notification.objects.create(
-                    user=booking.user if booking.user else None,
-                    email=email_to,
-                    title="Thanh toán thành công",
-                    message=message,
-                    message_email=(
-                        render_one_way_email(
-                            flight_details[0], booking, baseUrl, front_url
-                        )
-                        if len(flight_details) == 1
-                        else render_round_trip_email(
-                            flight_details[0],
-                            flight_details[1],
-                            booking,
-                            baseUrl,
-                            front_url,
-                        )
-                    ),
-                    link="/profile/flight",
-                    send_mail_flag=True,
-                )
+            notify_payment(
+                booking,
+                EVENT_SUCCESS,
+                self.get_base_url(request),
+                email_to,
+                notify_staff=False,
+            )
 
         return Response({"success": True, "detail": message}, status=status.HTTP_200_OK)
 
@@ -2487,352 +290,32 @@ from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from .models import Payment
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
-import math
-from django.core.paginator import Paginator
+from agoda_be.pagination import WindowCountPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from bookings.models import Booking
-from bookings.constants.booking_status import BookingStatus
-from rest_framework import status
 from .serializers import PaymentCreateSerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.db.models import OuterRef, Subquery
 from flights.models import FlightLeg
+from .webhooks import ingest_event
+from .models import PaymentRevenueRollup
+from .rollups import DIMENSIONS as ROLLUP_DIMENSIONS
+from django.utils.dateparse import parse_date
+from agoda_be.exports import export_response
+from .filters import PAYMENT_FILTERS
 
 
-# Phân trang
-class PaymentPagination(PageNumberPagination):
-    page_size = 10  # Default value
-    currentPage = 1
-    filters = {}
-
-    def get_page_size(self, request):
-        # Lấy giá trị pageSize từ query string, nếu có
-        page_size = request.query_params.get("pageSize")
-        currentPage = request.query_params.get("current")
-        booking__service_type = request.query_params.get("booking__service_type")
-        booking__service_ref_id = request.query_params.get("booking__service_ref_id")
-        booking__booking_code = request.query_params.get("booking__booking_code")
-        transaction_id = request.query_params.get("transaction_id")
-        booking__user_id = request.query_params.get("booking__user_id")
-        method = request.query_params.get("method")
-        min_total_price = request.query_params.get("min_total_price")
-        max_total_price = request.query_params.get("max_total_price")
-        min_discount_amount = request.query_params.get("min_discount_amount")
-        max_discount_amount = request.query_params.get("max_discount_amount")
-        min_final_price = request.query_params.get("min_final_price")
-        max_final_price = request.query_params.get("max_final_price")
-        owner_hotel_id = request.query_params.get("owner_hotel_id")
-        event_organizer_activity_id = request.query_params.get(
-            "event_organizer_activity_id"
-        )
-        driver_id = request.query_params.get("driver_id")
-        status = request.query_params.get("status")
-        hotel_id = request.query_params.get("hotel_id")
-        room_id = request.query_params.get("room_id")
-        car_id = request.query_params.get("car_id")
-        car_booking_status = request.query_params.get("car_booking_status")
-        activity_id = request.query_params.get("activity_id")
-        activity_package_id = request.query_params.get("activity_package_id")
-        activity_date_id = request.query_params.get("activity_date_id")
-        min_time_checkin_room = request.query_params.get("min_time_checkin_room")
-        max_time_checkin_room = request.query_params.get("max_time_checkin_room")
-        min_time_checkout_room = request.query_params.get("min_time_checkout_room")
-        max_time_checkout_room = request.query_params.get("max_time_checkout_room")
-        min_created_at = request.query_params.get("min_created_at")
-        max_created_at = request.query_params.get("max_created_at")
-        min_date_launch_activity = request.query_params.get("min_date_launch_activity")
-        max_date_launch_activity = request.query_params.get("max_date_launch_activity")
-        date_launch_activity = request.query_params.get("date_launch_activity")
-        min_pickup_datetime_car = request.query_params.get("min_pickup_datetime_car")
-        max_pickup_datetime_car = request.query_params.get("max_pickup_datetime_car")
-        min_dropoff_datetime_car = request.query_params.get("min_dropoff_datetime_car")
-        max_dropoff_datetime_car = request.query_params.get("max_dropoff_datetime_car")
-        flight_operations_staff_id = request.query_params.get(
-            "flight_operations_staff_id"
-        )
-        airline_id = request.query_params.get("airline_id")
-        aircraft_id = request.query_params.get("aircraft_id")
-        flight_id = request.query_params.get("flight_id")
-
-        if booking__service_type:
-            self.filters["booking__service_type"] = booking__service_type
-
-        if booking__service_ref_id:
-            self.filters["booking__service_ref_id"] = booking__service_ref_id
-
-        if booking__booking_code:
-            self.filters["booking__booking_code"] = booking__booking_code
-
-        if transaction_id:
-            self.filters["transaction_id"] = transaction_id
-
-        if booking__user_id:
-            self.filters["booking__user_id"] = booking__user_id
-
-        if method:
-            self.filters["method"] = method
-
-        if min_total_price:
-            self.filters["booking__total_price__gte"] = min_total_price
-        if max_total_price:
-            self.filters["booking__total_price__lte"] = max_total_price
-        if min_discount_amount:
-            self.filters["booking__discount_amount__gte"] = min_discount_amount
-        if max_discount_amount:
-            self.filters["booking__discount_amount__lte"] = max_discount_amount
-        if min_final_price:
-            self.filters["booking__final_price__gte"] = min_final_price
-        if max_final_price:
-            self.filters["booking__final_price__lte"] = max_final_price
-
-        # ✅ Lưu filter theo owner_hotel_id (RoomBookingDetail)
-        if owner_hotel_id:
-            # chỉ áp dụng cho booking có service_type là HOTEL
-            self.filters["booking__service_type"] = ServiceType.HOTEL
-            self.filters["booking__hotel_detail__owner_hotel_id"] = owner_hotel_id
-
-        if event_organizer_activity_id:
-            # chỉ áp dụng cho booking có service_type là ACTIVITY
-            self.filters["booking__service_type"] = ServiceType.ACTIVITY
-            self.filters[
-                "booking__activity_date_detail__event_organizer_activity_id"
-            ] = event_organizer_activity_id
-
-        if driver_id:
-            # chỉ áp dụng cho booking có service_type là CAR
-            self.filters["booking__service_type"] = ServiceType.CAR
-            self.filters["booking__car_detail__driver_id"] = driver_id
-
-        if status:
-            self.filters["status"] = status
-
-        if hotel_id:
-            self.filters["booking__hotel_detail__room__hotel_id"] = hotel_id
-
-        if room_id:
-            self.filters["booking__hotel_detail__room_id"] = room_id
-
-        if car_id:
-            self.filters["booking__car_detail__car_id"] = car_id
-
-        if car_booking_status:
-            self.filters["booking__car_detail__status"] = car_booking_status
-
-        if activity_id:
-            self.filters[
-                "booking__activity_date_detail__activity_date__activity_package__activity_id"
-            ] = activity_id
-
-        if activity_package_id:
-            self.filters[
-                "booking__activity_date_detail__activity_date__activity_package_id"
-            ] = activity_package_id
-
-        if activity_date_id:
-            self.filters["booking__activity_date_detail__activity_date_id"] = (
-                activity_date_id
-            )
-
-        if min_time_checkin_room:
-            self.filters["booking__hotel_detail__check_in__gte"] = min_time_checkin_room
-        if max_time_checkin_room:
-            self.filters["booking__hotel_detail__check_in__lte"] = max_time_checkin_room
-
-        if min_time_checkout_room:
-            self.filters["booking__hotel_detail__check_out__gte"] = (
-                min_time_checkout_room
-            )
-        if max_time_checkout_room:
-            self.filters["booking__hotel_detail__check_out__lte"] = (
-                max_time_checkout_room
-            )
-
-        if min_created_at:
-            self.filters["created_at__gte"] = min_created_at
-        if max_created_at:
-            self.filters["created_at__lte"] = max_created_at
-
-        if min_date_launch_activity:
-            self.filters["booking__activity_date_detail__date_launch__gte"] = (
-                min_date_launch_activity
-            )
-        if max_date_launch_activity:
-            self.filters["booking__activity_date_detail__date_launch__lte"] = (
-                max_date_launch_activity
-            )
-
-        if date_launch_activity:
-            self.filters["booking__activity_date_detail__date_launch__date"] = (
-                date_launch_activity
-            )
-
-        if min_pickup_datetime_car:
-            self.filters["booking__car_detail__pickup_datetime__gte"] = (
-                min_pickup_datetime_car
-            )
-
-        if max_pickup_datetime_car:
-            self.filters["booking__car_detail__pickup_datetime__lte"] = (
-                max_pickup_datetime_car
-            )
-
-        if min_dropoff_datetime_car:
-            self.filters["booking__car_detail__dropoff_datetime__gte"] = (
-                min_dropoff_datetime_car
-            )
-
-        if max_dropoff_datetime_car:
-            self.filters["booking__car_detail__dropoff_datetime__lte"] = (
-                max_dropoff_datetime_car
-            )
-
-        if flight_operations_staff_id:
-            # chỉ áp dụng cho booking có service_type là FLIGHT
-            self.filters["booking__service_type"] = ServiceType.FLIGHT
-            self.filters[
-                "booking__flight_details__flight__airline__flight_operations_staff_id"
-            ] = flight_operations_staff_id
-
-        if airline_id:
-            # chỉ áp dụng cho booking có service_type là FLIGHT
-            self.filters["booking__service_type"] = ServiceType.FLIGHT
-            self.filters["booking__flight_details__flight__airline_id"] = airline_id
-
-        if aircraft_id:
-            # chỉ áp dụng cho booking có service_type là FLIGHT
-            self.filters["booking__service_type"] = ServiceType.FLIGHT
-            self.filters["booking__flight_details__flight__aircraft_id"] = aircraft_id
-
-        if flight_id:
-            # chỉ áp dụng cho booking có service_type là FLIGHT
-            self.filters["booking__service_type"] = ServiceType.FLIGHT
-            self.filters["booking__flight_details__flight_id"] = flight_id
-
-        for field, value in request.query_params.items():
-            if field not in [
-                "current",
-                "pageSize",
-                "booking__service_type",
-                "booking__service_ref_id",
-                "booking__booking_code",
-                "transaction_id",
-                "booking__user_id",
-                "method",
-                "min_total_price",
-                "max_total_price",
-                "min_discount_amount",
-                "max_discount_amount",
-                "min_final_price",
-                "max_final_price",
-                "owner_hotel_id",
-                "event_organizer_activity_id",
-                "driver_id",
-                "status",
-                "sort",
-                "hotel_id",
-                "room_id",
-                "car_id",
-                "car_booking_status",
-                "activity_id",
-                "activity_package_id",
-                "activity_date_id",
-                "min_time_checkin_room",
-                "max_time_checkin_room",
-                "min_time_checkout_room",
-                "max_time_checkout_room",
-                "min_created_at",
-                "max_created_at",
-                "min_date_launch_activity",
-                "max_date_launch_activity",
-                "date_launch_activity",
-                "min_pickup_datetime_car",
-                "max_pickup_datetime_car",
-                "min_dropoff_datetime_car",
-                "max_dropoff_datetime_car",
-                "flight_operations_staff_id",
-                "airline_id",
-                "aircraft_id",
-                "flight_id",
-                "min_flight_leg_departure",
-                "max_flight_leg_departure",
-                "min_flight_leg_arrival",
-                "max_flight_leg_arrival",
-            ]:
-                # có thể dùng __icontains nếu muốn LIKE, hoặc để nguyên nếu so sánh bằng
-                self.filters[f"{field}__icontains"] = value
-
-        # Nếu không có hoặc giá trị không hợp lệ, dùng giá trị mặc định
-        try:
-            self.page_size = int(page_size) if page_size is not None else self.page_size
-        except (ValueError, TypeError):
-            self.page_size = self.page_size
-
-        try:
-            self.currentPage = (
-                int(currentPage) if currentPage is not None else self.currentPage
-            )
-        except (ValueError, TypeError):
-            self.currentPage = self.currentPage
-
-        return self.page_size
-
-    def get_paginated_response(self, data):
-        qs = Payment.objects.filter(**self.filters).distinct()
-
-        # --- Lọc ALL legs departure ---
-        min_flight_leg_departure = self.request.query_params.get(
-            "min_flight_leg_departure"
-        )
-        max_flight_leg_departure = self.request.query_params.get(
-            "max_flight_leg_departure"
-        )
-
-        if min_flight_leg_departure:
-            # Loại bỏ payment có leg nào < min
-            qs = qs.exclude(
-                booking__flight_details__flight__legs__departure_time__lt=min_flight_leg_departure
-            )
-
-        if max_flight_leg_departure:
-            # Loại bỏ payment có leg nào > max
-            qs = qs.exclude(
-                booking__flight_details__flight__legs__departure_time__gt=max_flight_leg_departure
-            )
-
-        # --- Lọc ALL legs arrival ---
-        min_flight_leg_arrival = self.request.query_params.get("min_flight_leg_arrival")
-        max_flight_leg_arrival = self.request.query_params.get("max_flight_leg_arrival")
-
-        if min_flight_leg_arrival:
-            qs = qs.exclude(
-                booking__flight_details__flight__legs__arrival_time__lt=min_flight_leg_arrival
-            )
-
-        if max_flight_leg_arrival:
-            qs = qs.exclude(
-                booking__flight_details__flight__legs__arrival_time__gt=max_flight_leg_arrival
-            )
-
-        total_count = qs.count()
-        total_pages = math.ceil(total_count / self.page_size)
+def parse_rollup_date(value):
+    """min_date / max_date có thể là ngày hoặc datetime, rollup chỉ cần phần ngày."""
+    if not value:
+        return None
+    try:
+        return parse_date(value[:10])
+    except ValueError:
+        return None
 
-        self.filters.clear()
 
-        return Response(
-            {
-                "isSuccess": True,
-                "message": "Fetched payments successfully!",
-                "meta": {
-                    "totalItems": total_count,
-                    "currentPage": self.currentPage,
-                    "itemsPerPage": self.page_size,
-                    "totalPages": total_pages,
-                },
-                "data": data,
-            }
-        )
+# Phân trang
+class PaymentPagination(WindowCountPagination):
+    message = "Fetched payments successfully!"
 
 
 # API GET danh sách hóa đơn (với phân trang)
@@ -2845,382 +328,50 @@ class PaymentListView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
 
     def get_queryset(self):
+        # Toàn bộ query params được compile 1 lần (payments/filters.py)
         queryset = Payment.objects.all().order_by("-created_at")
+        return PAYMENT_FILTERS.compile(queryset, self.request.query_params).queryset
+
+
+# Cột xuất file: tên cột -> lookup, đọc thẳng bằng values_list thay vì PaymentSerializer
+PAYMENT_EXPORT_COLUMNS = {
+    "id": "id",
+    "booking_code": "booking__booking_code",
+    "service_type": "booking__service_type",
+    "method": "method",
+    "status": "status",
+    "amount": "amount",
+    "transaction_id": "transaction_id",
+    "payment_intent": "payment_intent",
+    "created_at": "created_at",
+    "user_id": "booking__user_id",
+    "user_email": "booking__user__email",
+    "guest_name": "booking__guest_info__full_name",
+    "guest_email": "booking__guest_info__email",
+    "guest_phone": "booking__guest_info__phone",
+    "booking_status": "booking__status",
+    "booking_payment_status": "booking__payment_status",
+    "total_price": "booking__total_price",
+    "discount_amount": "booking__discount_amount",
+    "final_price": "booking__final_price",
+    "refund_amount": "booking__refund_amount",
+}
+
+
+# API GET xuất toàn bộ hóa đơn (CSV / NDJSON, stream), cùng bộ lọc với PaymentListView
+class PaymentExportView(PaymentListView):
+    pagination_class = None
 
-        # Lọc dữ liệu theo query params
-        filter_params = self.request.query_params
-        query_filter = Q()
-
-        # lọc theo service_type (service_type là FK trong model Hotel)
-        booking__service_type = filter_params.get("booking__service_type")
-        if booking__service_type:
-            query_filter &= Q(booking__service_type=booking__service_type)
-
-        booking__service_ref_id = filter_params.get("booking__service_ref_id")
-        if booking__service_ref_id:
-            query_filter &= Q(booking__service_ref_id=booking__service_ref_id)
-
-        booking__booking_code = filter_params.get("booking__booking_code")
-        if booking__booking_code:
-            query_filter &= Q(booking__booking_code=booking__booking_code)
-
-        transaction_id = filter_params.get("transaction_id")
-        if transaction_id:
-            query_filter &= Q(transaction_id=transaction_id)
-
-        booking__user_id = filter_params.get("booking__user_id")
-        if booking__user_id:
-            query_filter &= Q(booking__user_id=booking__user_id)
-
-        method = filter_params.get("method")
-        if method:
-            query_filter &= Q(method=method)
-
-        min_total_price = filter_params.get("min_total_price")
-        if min_total_price:
-            query_filter &= Q(booking__total_price__gte=min_total_price)
-        max_total_price = filter_params.get("max_total_price")
-        if max_total_price:
-            query_filter &= Q(booking__total_price__lte=max_total_price)
-
-        min_discount_amount = filter_params.get("min_discount_amount")
-        if min_discount_amount:
-            query_filter &= Q(booking__discount_amount__gte=min_discount_amount)
-        max_discount_amount = filter_params.get("max_discount_amount")
-        if max_discount_amount:
-            query_filter &= Q(booking__discount_amount__lte=max_discount_amount)
-
-        min_final_price = filter_params.get("min_final_price")
-        if min_final_price:
-            query_filter &= Q(booking__final_price__gte=min_final_price)
-        max_final_price = filter_params.get("max_final_price")
-        if max_final_price:
-            query_filter &= Q(booking__final_price__lte=max_final_price)
-
-        # --- Lọc theo owner_hotel (truy ngược qua RoomBookingDetail) ---
-        owner_hotel_id = filter_params.get("owner_hotel_id")
-        if owner_hotel_id:
-            query_filter &= Q(
-                booking__hotel_detail__owner_hotel_id=owner_hotel_id,
-                booking__service_type=ServiceType.HOTEL,  # chỉ lọc khi service_type là HOTEL
-            )
-
-        event_organizer_activity_id = filter_params.get("event_organizer_activity_id")
-        if event_organizer_activity_id:
-            query_filter &= Q(
-                booking__activity_date_detail__event_organizer_activity_id=event_organizer_activity_id,
-                booking__service_type=ServiceType.ACTIVITY,  # chỉ lọc khi service_type là ACTIVITY
-            )
-
-        driver_id = filter_params.get("driver_id")
-        if driver_id:
-            query_filter &= Q(
-                booking__car_detail__driver_id=driver_id,
-                booking__service_type=ServiceType.CAR,  # chỉ lọc khi service_type là CAR
-            )
-
-        flight_operations_staff_id = filter_params.get("flight_operations_staff_id")
-        if flight_operations_staff_id:
-            query_filter &= Q(
-                booking__flight_details__flight__airline__flight_operations_staff_id=flight_operations_staff_id,
-                booking__service_type=ServiceType.FLIGHT,  # chỉ lọc khi service_type là FLIGHT
-            )
-
-        airline_id = filter_params.get("airline_id")
-        if airline_id:
-            query_filter &= Q(
-                booking__flight_details__flight__airline_id=airline_id,
-                booking__service_type=ServiceType.FLIGHT,  # chỉ lọc khi service_type là FLIGHT
-            )
-
-        aircraft_id = filter_params.get("aircraft_id")
-        if aircraft_id:
-            query_filter &= Q(
-                booking__flight_details__flight__aircraft_id=aircraft_id,
-                booking__service_type=ServiceType.FLIGHT,  # chỉ lọc khi service_type là FLIGHT
-            )
-
-        flight_id = filter_params.get("flight_id")
-        if flight_id:
-            query_filter &= Q(
-                booking__flight_details__flight_id=flight_id,
-                booking__service_type=ServiceType.FLIGHT,  # chỉ lọc khi service_type là FLIGHT
-            )
-
-        status = filter_params.get("status")
-        if status:
-            query_filter &= Q(
-                status=status,
-            )
-
-        hotel_id = filter_params.get("hotel_id")
-        if hotel_id:
-            queryset = queryset.filter(
-                booking__hotel_detail__room__hotel_id=hotel_id,
-                booking__service_type=ServiceType.HOTEL,
-            )
-
-        room_id = filter_params.get("room_id")
-        if room_id:
-            queryset = queryset.filter(
-                booking__hotel_detail__room_id=room_id,
-                booking__service_type=ServiceType.HOTEL,
-            )
-
-        car_id = filter_params.get("car_id")
-        if car_id:
-            queryset = queryset.filter(
-                booking__car_detail__car_id=car_id,
-                booking__service_type=ServiceType.CAR,
-            )
-
-        car_booking_status = filter_params.get("car_booking_status")
-        if car_booking_status:
-            queryset = queryset.filter(
-                booking__car_detail__status=car_booking_status,
-                booking__service_type=ServiceType.CAR,
-            )
-
-        activity_id = filter_params.get("activity_id")
-        if activity_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date__activity_package__activity_id=activity_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        activity_package_id = filter_params.get("activity_package_id")
-        if activity_package_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date__activity_package_id=activity_package_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        activity_date_id = filter_params.get("activity_date_id")
-        if activity_date_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date_id=activity_date_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        min_time_checkin_room = filter_params.get("min_time_checkin_room")
-        max_time_checkin_room = filter_params.get("max_time_checkin_room")
-
-        # 🔹 Lọc theo khoảng thời gian checkout phòng (từ - đến)
-        if min_time_checkin_room and max_time_checkin_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_in__range=[
-                    min_time_checkin_room,
-                    max_time_checkin_room,
-                ]
-            )
-        elif min_time_checkin_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_in__gte=min_time_checkin_room
-            )
-        elif max_time_checkin_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_in__lte=max_time_checkin_room
-            )
-
-        min_time_checkout_room = filter_params.get("min_time_checkout_room")
-        max_time_checkout_room = filter_params.get("max_time_checkout_room")
-
-        # 🔹 Lọc theo khoảng thời gian checkout phòng (từ - đến)
-        if min_time_checkout_room and max_time_checkout_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_out__range=[
-                    min_time_checkout_room,
-                    max_time_checkout_room,
-                ]
-            )
-        elif min_time_checkout_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_out__gte=min_time_checkout_room
-            )
-        elif max_time_checkout_room:
-            queryset = queryset.filter(
-                booking__hotel_detail__check_out__lte=max_time_checkout_room
-            )
-
-        min_created_at = filter_params.get("min_created_at")
-        max_created_at = filter_params.get("max_created_at")
-
-        # 🔹 Lọc theo khoảng thời gian checkout phòng (từ - đến)
-        if min_created_at and max_created_at:
-            queryset = queryset.filter(
-                created_at__range=[
-                    min_created_at,
-                    max_created_at,
-                ]
-            )
-        elif min_created_at:
-            queryset = queryset.filter(created_at__gte=min_created_at)
-        elif max_created_at:
-            queryset = queryset.filter(created_at__lte=max_created_at)
-
-        min_date_launch_activity = filter_params.get("min_date_launch_activity")
-        max_date_launch_activity = filter_params.get("max_date_launch_activity")
-
-        # 🔹 Lọc theo khoảng thời gian hoạt động activity (từ - đến)
-        if min_date_launch_activity and max_date_launch_activity:
-            queryset = queryset.filter(
-                booking__activity_date_detail__date_launch__range=[
-                    min_date_launch_activity,
-                    max_date_launch_activity,
-                ]
-            )
-        elif min_date_launch_activity:
-            queryset = queryset.filter(
-                booking__activity_date_detail__date_launch__gte=min_date_launch_activity
-            )
-        elif max_date_launch_activity:
-            queryset = queryset.filter(
-                booking__activity_date_detail__date_launch__lte=max_date_launch_activity
-            )
-
-        date_launch_activity = filter_params.get("date_launch_activity")
-        if date_launch_activity:
-            queryset = queryset.filter(
-                booking__activity_date_detail__date_launch__date=date_launch_activity
-            )
-
-        min_pickup_datetime_car = filter_params.get("min_pickup_datetime_car")
-        if min_pickup_datetime_car:
-            queryset = queryset.filter(
-                booking__car_detail__pickup_datetime__gte=min_pickup_datetime_car,
-            )
-        max_pickup_datetime_car = filter_params.get("max_pickup_datetime_car")
-        if max_pickup_datetime_car:
-            queryset = queryset.filter(
-                booking__car_detail__pickup_datetime__lte=max_pickup_datetime_car,
-            )
-
-        min_dropoff_datetime_car = filter_params.get("min_dropoff_datetime_car")
-        if min_dropoff_datetime_car:
-            queryset = queryset.filter(
-                booking__car_detail__dropoff_datetime__gte=min_dropoff_datetime_car,
-            )
-        max_dropoff_datetime_car = filter_params.get("max_dropoff_datetime_car")
-        if max_dropoff_datetime_car:
-            queryset = queryset.filter(
-                booking__car_detail__dropoff_datetime__lte=max_dropoff_datetime_car,
+    def list(self, request, *args, **kwargs):
+        response = export_response(
+            request, self.get_queryset(), PAYMENT_EXPORT_COLUMNS, "payments"
+        )
+        if response is None:
+            return Response(
+                {"isSuccess": False, "message": "Unsupported export format"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        min_flight_leg_departure = filter_params.get("min_flight_leg_departure")
-        max_flight_leg_departure = filter_params.get("max_flight_leg_departure")
-
-        # annotate để lấy min / max departure_time của mỗi flight
-        if min_flight_leg_departure or max_flight_leg_departure:
-            if min_flight_leg_departure:
-                queryset = queryset.exclude(
-                    booking__flight_details__flight__legs__departure_time__lt=min_flight_leg_departure
-                )
-
-            if max_flight_leg_departure:
-                queryset = queryset.exclude(
-                    booking__flight_details__flight__legs__departure_time__gt=max_flight_leg_departure
-                )
-
-        min_flight_leg_arrival = filter_params.get("min_flight_leg_arrival")
-        max_flight_leg_arrival = filter_params.get("max_flight_leg_arrival")
-
-        if min_flight_leg_arrival or max_flight_leg_arrival:
-            if min_flight_leg_arrival:
-                queryset = queryset.exclude(
-                    booking__flight_details__flight__legs__arrival_time__lt=min_flight_leg_arrival
-                )
-
-            if max_flight_leg_arrival:
-                queryset = queryset.exclude(
-                    booking__flight_details__flight__legs__arrival_time__gt=max_flight_leg_arrival
-                )
-
-        for field, value in filter_params.items():
-            if field not in [
-                "pageSize",
-                "current",
-                "booking__service_type",
-                "booking__service_ref_id",
-                "booking__booking_code",
-                "transaction_id",
-                "min_created_at",
-                "max_created_at",
-                "booking__user_id",
-                "method",
-                "min_total_price",
-                "max_total_price",
-                "min_discount_amount",
-                "max_discount_amount",
-                "min_final_price",
-                "max_final_price",
-                "owner_hotel_id",
-                "event_organizer_activity_id",
-                "driver_id",
-                "status",
-                "sort",
-                "hotel_id",
-                "room_id",
-                "car_id",
-                "car_booking_status",
-                "activity_id",
-                "activity_package_id",
-                "activity_date_id",
-                "min_time_checkin_room",
-                "max_time_checkin_room",
-                "min_time_checkout_room",
-                "max_time_checkout_room",
-                "min_date_launch_activity",
-                "max_date_launch_activity",
-                "min_pickup_datetime_car",
-                "max_pickup_datetime_car",
-                "min_dropoff_datetime_car",
-                "max_dropoff_datetime_car",
-                "flight_operations_staff_id",
-                "airline_id",
-                "aircraft_id",
-                "flight_id",
-                "date_launch_activity",
-                "min_flight_leg_departure",
-                "max_flight_leg_departure",
-                "min_flight_leg_arrival",
-                "max_flight_leg_arrival",
-            ]:  # Bỏ qua các trường phân trang
-                query_filter &= Q(**{f"{field}__icontains": value})
-
-        # Áp dụng lọc cho queryset
-        queryset = queryset.filter(query_filter)
-        sort_params = filter_params.get("sort")
-        order_fields = []
-
-        if sort_params:
-            # Ví dụ: sort=avg_price-desc,avg_star-asc
-            sort_list = sort_params.split(",")
-            for sort_item in sort_list:
-                try:
-                    field, direction = sort_item.split("-")
-                    if direction == "desc":
-                        order_fields.append(f"-{field}")
-                    else:
-                        order_fields.append(field)
-                except ValueError:
-                    continue  # bỏ qua format không hợp lệ
-
-        if order_fields:
-            queryset = queryset.order_by(*order_fields)
-
-        # Lấy tham số 'current' từ query string để tính toán trang
-        current = self.request.query_params.get(
-            "current", 1
-        )  # Trang hiện tại, mặc định là trang 1
-        page_size = self.request.query_params.get(
-            "pageSize", 10
-        )  # Số phần tử mỗi trang, mặc định là 10
-
-        # Áp dụng phân trang
-        paginator = Paginator(queryset.distinct(), page_size)
-        page = paginator.get_page(current)
-
-        return page
+        return response
 
 
 class PaymentListOverviewView(generics.ListAPIView):
@@ -3229,119 +380,30 @@ class PaymentListOverviewView(generics.ListAPIView):
     permission_classes = [AllowAny]  # hoặc [] nếu bạn không cần xác thực
 
     def get_queryset(self):
-        queryset = Payment.objects.all()
+        # Đọc từ bảng rollup theo ngày (payments/rollups.py) thay vì join các bảng booking
+        queryset = PaymentRevenueRollup.objects.all()
         params = self.request.query_params
 
-        min_date = params.get("min_date")
-        max_date = params.get("max_date")
-        booking__service_type = params.get("booking__service_type")
-        booking__service_ref_id = params.get("booking__service_ref_id")
-        owner_hotel_id = params.get("owner_hotel_id")
-        event_organizer_activity_id = params.get("event_organizer_activity_id")
-        flight_operations_staff_id = params.get("flight_operations_staff_id")
-        driver_id = params.get("driver_id")
-        hotel_id = params.get("hotel_id")
-        room_id = params.get("room_id")
-        activity_id = params.get("activity_id")
-        activity_package_id = params.get("activity_package_id")
-        activity_date_id = params.get("activity_date_id")
-        car_id = params.get("car_id")
-        airline_id = params.get("airline_id")
-        aircraft_id = params.get("aircraft_id")
-        flight_id = params.get("flight_id")
-
-        if min_date and max_date:
-            queryset = queryset.filter(created_at__range=[min_date, max_date])
-        elif min_date:
-            queryset = queryset.filter(created_at__gte=min_date)
-        elif max_date:
-            queryset = queryset.filter(created_at__lte=max_date)
-
-        if booking__service_type:
-            queryset = queryset.filter(booking__service_type=booking__service_type)
-
-        if booking__service_ref_id:
-            queryset = queryset.filter(booking__service_ref_id=booking__service_ref_id)
-
-        if owner_hotel_id:
-            queryset = queryset.filter(
-                booking__hotel_detail__owner_hotel_id=owner_hotel_id,
-                booking__service_type=ServiceType.HOTEL,
-            )
-
-        if event_organizer_activity_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__event_organizer_activity_id=event_organizer_activity_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        if driver_id:
-            queryset = queryset.filter(
-                booking__car_detail__driver_id=driver_id,
-                booking__service_type=ServiceType.CAR,
-            )
-
-        if flight_operations_staff_id:
-            queryset = queryset.filter(
-                booking__flight_details__flight__airline__flight_operations_staff_id=flight_operations_staff_id,
-                booking__service_type=ServiceType.FLIGHT,
-            )
-
-        if hotel_id:
-            queryset = queryset.filter(
-                booking__hotel_detail__room__hotel_id=hotel_id,
-                booking__service_type=ServiceType.HOTEL,
-            )
-
-        if room_id:
-            queryset = queryset.filter(
-                booking__hotel_detail__room_id=room_id,
-                booking__service_type=ServiceType.HOTEL,
-            )
-
-        if activity_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date__activity_package__activity_id=activity_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        if activity_package_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date__activity_package_id=activity_package_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        if activity_date_id:
-            queryset = queryset.filter(
-                booking__activity_date_detail__activity_date_id=activity_date_id,
-                booking__service_type=ServiceType.ACTIVITY,
-            )
-
-        if car_id:
-            queryset = queryset.filter(
-                booking__car_detail__car_id=car_id,
-                booking__service_type=ServiceType.CAR,
-            )
-
-        if airline_id:
-            queryset = queryset.filter(
-                booking__flight_details__flight__airline_id=airline_id,
-                booking__service_type=ServiceType.FLIGHT,
-            )
-
-        if aircraft_id:
-            queryset = queryset.filter(
-                booking__flight_details__flight__aircraft_id=aircraft_id,
-                booking__service_type=ServiceType.FLIGHT,
-            )
-
-        if flight_id:
-            queryset = queryset.filter(
-                booking__flight_details__flight_id=flight_id,
-                booking__service_type=ServiceType.FLIGHT,
-            )
+        min_date = parse_rollup_date(params.get("min_date"))
+        max_date = parse_rollup_date(params.get("max_date"))
+        if min_date:
+            queryset = queryset.filter(date__gte=min_date)
+        if max_date:
+            queryset = queryset.filter(date__lte=max_date)
+
+        service_type = params.get("booking__service_type")
+        if service_type:
+            queryset = queryset.filter(service_type=service_type)
+
+        # owner_hotel_id, hotel_id, driver_id, flight_id... trùng tên cột rollup
+        for name, dimension_service_type in ROLLUP_DIMENSIONS.items():
+            value = params.get(name)
+            if value:
+                queryset = queryset.filter(
+                    **{name: value}, service_type=dimension_service_type
+                )
 
-        return queryset.distinct()
+        return queryset
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -3360,12 +422,12 @@ class PaymentListOverviewView(generics.ListAPIView):
 
         # 🔹 Gom nhóm dữ liệu theo thời gian
         grouped_data = (
-            queryset.annotate(period=trunc_func("created_at"))
+            queryset.annotate(period=trunc_func("date"))
             .values("period")
             .annotate(
-                total_revenue=Sum("amount"),
-                customer_count=Count("booking__user", distinct=True),
-                order_count=Count("id", distinct=True),
+                total_revenue=Sum("revenue"),
+                customer_count=Count("customer_id", distinct=True),
+                order_count=Sum("order_count"),
             )
             .order_by("period")
         )
@@ -3388,7 +450,7 @@ class PaymentListOverviewView(generics.ListAPIView):
                 label = str(date_obj.year)
 
             labels.append(label)
-            revenue = entry["total_revenue"] or 0
+            revenue = round(entry["total_revenue"] or 0, 2)
             revenues.append(revenue)
             total = revenue
             customers.append(entry["customer_count"])
@@ -3408,7 +470,9 @@ class PaymentListOverviewView(generics.ListAPIView):
             {
                 "isSuccess": True,
                 "message": (
-                    "Get payment overview successfully!" if queryset else "No data"
+                    "Get payment overview successfully!"
+                    if queryset.exists()
+                    else "No data"
                 ),
                 "data": {
                     "labels": labels,
@@ -3525,3 +589,37 @@ class PaymentDeleteView(generics.DestroyAPIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class StripeWebhookView(APIView):
+    """
+    Nhận event từ Stripe: verify chữ ký rồi lưu vào StripeEvent (idempotent theo
+    event id). Việc cập nhật Payment / Booking do worker ở payments/webhooks.py làm.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            stripe.Webhook.construct_event(
+                request.body,
+                request.META.get("HTTP_STRIPE_SIGNATURE", ""),
+                settings.STRIPE_WEBHOOK_SECRET,
+            )
+        except (ValueError, stripe.SignatureVerificationError) as e:
+            return Response(
+                {"isSuccess": False, "message": f"Invalid Stripe event: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Lưu payload gốc (JSON) thay vì StripeObject
+        stripe_event, created = ingest_event(json.loads(request.body))
+        return Response(
+            {
+                "isSuccess": True,
+                "message": "Event received" if created else "Duplicate event ignored",
+                "data": {"id": stripe_event.event_id},
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,332 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from bookings.constants.booking_status import BookingStatus
+from bookings.constants.service_type import ServiceType
+from flights.inventory import SeatsUnavailable, confirm_holds, release_holds
+from notifications.rendering import EVENT_FAILED, EVENT_SUCCESS
+from payments.constants.payment_status import PaymentStatus
+from payments.constants.stripe_event_status import StripeEventStatus
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+LEASE_SECONDS = 300
+
+# Đơn vị tiền không có phần thập phân trên Stripe (amount = số tiền thật)
+ZERO_DECIMAL_CURRENCIES = {"vnd", "jpy", "krw", "clp", "pyg", "ugx", "xaf", "xof"}
+
+_executor = None
+_wakeup_pending = False
+# Hẹn giờ đánh thức worker khi tới lượt retry / lease hết hạn (mode "thread")
+_timer = None
+_timer_at = None
+_lock = threading.Lock()
+
+
+def ingest_event(event):
+    """
+    Lưu event (dict đã verify chữ ký hoặc từ luồng giả lập) vào bảng StripeEvent.
+    Trả về (StripeEvent, created); event trùng id thì created = False.
+    """
+    from payments.models import StripeEvent
+
+    try:
+        with transaction.atomic():
+            stripe_event, created = StripeEvent.objects.get_or_create(
+                event_id=event["id"],
+                defaults={
+                    "type": event["type"],
+                    "payload": event,
+                    "next_attempt_at": timezone.now(),
+                },
+            )
+    except IntegrityError:
+        # 2 lần gửi cùng event đến đồng thời
+        return StripeEvent.objects.get(event_id=event["id"]), False
+
+    if created:
+        schedule_processing()
+    return stripe_event, created
+
+
+# =========================
+# WORKER
+# =========================
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stripe-events")
+    return _executor
+
+
+def schedule_processing():
+    """
+    Sau khi transaction commit thì đánh thức worker trong process; sau mỗi lượt
+    worker tự hẹn giờ cho lần retry kế tiếp.
+    Ở mode "command" việc xử lý do `manage.py process_stripe_events` đảm nhận.
+    """
+    if settings.STRIPE_WEBHOOK_MODE != "thread":
+        return
+    transaction.on_commit(_wake_up)
+
+
+def _wake_up():
+    global _wakeup_pending
+    with _lock:
+        if _wakeup_pending:
+            return
+        _wakeup_pending = True
+        _get_executor().submit(_process_in_thread)
+
+
+def _process_in_thread():
+    global _wakeup_pending
+    with _lock:
+        _wakeup_pending = False
+    close_old_connections()
+    try:
+        while process_pending():
+            pass
+    except Exception:
+        logger.exception("Stripe event processing failed")
+    finally:
+        try:
+            _schedule_next_run()
+        except Exception:
+            logger.exception("Failed to schedule next Stripe event run")
+        close_old_connections()
+
+
+def _schedule_next_run():
+    """
+    Hẹn lượt xử lý kế tiếp tại next_attempt_at sớm nhất còn PENDING: event chờ
+    retry hoặc lô có lease bị bỏ dở được xử lý lại mà không cần chờ webhook mới.
+    """
+    from payments.models import StripeEvent
+
+    global _timer, _timer_at
+    next_at = StripeEvent.objects.filter(
+        status=StripeEventStatus.PENDING, next_attempt_at__isnull=False
+    ).aggregate(next_at=Min("next_attempt_at"))["next_at"]
+    if next_at is None:
+        return
+    with _lock:
+        if _timer is not None and _timer_at <= next_at:
+            return  # Đã hẹn sớm hơn
+        if _timer is not None:
+            _timer.cancel()
+        # Ít nhất 1 giây: event đến hạn nhưng đang bị worker khác khóa thì chờ lượt sau
+        delay = max((next_at - timezone.now()).total_seconds(), 1.0)
+        _timer = threading.Timer(delay, _on_timer)
+        _timer.daemon = True
+        _timer_at = next_at
+        _timer.start()
+
+
+def _on_timer():
+    global _timer, _timer_at
+    with _lock:
+        _timer = None
+        _timer_at = None
+    _wake_up()
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    from payments.models import StripeEvent
+
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StripeEventStatus.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if ids:
+            StripeEvent.objects.filter(id__in=ids).update(
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    # Xử lý theo thứ tự Stripe tạo event
+    return sorted(
+        StripeEvent.objects.filter(id__in=ids),
+        key=lambda e: (e.payload.get("created") or 0, e.id),
+    )
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """Xử lý 1 lô event đang chờ. Trả về số event đã nhận."""
+    events = claim_batch(batch_size)
+    for stripe_event in events:
+        process_event(stripe_event)
+    return len(events)
+
+
+def process_event(stripe_event):
+    handler = HANDLERS.get(stripe_event.type)
+    stripe_event.attempts += 1
+    try:
+        if handler is None:
+            stripe_event.status = StripeEventStatus.IGNORED
+        else:
+            with transaction.atomic():
+                handler(stripe_event.payload["data"]["object"])
+            stripe_event.status = StripeEventStatus.PROCESSED
+        stripe_event.processed_at = timezone.now()
+        stripe_event.next_attempt_at = None
+        stripe_event.last_error = None
+    except Exception as e:
+        logger.exception(f"Failed to process Stripe event {stripe_event.event_id}")
+        stripe_event.last_error = str(e)[:1000]
+        if stripe_event.attempts >= MAX_ATTEMPTS:
+            stripe_event.status = StripeEventStatus.FAILED
+            stripe_event.next_attempt_at = None
+        else:
+            stripe_event.next_attempt_at = timezone.now() + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (stripe_event.attempts - 1)
+            )
+    stripe_event.save(
+        update_fields=[
+            "status",
+            "attempts",
+            "next_attempt_at",
+            "last_error",
+            "processed_at",
+        ]
+    )
+
+
+# =========================
+# HANDLERS
+# =========================
+def _locked_payment(**lookup):
+    from payments.models import Payment
+
+    return (
+        Payment.objects.select_for_update()
+        .select_related("booking")
+        .filter(**lookup)
+        .first()
+    )
+
+
+def _notify(booking, event):
+    from payments.notifications import booking_email, notify_payment
+
+    email_to = booking_email(booking)
+    if email_to:
+        notify_payment(booking, event, settings.BACKEND_URL, email_to)
+
+
+def handle_checkout_session_completed(session):
+    if session.get("payment_status") not in ("paid", "no_payment_required"):
+        # Thanh toán bất đồng bộ (chuyển khoản...): chờ async_payment_succeeded
+        return
+    payment = _locked_payment(transaction_id=session["id"])
+    if payment is None:
+        logger.warning(f"No payment for checkout session {session['id']}")
+        return
+    if session.get("payment_intent"):
+        payment.payment_intent = session["payment_intent"]
+    if int(payment.status) in (PaymentStatus.SUCCESS, PaymentStatus.REFUNDED):
+        # Event lặp lại / đến sau refund
+        payment.save(update_fields=["payment_intent"])
+        return
+
+    payment.status = PaymentStatus.SUCCESS
+    payment.save(update_fields=["status", "payment_intent"])
+
+    booking = payment.booking
+    booking.payment_status = PaymentStatus.PAID
+    booking.status = BookingStatus.CONFIRMED
+    if booking.service_type == ServiceType.FLIGHT:
+        # Ghế đang giữ -> giữ luôn, không còn bị expire_seat_holds trả lại
+        try:
+            confirm_holds(booking.id)
+        except SeatsUnavailable:
+            _refund_unavailable_seats(payment)
+            return
+    booking.save()
+
+    _notify(booking, EVENT_SUCCESS)
+
+
+def _refund_unavailable_seats(payment):
+    """
+    Thanh toán tới sau khi ghế đã bị trả và chuyến đã hết chỗ: hủy booking, hoàn
+    toàn bộ tiền. Idempotency key giữ cho event được xử lý lại không hoàn 2 lần;
+    Stripe lỗi thì event được retry.
+    """
+    booking = payment.booking
+    if payment.payment_intent:
+        stripe.Refund.create(
+            payment_intent=payment.payment_intent,
+            api_key=settings.STRIPE_SECRET_KEY,
+            idempotency_key=f"seats-unavailable-refund-{payment.pk}",
+        )
+    release_holds(booking_id=booking.id)
+
+    payment.status = PaymentStatus.REFUNDED
+    payment.save(update_fields=["status"])
+    booking.status = BookingStatus.CANCELLED
+    booking.payment_status = PaymentStatus.REFUNDED
+    booking.refund_amount = payment.amount
+    booking.save(update_fields=["status", "payment_status", "refund_amount"])
+    logger.warning(f"Refunded booking {booking.id}: seats sold out before payment")
+
+    _notify(booking, EVENT_FAILED)
+
+
+def handle_checkout_session_failed(session):
+    """checkout.session.async_payment_failed / checkout.session.expired"""
+    payment = _locked_payment(transaction_id=session["id"])
+    if payment is None or int(payment.status) != PaymentStatus.PENDING:
+        return
+
+    payment.status = PaymentStatus.FAILED
+    payment.save(update_fields=["status"])
+
+    _notify(payment.booking, EVENT_FAILED)
+
+
+def handle_charge_refunded(charge):
+    payment = None
+    if charge.get("payment_intent"):
+        payment = _locked_payment(payment_intent=charge["payment_intent"])
+    if payment is None:
+        logger.warning(f"No payment for payment intent {charge.get('payment_intent')}")
+        return
+
+    amount = charge.get("amount_refunded") or 0
+    if (charge.get("currency") or "").lower() not in ZERO_DECIMAL_CURRENCIES:
+        amount = amount / 100
+
+    booking = payment.booking
+    booking.refund_amount = amount
+    update_fields = ["refund_amount"]
+    if charge.get("refunded"):
+        # Hoàn toàn bộ
+        payment.status = PaymentStatus.REFUNDED
+        payment.save(update_fields=["status"])
+        booking.payment_status = PaymentStatus.REFUNDED
+        update_fields.append("payment_status")
+    booking.save(update_fields=update_fields)
+
+
+HANDLERS = {
+    "checkout.session.completed": handle_checkout_session_completed,
+    "checkout.session.async_payment_succeeded": handle_checkout_session_completed,
+    "checkout.session.async_payment_failed": handle_checkout_session_failed,
+    "checkout.session.expired": handle_checkout_session_failed,
+    "charge.refunded": handle_charge_refunded,
+}
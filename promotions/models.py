@@ -29,6 +29,24 @@ class Promotion(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_promotion_type_display()})"
 
+    def _flight_ids(self):
+        return list(self.flight_promotions.values_list("flight_id", flat=True))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from flights.fares import refresh_flights
+
+        # Thời gian / mức giảm / trạng thái đổi: tính lại lịch giá các flight liên quan
+        refresh_flights(self._flight_ids())
+
+    def delete(self, *args, **kwargs):
+        flight_ids = self._flight_ids()
+        result = super().delete(*args, **kwargs)
+        from flights.fares import refresh_flights
+
+        refresh_flights(flight_ids)
+        return result
+
 
 class FlightPromotion(models.Model):
     promotion = models.ForeignKey(
@@ -51,6 +69,27 @@ class FlightPromotion(models.Model):
     def __str__(self):
         return f"{self.promotion.title} -> Flight: {self.flight_id if self.flight else 'N/A'}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_flight_id = instance.flight_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from flights.fares import refresh_flights
+
+        refresh_flights({self.flight_id, getattr(self, "_loaded_flight_id", None)})
+        self._loaded_flight_id = self.flight_id
+
+    def delete(self, *args, **kwargs):
+        flight_id = self.flight_id
+        result = super().delete(*args, **kwargs)
+        from flights.fares import refresh_flights
+
+        refresh_flights([flight_id])
+        return result
+
 
 class ActivityPromotion(models.Model):
     promotion = models.ForeignKey(
@@ -0,0 +1,124 @@
+from django.apps import apps
+from django.db.models import Manager, QuerySet
+from django.utils import timezone
+from rest_framework import serializers
+
+# model được khuyến mãi -> (model liên kết, tên FK trỏ về model đó)
+PROMOTION_LINKS = {
+    "rooms.Room": ("promotions.RoomPromotion", "room"),
+    "flights.Flight": ("promotions.FlightPromotion", "flight"),
+    "cars.Car": ("promotions.CarPromotion", "car"),
+    "activities.ActivityDate": ("promotions.ActivityPromotion", "activity_date"),
+}
+
+# Tên attribute lưu promotion đã resolve trên instance
+ACTIVE_PROMOTION_ATTR = "_active_promotion"
+
+
+def _get_link(model):
+    link_label, fk_name = PROMOTION_LINKS[model._meta.label]
+    return apps.get_model(link_label), fk_name
+
+
+def _effective_percent(link):
+    if link.discount_percent is not None:
+        return link.discount_percent
+    return link.promotion.discount_percent or 0
+
+
+def _to_payload(link):
+    promo = link.promotion
+    return {
+        "id": promo.id,
+        "title": promo.title,
+        "discount_percent": link.discount_percent or promo.discount_percent,
+        "discount_amount": link.discount_amount or promo.discount_amount,
+        "start_date": promo.start_date,
+        "end_date": promo.end_date,
+    }
+
+
+def resolve_active_promotions(model, object_ids, now=None):
+    """
+    Trả về {object_id: payload | None} với promotion active có discount lớn nhất
+    cho mỗi object, chỉ bằng 1 query trên bảng liên kết (join promotion).
+    """
+    object_ids = {pk for pk in object_ids if pk is not None}
+    best = dict.fromkeys(object_ids)
+    if not object_ids:
+        return best
+
+    now = now or timezone.now()
+    link_model, fk_name = _get_link(model)
+    links = (
+        link_model.objects.select_related("promotion")
+        .filter(
+            **{f"{fk_name}_id__in": object_ids},
+            promotion__is_active=True,
+            promotion__start_date__lte=now,
+            promotion__end_date__gte=now,
+        )
+        .order_by("id")
+    )
+
+    best_links = {}
+    for link in links:
+        object_id = getattr(link, f"{fk_name}_id")
+        current = best_links.get(object_id)
+        if current is None or _effective_percent(link) > _effective_percent(current):
+            best_links[object_id] = link
+
+    for object_id, link in best_links.items():
+        best[object_id] = _to_payload(link)
+    return best
+
+
+def apply_discount(total_price, promotion):
+    """
+    Số tiền giảm của 1 promotion payload trên total_price: theo phần trăm (có trần
+    discount_amount nếu có), hoặc số tiền cố định không vượt quá total_price.
+    """
+    if not promotion:
+        return 0
+    total_price = float(total_price)
+    percent = float(promotion.get("discount_percent") or 0)
+    amount = float(promotion.get("discount_amount") or 0)
+    if percent > 0:
+        percent_discount = total_price * percent / 100
+        return min(percent_discount, amount) if amount > 0 else percent_discount
+    if amount > 0:
+        return min(amount, total_price)
+    return 0
+
+
+def attach_active_promotions(instances, now=None):
+    """Resolve promotion cho cả danh sách instance rồi gắn sẵn lên từng instance."""
+    instances = [obj for obj in instances if obj is not None]
+    if not instances:
+        return
+
+    resolved = resolve_active_promotions(
+        type(instances[0]), [obj.pk for obj in instances], now
+    )
+    for obj in instances:
+        setattr(obj, ACTIVE_PROMOTION_ATTR, resolved.get(obj.pk))
+
+
+def get_active_promotion(instance):
+    """Promotion active tốt nhất của 1 instance, dùng kết quả đã gắn sẵn nếu có."""
+    if not hasattr(instance, ACTIVE_PROMOTION_ATTR):
+        attach_active_promotions([instance])
+    return getattr(instance, ACTIVE_PROMOTION_ATTR)
+
+
+class ActivePromotionListSerializer(serializers.ListSerializer):
+    """
+    list_serializer_class cho các serializer có field promotion/has_promotion:
+    resolve promotion cho cả trang trước khi serialize từng phần tử.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, (Manager, QuerySet)) else data
+        items = list(iterable)
+        attach_active_promotions(items)
+        return super().to_representation(items)
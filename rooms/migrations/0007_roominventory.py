@@ -0,0 +1,76 @@
+# Generated by Django 4.2.21 on 2026-10-17 20:34
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# BookingStatus.CANCELLED, BookingStatus.REBOOKED
+RELEASED_BOOKING_STATUSES = [3, 5]
+
+
+def _nights(check_in, check_out):
+    check_in, check_out = check_in.date(), check_out.date()
+    night, end = check_in, max(check_out, check_in + timedelta(days=1))
+    while night < end:
+        yield night
+        night += timedelta(days=1)
+
+
+def backfill_room_inventory(apps, schema_editor):
+    Room = apps.get_model("rooms", "Room")
+    RoomBookingDetail = apps.get_model("rooms", "RoomBookingDetail")
+    RoomInventory = apps.get_model("rooms", "RoomInventory")
+
+    booked = {}
+    details = RoomBookingDetail.objects.exclude(
+        booking__status__in=RELEASED_BOOKING_STATUSES
+    ).values_list("room_id", "check_in", "check_out", "room_count")
+    for room_id, check_in, check_out, room_count in details.iterator():
+        for night in _nights(check_in, check_out):
+            key = (room_id, night)
+            booked[key] = booked.get(key, 0) + room_count
+
+    rooms = Room.objects.filter(start_date__isnull=False, end_date__isnull=False)
+    for room in rooms.iterator():
+        nights = [
+            room.start_date + timedelta(days=i)
+            for i in range((room.end_date - room.start_date).days)
+        ]
+        RoomInventory.objects.bulk_create(
+            [
+                RoomInventory(
+                    room_id=room.id,
+                    date=night,
+                    total_rooms=room.total_rooms,
+                    booked_rooms=booked.get((room.id, night), 0),
+                )
+                for night in nights
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0006_room_dayuse_duration_hours_room_price_per_day_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_rooms', models.PositiveIntegerField(default=0)),
+                ('booked_rooms', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='rooms.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'room'], name='room_inventory_date_idx')],
+                'unique_together': {('room', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_room_inventory, migrations.RunPython.noop),
+    ]
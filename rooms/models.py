@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
 from hotels.models import Hotel
 from django.utils import timezone
 from bookings.models import Booking
+from bookings.constants.booking_status import BookingStatus
 from accounts.models import CustomUser
 from datetime import timedelta
 
@@ -51,8 +53,49 @@ class Room(models.Model):
         else:
             self.available = True
         super().save(*args, **kwargs)
+        self.sync_inventory()
         if self.hotel:
             self.hotel.update_min_price()
+            self.hotel.update_search_summary()
+            self.hotel.invalidate_list_cache()
+
+    def sync_inventory(self):
+        """
+        Đồng bộ RoomInventory với khoảng [start_date, end_date) và total_rooms:
+        xóa đêm nằm ngoài khoảng, thêm đêm còn thiếu (tính booked từ booking hiện có).
+        """
+        inventory = RoomInventory.objects.filter(room=self)
+        if not self.start_date or not self.end_date:
+            inventory.delete()
+            return
+
+        inventory.exclude(date__gte=self.start_date, date__lt=self.end_date).delete()
+        inventory.exclude(total_rooms=self.total_rooms).update(
+            total_rooms=self.total_rooms
+        )
+
+        existing = set(inventory.values_list("date", flat=True))
+        missing = [
+            self.start_date + timedelta(days=i)
+            for i in range((self.end_date - self.start_date).days)
+            if self.start_date + timedelta(days=i) not in existing
+        ]
+        if not missing:
+            return
+
+        booked = RoomInventory.count_booked_nights(self, missing[0], missing[-1])
+        RoomInventory.objects.bulk_create(
+            [
+                RoomInventory(
+                    room=self,
+                    date=night,
+                    total_rooms=self.total_rooms,
+                    booked_rooms=booked.get(night, 0),
+                )
+                for night in missing
+            ],
+            batch_size=500,
+        )
 
     def decrease_available_rooms(self, num=1):
         """Gọi khi booking thành công"""
@@ -64,43 +107,85 @@ class Room(models.Model):
         super().delete(*args, **kwargs)
         if hotel:
             hotel.update_min_price()
+            hotel.update_search_summary()
+            hotel.invalidate_list_cache()
 
     def get_active_promotion(self):
-        from django.utils import timezone
+        """Promotion active có discount lớn nhất (xem promotions.services)"""
+        from promotions.services import get_active_promotion
+
+        return get_active_promotion(self)
+
+
+class RoomsUnavailable(Exception):
+    """Phòng không còn đủ số lượng cho mọi đêm của booking."""
+
 
-        now = timezone.now()
-        room_promotions = self.promotions.select_related("promotion").all()
+# Sổ tồn phòng theo từng đêm: 1 dòng / (room, date) trong [start_date, end_date)
+class RoomInventory(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="inventory")
+    date = models.DateField()
+    total_rooms = models.PositiveIntegerField(default=0)
+    booked_rooms = models.PositiveIntegerField(default=0)
 
-        # Chỉ lấy những promotion đang active
-        active_promos = [
-            rp
-            for rp in room_promotions
-            if rp.promotion.is_active
-            and rp.promotion.start_date <= now <= rp.promotion.end_date
+    class Meta:
+        unique_together = ("room", "date")
+        indexes = [
+            models.Index(fields=["date", "room"], name="room_inventory_date_idx")
         ]
 
-        if not active_promos:
-            return None
-
-        # Lấy promotion có discount lớn nhất
-        best_promo = max(
-            active_promos,
-            key=lambda rp: (
-                rp.discount_percent
-                if rp.discount_percent is not None
-                else (rp.promotion.discount_percent or 0)
-            ),
+    def __str__(self):
+        return f"{self.room_id} @ {self.date}: {self.booked_rooms}/{self.total_rooms}"
+
+    @staticmethod
+    def stay_nights(check_in, check_out):
+        """Khoảng đêm [first_night, end) của 1 booking; dayuse chiếm đêm check-in."""
+        if hasattr(check_in, "date"):
+            check_in = check_in.date()
+        if hasattr(check_out, "date"):
+            check_out = check_out.date()
+        return check_in, max(check_out, check_in + timedelta(days=1))
+
+    @classmethod
+    def free_room_ids(cls, start_date, end_date, room_count=1):
+        """
+        Subquery room_id còn trống >= room_count phòng cho mọi đêm trong
+        [start_date, end_date). Dùng chung cho HotelListView, RoomListView, RoomSearchView.
+        """
+        start_date, end_date = cls.stay_nights(start_date, end_date)
+        nights = (end_date - start_date).days
+        return (
+            cls.objects.filter(
+                date__gte=start_date,
+                date__lt=end_date,
+                total_rooms__gte=F("booked_rooms") + room_count,
+            )
+            .values("room_id")
+            .annotate(free_nights=Count("id"))
+            .filter(free_nights=nights)
+            .values("room_id")
         )
 
-        promo = best_promo.promotion
-        return {
-            "id": promo.id,
-            "title": promo.title,
-            "discount_percent": best_promo.discount_percent or promo.discount_percent,
-            "discount_amount": best_promo.discount_amount or promo.discount_amount,
-            "start_date": promo.start_date,
-            "end_date": promo.end_date,
-        }
+    @classmethod
+    def count_booked_nights(cls, room, first_night, last_night):
+        """Số phòng đã đặt theo từng đêm trong [first_night, last_night] từ booking."""
+        booked = {}
+        details = RoomBookingDetail.objects.filter(
+            room=room,
+            check_in__date__lte=last_night,
+            check_out__date__gte=first_night,
+        ).exclude(
+            booking__status__in=[BookingStatus.CANCELLED, BookingStatus.REBOOKED]
+        )
+        for check_in, check_out, room_count in details.values_list(
+            "check_in", "check_out", "room_count"
+        ):
+            night, end = cls.stay_nights(check_in, check_out)
+            while night < end:
+                if first_night <= night <= last_night:
+                    booked[night] = booked.get(night, 0) + room_count
+                night += timedelta(days=1)
+        return booked
 
 
 # Model để lưu thông tin về hình ảnh phòng
@@ -204,11 +289,14 @@ class RoomBookingDetail(models.Model):
             self.final_price = float(self.total_price)
 
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        # Khi booking mới được tạo, giảm available_rooms
-        if is_new and self.room and self.room_count > 0:
-            self.room.decrease_available_rooms(self.room_count)
+            # Khi booking mới được tạo, giữ chỗ trong RoomInventory và giảm available_rooms;
+            # hết phòng ở 1 đêm -> RoomsUnavailable, detail không được tạo
+            if is_new and self.room and self.room_count > 0:
+                self.reserve_inventory()
+                self.room.decrease_available_rooms(self.room_count)
 
         # Cập nhật tổng discount, final_price, total_price lên Booking (nếu có nhiều RoomBookingDetail thì sum lại, ở đây là OneToOne nên chỉ lấy 1)
         if self.booking:
@@ -219,5 +307,38 @@ class RoomBookingDetail(models.Model):
                 update_fields=["discount_amount", "final_price", "total_price"]
             )
 
+    def _inventory_nights(self):
+        first_night, end = RoomInventory.stay_nights(self.check_in, self.check_out)
+        return RoomInventory.objects.filter(
+            room=self.room, date__gte=first_night, date__lt=end
+        )
+
+    def reserve_inventory(self):
+        """
+        UPDATE ... SET booked_rooms = booked_rooms + n WHERE booked_rooms + n <= total_rooms
+        cho từng đêm, không đọc trước nên các request đồng thời không đặt quá số phòng.
+        Phòng có sổ tồn mà số đêm giữ được ít hơn số đêm ở -> RoomsUnavailable
+        (gọi trong transaction để các đêm đã giữ được rollback).
+        """
+        first_night, end = RoomInventory.stay_nights(self.check_in, self.check_out)
+        reserved = (
+            self._inventory_nights()
+            .filter(total_rooms__gte=F("booked_rooms") + self.room_count)
+            .update(booked_rooms=F("booked_rooms") + self.room_count)
+        )
+        # Phòng chưa có start_date / end_date thì không có sổ tồn để kiểm tra
+        if self.room.start_date and self.room.end_date and (
+            reserved < (end - first_night).days
+        ):
+            raise RoomsUnavailable("Room not available for selected dates")
+
+    def release_inventory(self):
+        # Tách 2 update để không trừ âm cột unsigned trên MySQL
+        nights = self._inventory_nights()
+        nights.filter(booked_rooms__lt=self.room_count).update(booked_rooms=0)
+        nights.filter(booked_rooms__gte=self.room_count).update(
+            booked_rooms=F("booked_rooms") - self.room_count
+        )
+
     def __str__(self):
         return f"HotelBooking for {self.booking.booking_code} | {self.room_type} x {self.room_count}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from promotions.services import ActivePromotionListSerializer
 from .models import Room, RoomImage, RoomBookingDetail, RoomAmenity
 from hotels.serializers import HotelCreateSerializer, HotelSimpleSerializer
 from accounts.serializers import UserSerializer
@@ -22,6 +23,7 @@ class RoomSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Room
+        list_serializer_class = ActivePromotionListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
@@ -43,6 +45,7 @@ class RoomCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Room
+        list_serializer_class = ActivePromotionListSerializer
         fields = "__all__"
 
     def get_promotion(self, obj):
@@ -5,7 +5,13 @@ from rest_framework import generics
 from rest_framework.response import Response
 from django.db.models import Q, Prefetch
 from datetime import datetime
-from .models import Room, RoomImage, RoomAmenity, RoomBookingDetail
+from .models import (
+    Room,
+    RoomImage,
+    RoomAmenity,
+    RoomBookingDetail,
+    RoomInventory,
+)
 from .serializers import (
     RoomSerializer,
     RoomImageSerializer,
@@ -81,39 +87,25 @@ class RoomListView(generics.ListAPIView):
             if stay_type:
                 queryset = queryset.filter(stay_type=stay_type)
 
-            # Chỉ lấy phòng có còn ít nhất 1 phòng trống
-            queryset = queryset.filter(available_rooms__gt=0)
-
             # Chỉ lấy phòng còn hạn (start_date <= today <= end_date)
             today = datetime.now().date()
             queryset = queryset.filter(start_date__lte=today, end_date__gte=today)
 
-            # Filter theo ngày tìm kiếm (chỉ loại loại phòng đã đặt hết)
+            # Filter theo ngày tìm kiếm: phòng còn trống mọi đêm trong [sd, ed)
+            date_range = None
             if start_date and end_date:
                 sd = datetime.strptime(start_date, "%Y-%m-%d").date()
                 ed = datetime.strptime(end_date, "%Y-%m-%d").date()
                 if sd <= ed:
-                    from django.db.models import Count
-
-                    # Đếm số booking giao ngày cho từng loại phòng
-                    booking_counts = (
-                        RoomBookingDetail.objects.filter(
-                            check_in__lt=ed,
-                            check_out__gt=sd,
-                        )
-                        .values("room_id")
-                        .annotate(num_booked=Count("id"))
-                    )
-                    booked_dict = {
-                        b["room_id"]: b["num_booked"] for b in booking_counts
-                    }
-                    # Lọc lại queryset: chỉ giữ loại phòng còn trống (giữ QuerySet)
-                    available_room_ids = [
-                        room.id
-                        for room in queryset
-                        if booked_dict.get(room.id, 0) < room.available_rooms
-                    ]
-                    queryset = queryset.filter(id__in=available_room_ids)
+                    date_range = (sd, ed)
+
+            if date_range:
+                queryset = queryset.filter(
+                    id__in=RoomInventory.free_room_ids(*date_range)
+                )
+            else:
+                # Không có ngày: chỉ lấy phòng có còn ít nhất 1 phòng trống
+                queryset = queryset.filter(available_rooms__gt=0)
 
         except Exception as e:
             print("get_queryset error:", e)
@@ -313,7 +305,7 @@ class RoomSearchView(generics.ListAPIView):
                     "images", queryset=RoomImage.objects.all(), to_attr="room_images"
                 )
             )
-            .filter(hotel=hotel, available_rooms__gt=0)
+            .filter(hotel=hotel)
         )
 
         if adults:
@@ -321,18 +313,22 @@ class RoomSearchView(generics.ListAPIView):
         if children:
             queryset = queryset.filter(children_capacity__gte=int(children))
 
+        date_range = None
         if start_date and end_date:
             try:
                 sd = datetime.strptime(start_date, "%Y-%m-%d").date()
                 ed = datetime.strptime(end_date, "%Y-%m-%d").date()
                 if sd <= ed:
-                    booked_room_ids = RoomBookingDetail.objects.filter(
-                        check_in_date__lt=ed, check_out_date__gt=sd
-                    ).values_list("room_id", flat=True)
-                    queryset = queryset.exclude(id__in=booked_room_ids)
+                    date_range = (sd, ed)
             except Exception as e:
                 print("Parse date error:", e)
 
+        if date_range:
+            # Phòng còn trống mọi đêm trong [sd, ed) theo RoomInventory
+            queryset = queryset.filter(id__in=RoomInventory.free_room_ids(*date_range))
+        else:
+            queryset = queryset.filter(available_rooms__gt=0)
+
         rooms = queryset.all()
 
         hotel_data = {